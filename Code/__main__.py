@@ -6,10 +6,14 @@ from PyQt5.QtWidgets import (
     QSplitter,
     QAction,
     QFontComboBox,
+    QFileDialog,
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from text_panel import TextPanel
 from image_panel import ImagePanel
+from thumbnail_panel import ThumbnailPanel
+from project_panel import ProjectPanel
+from core.profiler import Profiler
 import sys
 
 
@@ -29,12 +33,23 @@ class MangaTextManager(QMainWindow):
         self.image_panel = ImagePanel()
         self.text_panel.image_panel = self.image_panel  # 互相关联一下
         self.image_panel.text_panel = self.text_panel  # 互相关联一下
+        self.thumbnail_panel = ThumbnailPanel()
+        self.thumbnail_panel.set_image_panel(self.image_panel)  # 缩略图面板也关联一下
+        self.thumbnail_panel.text_panel = self.text_panel
+        self.image_panel.thumbnail_panel = self.thumbnail_panel
+        self.project_panel = ProjectPanel()
+        self.project_panel.text_panel = self.text_panel  # 项目检索面板也关联一下
+        self.project_panel.image_panel = self.image_panel
 
         # 分割框的设置
         self.splitter = QSplitter(Qt.Horizontal)
         self.splitter.addWidget(self.text_panel)
         self.splitter.addWidget(self.image_panel)
-        self.splitter.setSizes([self.width() // 2, self.width() // 2])
+        self.splitter.addWidget(self.thumbnail_panel)
+        self.splitter.addWidget(self.project_panel)
+        self.splitter.setSizes([self.width() // 2, self.width() // 2, 0, 0])
+        self.thumbnail_panel.hide()  # 缩略图面板默认隐藏
+        self.project_panel.hide()  # 项目检索面板默认隐藏
 
         # 内容物的设置
         container = QWidget()
@@ -65,10 +80,33 @@ class MangaTextManager(QMainWindow):
         self.output_text_action = QAction("导出文本", self)
         self.output_text_action.triggered.connect(self.text_panel.output_text_file)
         self.menuBar().addAction(self.output_text_action)
+        # 菜单项，查找替换
+        self.toggle_search_panel_action = QAction("查找替换", self)
+        self.toggle_search_panel_action.setShortcut("Ctrl+F")
+        self.toggle_search_panel_action.triggered.connect(
+            self.text_panel.toggle_search_panel
+        )
+        self.menuBar().addAction(self.toggle_search_panel_action)
         # 菜单项，开关图片显示
         self.toggle_image_panel_action = QAction("开关图片显示", self)
         self.toggle_image_panel_action.triggered.connect(self.toggle_image_panel)
         self.menuBar().addAction(self.toggle_image_panel_action)
+        # 菜单项，切换分块显示
+        self.toggle_tiled_view_action = QAction("切换分块显示", self)
+        self.toggle_tiled_view_action.triggered.connect(
+            self.image_panel.toggle_tiled_view
+        )
+        self.menuBar().addAction(self.toggle_tiled_view_action)
+        # 菜单项，开关缩略图显示
+        self.toggle_thumbnail_panel_action = QAction("开关缩略图", self)
+        self.toggle_thumbnail_panel_action.triggered.connect(
+            self.toggle_thumbnail_panel
+        )
+        self.menuBar().addAction(self.toggle_thumbnail_panel_action)
+        # 菜单项，开关项目检索
+        self.toggle_project_panel_action = QAction("项目检索", self)
+        self.toggle_project_panel_action.triggered.connect(self.toggle_project_panel)
+        self.menuBar().addAction(self.toggle_project_panel_action)
         # 菜单项，增大字号
         self.increase_font_size_action = QAction("增大字号", self)
         self.increase_font_size_action.triggered.connect(
@@ -86,6 +124,19 @@ class MangaTextManager(QMainWindow):
         self.font_combo_box.currentFontChanged.connect(self.change_font)
         self.menuBar().setCornerWidget(self.font_combo_box, Qt.TopRightCorner)
 
+        # 性能分析，仅在启用时在状态栏显示耗时统计，并可导出记录
+        if Profiler.enabled:
+            # 菜单项，导出性能记录
+            self.export_profile_action = QAction("导出性能记录", self)
+            self.export_profile_action.triggered.connect(self.export_profile)
+            self.menuBar().addAction(self.export_profile_action)
+            # 每秒更新一次状态栏
+            self.profile_timer = QTimer()
+            self.profile_timer.timeout.connect(
+                lambda: self.statusBar().showMessage(Profiler.format_summary())
+            )
+            self.profile_timer.start(1000)
+
     # 更换字体方法
     def change_font(self, font):
         # 使用全局样式表来更改整个应用程序的字体
@@ -93,6 +144,51 @@ class MangaTextManager(QMainWindow):
         # 顺便更新一下文本面板字体
         self.text_panel.update_font_size()
 
+    # 导出性能记录，可在chrome://tracing或Perfetto中打开
+    def export_profile(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出性能记录", "profile.json", "Trace Files (*.json)"
+        )
+        if file_path:
+            Profiler.export_trace(file_path)
+
+    # 关闭窗口时
+    def closeEvent(self, event):
+        # 保存尚未写入的修改，并等待写入完成
+        self.text_panel.save_text_file()
+        # 放弃正在打开的文档，等待其余文档任务完成
+        self.text_panel.cancel_open()
+        self.text_panel.wait_for_tasks()
+        self.text_panel.storage.detach()
+        self.project_panel.close_project()
+        self.text_panel.memory_panel.close_memory()
+        self.text_panel.auto_saver.wait_for_writes()
+        # 等待磁盘缓存写入完成并保存索引，下次打开时可以直接使用预览图
+        self.image_panel.close_disk_cache()
+        super().closeEvent(event)
+
+    # 开关缩略图面板显示方法
+    def toggle_thumbnail_panel(self):
+        # 检测当前显示与否
+        if self.thumbnail_panel.isVisible():
+            # 若显示，则关闭
+            self.thumbnail_panel.hide()
+        else:
+            # 若不显示，则开启，并选中当前页
+            self.thumbnail_panel.show()
+            self.thumbnail_panel.select_index(self.image_panel.current_image_index)
+
+    # 开关项目检索面板显示方法
+    def toggle_project_panel(self):
+        # 检测当前显示与否
+        if self.project_panel.isVisible():
+            # 若显示，则关闭
+            self.project_panel.hide()
+        else:
+            # 若不显示，则开启，并更新索引
+            self.project_panel.show()
+            self.project_panel.update_index()
+
     # 开关图片面板显示方法
     def toggle_image_panel(self):
         # 检测当前显示与否
@@ -100,12 +196,14 @@ class MangaTextManager(QMainWindow):
             # 若显示，则关闭
             self.image_panel.hide()
             # 调整分割框
-            self.splitter.setSizes([self.width(), 0])
+            self.splitter.setSizes([self.width(), 0, *self.splitter.sizes()[2:]])
         else:
             # 若不显示，则开启
             self.image_panel.show()
             # 调整分割框
-            self.splitter.setSizes([self.width() // 2, self.width() // 2])
+            self.splitter.setSizes(
+                [self.width() // 2, self.width() // 2, *self.splitter.sizes()[2:]]
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+import threading
+import os
+
+from core.storage_backend import StorageBackend
+from core.lazy_document import LazyDocument, PageIndex
+from core.mtm_journal import MtmJournal
+from core.atomic_file import AtomicFile
+
+
+# 自动保存器
+# 记录被修改过的页面，在一段时间内不再有新的修改后，仅重新生成这些页面的文本，
+# 与其余页面的原始字节拼接为文档，随后交给后台线程以原子方式写入文件
+# 每次修改同时会追加到预写日志中，文档写入成功后再清理日志
+# 作为mtm文档的存储后端，处理其他后端不处理的所有文件
+class AutoSaver(StorageBackend):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        # 当前文档
+        self.has_changes = False  # 是否有尚未保存的修改，被修改的页面由文档记录
+        self.journal = MtmJournal()  # 预写日志
+
+        # 防抖计时器，每次修改都会重新计时，计时结束后统一保存
+        # 界面才需要计时器，在此导入，使文档相关的方法无需加载Qt即可使用
+        from PyQt5.QtCore import QTimer
+
+        self.delay = 500  # 防抖时长，单位毫秒
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+        # 写入线程相关
+        self.condition = threading.Condition()
+        self.pending_writes = {}  # 等待写入的任务，文件地址为键，同一文件仅保留最新内容
+        self.is_writing = False  # 是否正在写入
+        self.written_stats = {}  # 写入后文件的修改时间与大小，用于区分外部修改
+        self.writer_thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer_thread.start()
+
+    # 打开文档，若文件中没有文档标记则返回None，以便作为普通文本打开
+    # 仅读取文件与等待写入线程，可以在其他线程中调用
+    def open_document(self, file_path, parser, progress=None):
+        # 先等待尚未完成的写入，防止读取到写入前的内容与日志
+        self.wait_for_writes()
+        entries = PageIndex.load(file_path, progress)
+        if entries:
+            return LazyDocument(file_path, entries, parser)
+        return None
+
+    # 关联文档，打开文档后调用，返回通过日志恢复的页码
+    def attach(self, file_path, data):
+        # 关联前先保存旧文档
+        self.detach()
+        self.file_path = file_path
+        self.data = data
+        # 重放日志，恢复上次未能写入文档的修改
+        records = self.journal.open(file_path)
+        replayed_pages = MtmJournal.replay(records, data)
+        # 若有恢复的修改，立即写入文档
+        if replayed_pages:
+            self.has_changes = True
+            self.flush()
+        return replayed_pages
+
+    # 取消关联，取消前会保存尚未写入的修改
+    def detach(self):
+        self.flush()
+        self.journal.close()
+        self.file_path = None
+        self.data = {}
+        self.has_changes = False
+
+    # 标记页面已被修改，mtm文档以页面为单位生成，因此不区分行
+    def mark_dirty(self, page_number, row=None):
+        self.data.mark_modified(page_number)
+        # 先记录到日志中
+        self.journal.append_page(page_number, self.data[page_number])
+        self.schedule_flush()
+
+    # 标记新插入的页面
+    def mark_inserted(self, page_number):
+        self.journal.append_insertion(page_number, self.data[page_number])
+        self.schedule_flush()
+
+    # 标记已删除的页面
+    def mark_removed(self, page_number):
+        self.journal.append_removal(page_number)
+        self.schedule_flush()
+
+    # 重新开始计时，短时间内的多次修改只会保存一次
+    def schedule_flush(self):
+        self.has_changes = True
+        self.timer.start(self.delay)
+
+    # 立即保存所有修改
+    def flush(self):
+        self.timer.stop()
+        # 判断是否有需要保存的内容
+        if not self.file_path or not self.has_changes:
+            return
+        # 仅重新生成被修改过的页面，按照页面顺序拼接文档
+        content, entries = self.data.serialize()
+        self.has_changes = False
+        # 轮换日志，写入成功后删除旧日志，旧日志中的记录均不晚于当前序号
+        generation = self.journal.rotate()
+        sequence = self.journal.sequence
+        # 写入完成前，文档从生成的内容中读取页面，同时清除修改标记
+        self.data.rebase(content, entries, generation)
+        # 交给写入线程
+        with self.condition:
+            self.pending_writes[self.file_path] = (
+                content,
+                generation,
+                sequence,
+                self.data,
+                entries,
+            )
+            self.condition.notify_all()
+
+    # 判断文件的当前状态是否由自身写入
+    def is_own_write(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return self.written_stats.get(file_path) == (stat.st_mtime_ns, stat.st_size)
+
+    # 合并外部修改后的页面，entries为外部文件的页面索引，返回内容改变的页码
+    # 尚未保存的页面以本地修改为准，不会被覆盖
+    def merge_external_pages(self, entries):
+        return self.data.reindex(entries)
+
+    # 等待所有写入完成，通常在程序退出前调用
+    def wait_for_writes(self):
+        with self.condition:
+            self.condition.wait_for(
+                lambda: not self.pending_writes and not self.is_writing
+            )
+
+    # 写入线程的循环
+    def write_loop(self):
+        while True:
+            # 等待写入任务
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending_writes)
+                file_path = next(iter(self.pending_writes))
+                (
+                    content,
+                    generation,
+                    sequence,
+                    document,
+                    entries,
+                ) = self.pending_writes.pop(file_path)
+                self.is_writing = True
+            # 写入文件，成功后删除已经写入文档的旧日志，并更新页面索引
+            try:
+                # 先记录本次写入对应的旧日志，防止文档替换后、旧日志删除前中断时重复重放
+                MtmJournal.mark_written(file_path, generation, sequence, content)
+                AtomicFile.write(file_path, content)
+                stat = os.stat(file_path)
+                self.written_stats[file_path] = (stat.st_mtime_ns, stat.st_size)
+                MtmJournal.discard(file_path, generation)
+                PageIndex.save(file_path, entries)
+                document.release_source(generation)
+            except OSError as error:
+                self.last_error = error
+            # 写入结束
+            with self.condition:
+                self.is_writing = False
+                self.condition.notify_all()
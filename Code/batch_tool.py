@@ -0,0 +1,292 @@
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import argparse
+import sqlite3
+import json
+import csv
+import sys
+import os
+
+from core.markup_parser import MarkupParser, MarkupParseError
+from core.page_io import PageIO
+from sqlite_storage import SqliteStorage
+
+
+# 批处理工具
+# 无需界面即可批量转换、校验、合并、拆分MTM文档、CSV文件与数据库，并统计文本组数量
+# 读写均为逐页流式处理，内存占用与文档大小无关，多个文档使用进程池并行处理
+class BatchTool:
+    text_extension = PageIO.text_extension  # MTM文件后缀
+    csv_extension = PageIO.csv_extension  # CSV文件后缀
+    # 可处理的错误
+    errors = (OSError, UnicodeDecodeError, MarkupParseError, csv.Error, sqlite3.Error)
+
+    # 构造函数
+    def __init__(self, jobs=None):
+        self.jobs = jobs or os.cpu_count() or 1  # 并行的进程数量
+
+    # 创建解析器，使用默认的预设内容
+    @staticmethod
+    def create_parser():
+        return MarkupParser()
+
+    # 展开输入路径，文件夹中查找所有MTM文档、CSV文件与数据库，跳过隐藏的文件夹
+    @classmethod
+    def collect_files(cls, paths):
+        file_paths = []
+        for path in paths:
+            if not os.path.isdir(path):
+                file_paths.append(path)
+                continue
+            for folder_path, folder_names, file_names in os.walk(path):
+                folder_names[:] = sorted(
+                    name for name in folder_names if not name.startswith(".")
+                )
+                file_paths.extend(
+                    os.path.join(folder_path, file_name)
+                    for file_name in sorted(file_names)
+                    if file_name.lower().endswith(
+                        (
+                            cls.text_extension,
+                            cls.csv_extension,
+                            *SqliteStorage.file_extensions,
+                        )
+                    )
+                )
+        return file_paths
+
+    # 逐页读取文档，返回页码与文本组，数据库逐页查询，其他格式交给PageIO
+    @classmethod
+    def read_pages(cls, parser, file_path):
+        if SqliteStorage.accepts(file_path):
+            if not os.path.isfile(file_path):
+                # 连接不存在的数据库会新建文件，此处与其他格式一样报告找不到文件
+                raise FileNotFoundError(f"找不到文件：{file_path}")
+            yield from SqliteStorage.iter_pages(file_path)
+        else:
+            yield from PageIO.read_pages(parser, file_path)
+
+    # 逐页写入文档，返回页数与文本组数量
+    @classmethod
+    def write_pages(cls, parser, file_path, pages):
+        if SqliteStorage.accepts(file_path):
+            return SqliteStorage.write_pages(file_path, pages)
+        return PageIO.write_pages(parser, file_path, pages)
+
+    # 转换单个文档，返回(来源, 错误信息, 页数, 文本组数量)，在子进程中执行
+    @classmethod
+    def convert_file(cls, paths):
+        source_path, target_path = paths
+        parser = cls.create_parser()
+        try:
+            page_count, dialog_count = cls.write_pages(
+                parser, target_path, cls.read_pages(parser, source_path)
+            )
+        except cls.errors as error:
+            return source_path, str(error), 0, 0
+        return source_path, None, page_count, dialog_count
+
+    # 检查单个文档并统计，返回(来源, 错误信息, 统计结果)，在子进程中执行
+    @classmethod
+    def inspect_file(cls, file_path):
+        parser = cls.create_parser()
+        stats = {
+            "pages": 0,
+            "dialogs": 0,
+            "translated": 0,
+            "original_characters": 0,
+            "translated_characters": 0,
+        }
+        try:
+            for _, dialogs in cls.read_pages(parser, file_path):
+                stats["pages"] += 1
+                stats["dialogs"] += len(dialogs)
+                for _, original_text, translated_text in dialogs:
+                    # 预设的原文与译文一样只是占位内容，不计入字数
+                    if original_text != parser.default_original_text:
+                        stats["original_characters"] += len(original_text)
+                    # 空白或预设的译文视为未翻译
+                    if (
+                        translated_text
+                        and translated_text != parser.default_translated_text
+                    ):
+                        stats["translated"] += 1
+                        stats["translated_characters"] += len(translated_text)
+        except cls.errors as error:
+            return file_path, str(error), stats
+        return file_path, None, stats
+
+    # 并行处理多个任务，结果保持输入顺序，仅有一个任务时直接在当前进程中执行
+    def run_parallel(self, function, items):
+        if self.jobs == 1 or len(items) <= 1:
+            yield from map(function, items)
+            return
+        chunk_size = max(1, len(items) // (self.jobs * 4))
+        with ProcessPoolExecutor(self.jobs) as executor:
+            yield from executor.map(function, items, chunksize=chunk_size)
+
+    # 转换格式，target_format为mtm或csv，输出文件夹为空时写入来源所在的文件夹
+    def convert(self, paths, target_format, output_folder=None):
+        tasks = []
+        for source_path in self.collect_files(paths):
+            stem = os.path.splitext(os.path.basename(source_path))[0]
+            target_path = os.path.join(
+                output_folder or os.path.dirname(source_path),
+                f"{stem}.{target_format}",
+            )
+            if os.path.abspath(target_path) == os.path.abspath(source_path):
+                print(f"{source_path}：已是{target_format}格式，跳过", file=sys.stderr)
+                continue
+            tasks.append((source_path, target_path))
+        if output_folder:
+            os.makedirs(output_folder, exist_ok=True)
+        failed_count = 0
+        for source_path, error, page_count, dialog_count in self.run_parallel(
+            self.convert_file, tasks
+        ):
+            if error:
+                failed_count += 1
+                print(f"{source_path}：{error}", file=sys.stderr)
+            else:
+                print(f"{source_path}：{page_count}页，{dialog_count}个文本组")
+        print(f"共转换{len(tasks) - failed_count}个文档，失败{failed_count}个")
+        return 1 if failed_count else 0
+
+    # 校验文档格式，报告出错位置
+    def validate(self, paths):
+        file_paths = self.collect_files(paths)
+        failed_count = 0
+        for file_path, error, _ in self.run_parallel(self.inspect_file, file_paths):
+            if error:
+                failed_count += 1
+                print(f"{file_path}：{error}")
+        print(f"共校验{len(file_paths)}个文档，{failed_count}个有误")
+        return 1 if failed_count else 0
+
+    # 按顺序合并多个文档，页码重新从1开始编号
+    def merge(self, paths, output_path):
+        parser = self.create_parser()
+        file_paths = self.collect_files(paths)
+        pages = itertools.chain.from_iterable(
+            self.read_pages(parser, file_path) for file_path in file_paths
+        )
+        try:
+            page_count, dialog_count = self.write_pages(
+                parser,
+                output_path,
+                (
+                    (page_number, dialogs)
+                    for page_number, (_, dialogs) in enumerate(pages, 1)
+                ),
+            )
+        except self.errors as error:
+            print(f"合并失败：{error}", file=sys.stderr)
+            return 1
+        print(
+            f"已合并{len(file_paths)}个文档到{output_path}，"
+            f"{page_count}页，{dialog_count}个文本组"
+        )
+        return 0
+
+    # 将文档拆分为每份page_count页的若干文档，每份的页码重新从1开始编号
+    def split(self, file_path, page_count, output_folder=None):
+        parser = self.create_parser()
+        output_folder = output_folder or os.path.dirname(file_path)
+        os.makedirs(output_folder or ".", exist_ok=True)
+        stem, extension = os.path.splitext(os.path.basename(file_path))
+        pages = self.read_pages(parser, file_path)
+        part_number = 0
+        try:
+            for first_page in pages:
+                part_number += 1
+                part_pages = itertools.chain(
+                    [first_page], itertools.islice(pages, page_count - 1)
+                )
+                part_path = os.path.join(
+                    output_folder, f"{stem}_{part_number:03}{extension}"
+                )
+                self.write_pages(
+                    parser,
+                    part_path,
+                    (
+                        (page_number, dialogs)
+                        for page_number, (_, dialogs) in enumerate(part_pages, 1)
+                    ),
+                )
+                print(part_path)
+        except self.errors as error:
+            print(f"拆分失败：{error}", file=sys.stderr)
+            return 1
+        print(f"已拆分为{part_number}个文档")
+        return 0
+
+    # 统计页数、文本组数量、已翻译的文本组数量与字数
+    def stats(self, paths, as_json=False):
+        file_paths = self.collect_files(paths)
+        results = []
+        total = {}  # 所有文档的合计
+        failed_count = 0
+        for file_path, error, stats in self.run_parallel(self.inspect_file, file_paths):
+            if error:
+                failed_count += 1
+                print(f"{file_path}：{error}", file=sys.stderr)
+                continue
+            results.append({"file": file_path, **stats})
+            for key, value in stats.items():
+                total[key] = total.get(key, 0) + value
+        if as_json:
+            print(json.dumps({"files": results, "total": total}, ensure_ascii=False))
+        else:
+            for result in results + [{"file": "合计", **total}]:
+                print(
+                    f"{result['file']}：{result.get('pages', 0)}页，"
+                    f"{result.get('dialogs', 0)}个文本组，"
+                    f"已翻译{result.get('translated', 0)}个，"
+                    f"原文{result.get('original_characters', 0)}字，"
+                    f"译文{result.get('translated_characters', 0)}字"
+                )
+        return 1 if failed_count else 0
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="MTM文档批处理工具")
+    argument_parser.add_argument(
+        "--jobs", type=int, default=None, help="并行的进程数量，默认为CPU核心数"
+    )
+    commands = argument_parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="转换MTM文档、CSV文件与数据库")
+    convert_parser.add_argument("paths", nargs="+", help="文档或文件夹")
+    convert_parser.add_argument(
+        "--to", choices=("mtm", "csv", "mtmdb"), required=True, help="目标格式"
+    )
+    convert_parser.add_argument("--output", help="输出文件夹，默认为来源所在的文件夹")
+    validate_parser = commands.add_parser("validate", help="校验文档格式")
+    validate_parser.add_argument("paths", nargs="+", help="文档或文件夹")
+    merge_parser = commands.add_parser("merge", help="按顺序合并多个文档")
+    merge_parser.add_argument("paths", nargs="+", help="文档或文件夹")
+    merge_parser.add_argument(
+        "--output", required=True, help="输出文档，格式由后缀决定"
+    )
+    split_parser = commands.add_parser("split", help="按页数拆分文档")
+    split_parser.add_argument("path", help="文档")
+    split_parser.add_argument("--pages", type=int, required=True, help="每份的页数")
+    split_parser.add_argument("--output", help="输出文件夹，默认为来源所在的文件夹")
+    stats_parser = commands.add_parser("stats", help="统计文本组数量与字数")
+    stats_parser.add_argument("paths", nargs="+", help="文档或文件夹")
+    stats_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    arguments = argument_parser.parse_args()
+    if arguments.command == "split" and arguments.pages < 1:
+        argument_parser.error("每份的页数至少为1")
+
+    batch_tool = BatchTool(arguments.jobs)
+    if arguments.command == "convert":
+        exit_code = batch_tool.convert(arguments.paths, arguments.to, arguments.output)
+    elif arguments.command == "validate":
+        exit_code = batch_tool.validate(arguments.paths)
+    elif arguments.command == "merge":
+        exit_code = batch_tool.merge(arguments.paths, arguments.output)
+    elif arguments.command == "split":
+        exit_code = batch_tool.split(arguments.path, arguments.pages, arguments.output)
+    else:
+        exit_code = batch_tool.stats(arguments.paths, arguments.json)
+    sys.exit(exit_code)
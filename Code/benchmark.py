@@ -0,0 +1,549 @@
+import tracemalloc
+import subprocess
+import argparse
+import tempfile
+import random
+import time
+import re
+import json
+import csv
+import sys
+import io
+import os
+
+from core.markup_parser import MarkupParser
+from core.lazy_document import LazyDocument, PageIndex
+from core.mapped_file import MappedFile
+
+
+# 旧版的正则表达式分析器，作为性能对比的基准
+class RegexMarkupParser:
+    def __init__(self):
+        self.document_pattern = re.compile(
+            r"<MangaTextManager>(.*?)</MangaTextManager>", re.DOTALL
+        )
+        self.page_pattern = re.compile(r"<Page(\d+)>(.*?)</Page\1>", re.DOTALL)
+        self.dialog_pattern = re.compile(
+            r'<Dialog Speaker="([^""]*)">(.*?)</Dialog>', re.DOTALL
+        )
+
+    # 分析文档标记
+    def parse_doucument(self, text):
+        match = self.document_pattern.search(text)
+        if match:
+            return self.parse_pages(match.group(1))
+
+    # 分析页面标记
+    def parse_pages(self, text):
+        return [
+            (int(match.group(1)), self.parse_dialogs(match.group(2)))
+            for match in self.page_pattern.finditer(text)
+        ]
+
+    # 分析文本组标记
+    def parse_dialogs(self, text):
+        dialogs = []
+        for match in self.dialog_pattern.finditer(text):
+            content = match.group(2).strip().split("\n")
+            if len(content) == 2:
+                original_text, translated_text = content
+            else:
+                original_text, translated_text = content[0], ""
+            dialogs.append(
+                (
+                    match.group(1).strip(),
+                    original_text.strip(),
+                    translated_text.strip(),
+                )
+            )
+        return dialogs
+
+
+# 性能测试
+# 生成指定规模的MTM文档与图集，测量分析、生成、保存、翻页与读取图片等常用路径的耗时与内存峰值
+# 文档中每页的文本组数量在给定值上下浮动，文本为中文与日文字符，同一随机种子生成的内容相同
+# 结果以名称为键记录，可以保存为JSON，并与之前保存的基准对比，找出变慢的路径
+class Benchmark:
+    # 用于生成文本的字符
+    characters = "あいうえおかきくけこさしすせそ漫画翻译文本对话你好世界ABCabc123"
+    flip_count = 100  # 测量翻页时最多翻过的页数
+    image_size = (1400, 2000)  # 生成的图片大小
+    application = None  # 界面程序，所有测试共用，需保持引用以免被回收
+
+    # 构造函数，results为记录结果的字典，多个规模的测试可以共用
+    def __init__(self, page_count, dialog_count, seed=0, results=None):
+        self.page_count = page_count  # 页数
+        self.dialog_count = dialog_count  # 每页文本组数的平均值
+        self.random = random.Random(seed)
+        self.parser = MarkupParser()
+        self.pages = None  # 生成的页面，第一次使用时生成
+        self.text = None  # 生成的文档
+        self.results = {} if results is None else results  # 测试结果
+
+    # 生成随机文本
+    def generate_text(self, length):
+        return "".join(self.random.choice(self.characters) for _ in range(length))
+
+    # 生成页面，每页的文本组数量在平均值的一半到一倍半之间
+    def generate_pages(self):
+        if self.pages is None:
+            self.pages = [
+                (
+                    page_number,
+                    [
+                        (
+                            self.generate_text(3),
+                            self.generate_text(self.random.randint(5, 40)),
+                            self.generate_text(self.random.randint(5, 40)),
+                        )
+                        for _ in range(
+                            self.random.randint(
+                                self.dialog_count // 2, self.dialog_count * 3 // 2
+                            )
+                        )
+                    ],
+                )
+                for page_number in range(1, self.page_count + 1)
+            ]
+        return self.pages
+
+    # 生成文档
+    def generate_document(self):
+        if self.text is None:
+            self.text = self.parser.generate_document(self.generate_pages())
+        return self.text
+
+    # 测量函数的耗时与内存峰值，重复若干次取最短耗时，不测量内存时峰值为None
+    @staticmethod
+    def measure(function, repeat=3, trace_memory=True):
+        best_time = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            best_time = elapsed if best_time is None else min(best_time, elapsed)
+        peak = None
+        if trace_memory:
+            tracemalloc.start()
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return result, best_time, peak
+
+    # 记录并显示一项结果，与文档规模有关的结果在名称后附加页数
+    def record(self, name, elapsed, peak=None, with_pages=True):
+        key = f"{name}/{self.page_count}p" if with_pages else name
+        self.results[key] = {
+            "ms": round(elapsed * 1000, 3),
+            "peak_mb": None if peak is None else round(peak / 1024 / 1024, 3),
+        }
+        memory = "" if peak is None else f"，内存峰值 {peak / 1024 / 1024:8.2f} MB"
+        print(f"{key:>28}: {elapsed * 1000:9.2f} ms{memory}")
+
+    # 对比两种分析器
+    def run_parser(self):
+        text = self.generate_document()
+        regex_parser = RegexMarkupParser()
+        cases = [
+            ("regex", lambda: regex_parser.parse_doucument(text)),
+            ("streaming", lambda: self.parser.parse_doucument(text)),
+            (
+                "streaming_file",
+                lambda: list(self.parser.iter_pages(io.StringIO(text))),
+            ),
+        ]
+        print(
+            f"文档大小 {len(text.encode('utf-8')) / 1024 / 1024:.2f} MB，"
+            f"{self.page_count} 页，每页约 {self.dialog_count} 个文本组"
+        )
+        expected = None
+        for name, function in cases:
+            result, elapsed, peak = self.measure(function)
+            # 确认结果一致
+            if expected is None:
+                expected = result
+            elif result != expected:
+                raise AssertionError(f"{name} 的分析结果与基准不一致")
+            self.record(f"parse/{name}", elapsed, peak)
+
+    # 测量生成文档，并确认生成的文档可以还原为同样的页面
+    def run_generate(self):
+        pages = self.generate_pages()
+        text, elapsed, peak = self.measure(lambda: self.parser.generate_document(pages))
+        if self.parser.parse_doucument(text) != pages:
+            raise AssertionError("生成的文档与页面不一致")
+        self.record("generate", elapsed, peak)
+
+    # 对比打开文档后显示第一页的耗时，分别为完整分析、扫描页面索引、读取索引文件
+    def run_lazy(self):
+        text = self.generate_document()
+        with tempfile.TemporaryDirectory() as folder_path:
+            file_path = os.path.join(folder_path, "benchmark.mtm")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(text)
+
+            # 完整分析后显示第一页
+            def open_full():
+                with open(file_path, "r", encoding="utf-8") as file:
+                    return dict(self.parser.iter_pages(file))[1]
+
+            # 扫描页面索引后仅分析第一页
+            def open_scan():
+                entries = PageIndex.scan(file_path)
+                return LazyDocument(file_path, entries, self.parser)[1]
+
+            # 读取索引文件后仅分析第一页
+            def open_sidecar():
+                entries = PageIndex.load(file_path)
+                return LazyDocument(file_path, entries, self.parser)[1]
+
+            PageIndex.save(file_path, PageIndex.scan(file_path))
+            expected = None
+            for name, function in [
+                ("open_full", open_full),
+                ("open_scan", open_scan),
+                ("open_sidecar", open_sidecar),
+            ]:
+                result, elapsed, peak = self.measure(function)
+                result = [tuple(dialog) for dialog in result]
+                if expected is None:
+                    expected = result
+                elif result != expected:
+                    raise AssertionError(f"{name} 的第一页与基准不一致")
+                self.record(f"lazy/{name}", elapsed, peak)
+
+    # 在单独的进程中执行一种读取方式，返回处理的数量，用于测量常驻内存峰值
+    # read为旧的方式，将整个文件读入内存后再处理，作为对比的基准
+    @staticmethod
+    def run_rss_case(case, file_path):
+        parser = MarkupParser()
+        if case == "scan/read":
+            with open(file_path, "rb") as file:
+                return len(PageIndex.scan_data(file.read()))
+        elif case == "scan/mmap":
+            return len(PageIndex.scan(file_path))
+        elif case == "text/read":
+            with open(file_path, "r", encoding="utf-8") as file:
+                return len(file.read())
+        elif case == "text/mmap":
+            with MappedFile.open(file_path) as data:
+                return len(str(data, "utf-8"))
+        elif case == "pages/read":
+            with open(file_path, "r", encoding="utf-8") as file:
+                return sum(
+                    len(dialogs) for _, dialogs in parser.iter_pages(file.read())
+                )
+        elif case == "pages/mmap":
+            with MappedFile.open(file_path) as data:
+                return sum(
+                    len(dialogs)
+                    for _, dialogs in parser.iter_pages(MappedFile.iter_text(data))
+                )
+        elif case == "csv/read":
+            with open(file_path, "r", encoding="utf-8", newline="") as file:
+                return sum(1 for _ in csv.reader(io.StringIO(file.read())))
+        elif case == "csv/stream":
+            with open(file_path, "r", encoding="utf-8", newline="") as file:
+                return sum(1 for _ in csv.reader(file))
+        raise ValueError(case)
+
+    # 获取当前进程的常驻内存峰值，单位字节，无法获取时返回None
+    # Linux上优先读取VmHWM，ru_maxrss会继承创建子进程的父进程的峰值
+    @staticmethod
+    def get_peak_rss():
+        try:
+            with open("/proc/self/status", "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        try:
+            import resource
+        except ImportError:
+            return None
+        # macOS上的单位为字节，其他系统为KB
+        unit = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+
+    # 对比各种读取方式的常驻内存峰值，每种方式在新的进程中执行，记录峰值的增量
+    # 分别为扫描页面索引、读取普通文本、逐页分析MTM文档与逐行读取CSV文件
+    def run_peak_rss(self):
+        if self.get_peak_rss() is None:
+            print(f"{'':>28}  当前平台无法测量常驻内存，跳过")
+            return
+        code_path = os.path.dirname(os.path.abspath(__file__))
+        script = (
+            "import json, sys, time\n"
+            "from benchmark import Benchmark\n"
+            "case, file_path = sys.argv[1:]\n"
+            "before = Benchmark.get_peak_rss()\n"
+            "start = time.perf_counter()\n"
+            "Benchmark.run_rss_case(case, file_path)\n"
+            "elapsed = time.perf_counter() - start\n"
+            "print(json.dumps([elapsed, Benchmark.get_peak_rss() - before]))"
+        )
+        with tempfile.TemporaryDirectory() as folder_path:
+            file_path = os.path.join(folder_path, "benchmark.mtm")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(self.generate_document())
+            csv_path = os.path.join(folder_path, "benchmark.csv")
+            with open(csv_path, "w", encoding="utf-8", newline="") as file:
+                file.write(self.parser.generate_csv(self.generate_pages()))
+            for case in (
+                "scan/read",
+                "scan/mmap",
+                "text/read",
+                "text/mmap",
+                "pages/read",
+                "pages/mmap",
+                "csv/read",
+                "csv/stream",
+            ):
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        script,
+                        case,
+                        csv_path if case.startswith("csv") else file_path,
+                    ],
+                    cwd=code_path,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                elapsed, peak = json.loads(output)
+                self.record(f"rss/{case}", elapsed, peak)
+
+    # 获取界面程序，使用不显示窗口的平台，界面相关的模块仅在此时加载
+    @classmethod
+    def get_application(cls):
+        if cls.application is None:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PyQt5.QtWidgets import QApplication
+
+            cls.application = QApplication.instance() or QApplication([sys.argv[0]])
+        return cls.application
+
+    # 测量文本面板保存为MTM文档与CSV文件的耗时，以及翻页的平均耗时
+    def run_text_panel(self):
+        application = self.get_application()
+        from text_panel import TextPanel
+
+        with tempfile.TemporaryDirectory() as folder_path:
+            # 翻译记忆位于用户目录下，测试时改为临时文件夹
+            home_path = os.environ.get("HOME")
+            os.environ["HOME"] = folder_path
+            try:
+                text_panel = TextPanel()
+            finally:
+                if home_path is None:
+                    del os.environ["HOME"]
+                else:
+                    os.environ["HOME"] = home_path
+            file_path = os.path.join(folder_path, "benchmark.mtm")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(self.generate_document())
+            # 文档在后台读取与写入，等待完成后再计时
+            text_panel.open_text_file_with_path(file_path)
+            text_panel.wait_for_tasks()
+            try:
+                for extension in ("mtm", "csv"):
+                    target_path = os.path.join(folder_path, f"saved.{extension}")
+
+                    def save_document():
+                        text_panel.save_text_file_with_path(target_path)
+                        text_panel.wait_for_tasks()
+
+                    _, elapsed, _ = self.measure(save_document, trace_memory=False)
+                    self.record(f"save/{extension}", elapsed)
+
+                # 依次翻过若干页，记录每页的平均耗时
+                flip_count = min(self.flip_count, self.page_count)
+
+                def flip_pages():
+                    for page_number in range(1, flip_count + 1):
+                        text_panel.load_page(page_number)
+                    application.processEvents()
+
+                _, elapsed, _ = self.measure(flip_pages, trace_memory=False)
+                self.record("load_page", elapsed / flip_count)
+            finally:
+                text_panel.storage.detach()
+                text_panel.auto_saver.wait_for_writes()
+                text_panel.memory_panel.close_memory()
+                text_panel.deleteLater()
+
+    # 测量图片面板读取图片与缩放的耗时，每次读取前清空缓存，使图片重新解码
+    def run_image_panel(self, image_count):
+        self.get_application()
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtGui import QImage, QColor
+        from image_panel import ImagePanel
+        from image_cache import ImageCache
+
+        with tempfile.TemporaryDirectory() as folder_path:
+            # 生成图集，每张图片画上不同的色块，避免压缩后过小
+            image_paths = []
+            for index in range(image_count):
+                image = QImage(*self.image_size, QImage.Format_RGB32)
+                image.fill(QColor(255, 255, 255))
+                for _ in range(200):
+                    x = self.random.randrange(self.image_size[0])
+                    y = self.random.randrange(self.image_size[1])
+                    image.setPixelColor(x, y, QColor(self.random.randrange(256), 0, 0))
+                image_path = os.path.join(folder_path, f"{index + 1:03}.png")
+                image.save(image_path)
+                image_paths.append(image_path)
+            image_panel = ImagePanel()
+            image_panel.resize(800, 1000)
+
+            # 冷启动读取，每张图片均需解码
+            def load_images():
+                for image_path in image_paths:
+                    image_panel.image_cache = ImageCache()
+                    image_panel.load_image(image_path)
+
+            # 在若干缩放级别之间切换，显示快速缩放的预览
+            def scale_images():
+                for scale_factor in (0.25, 0.5, 0.75, 1.0, 1.5):
+                    image_panel.scale_factor = scale_factor
+                    image_panel.render_cache = ImageCache()
+                    image_panel.update_image()
+
+            # 后台平滑缩放任务的实际工作
+            def smooth_scale():
+                source_image = image_panel.source_image
+                return source_image.scaled(
+                    source_image.size() * 0.5,
+                    Qt.KeepAspectRatio,
+                    Qt.SmoothTransformation,
+                )
+
+            try:
+                for name, function, count in [
+                    ("load_image", load_images, image_count),
+                    ("scale_image", scale_images, 5),
+                    ("smooth_scale", smooth_scale, 1),
+                ]:
+                    _, elapsed, _ = self.measure(function, trace_memory=False)
+                    self.record(f"image/{name}", elapsed / count, with_pages=False)
+            finally:
+                image_panel.render_timer.stop()
+                image_panel.deleteLater()
+
+    # 与基准对比，耗时超过基准的tolerance倍且多出min_delta毫秒以上时视为变慢
+    @staticmethod
+    def compare(results, baseline, tolerance, min_delta=1.0):
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if (
+                result["ms"] > base["ms"] * tolerance
+                and result["ms"] - base["ms"] > min_delta
+            ):
+                regressions.append((name, base["ms"], result["ms"]))
+        return regressions
+
+    # 检查无界面使用时的导入耗时，在新的进程中导入核心模块与命令行工具
+    # 不应加载Qt与剪贴板模块，耗时超过预算时报错
+    def run_import(self, budget, repeat=5):
+        code_path = os.path.dirname(os.path.abspath(__file__))
+        modules = [
+            f"core.{os.path.splitext(file_name)[0]}"
+            for file_name in sorted(os.listdir(os.path.join(code_path, "core")))
+            if file_name.endswith(".py") and file_name != "__init__.py"
+        ] + ["batch_tool", "auto_saver", "sqlite_storage"]
+        script = (
+            "import importlib, json, sys, time\n"
+            "start = time.perf_counter()\n"
+            f"for module in {modules!r}:\n"
+            "    importlib.import_module(module)\n"
+            "elapsed = time.perf_counter() - start\n"
+            "print(json.dumps([elapsed, sorted(name for name in sys.modules "
+            "if name.split('.')[0] in ('PyQt5', 'pyperclip'))]))"
+        )
+        # 重复若干次取最短耗时，排除磁盘缓存的影响
+        best_time = None
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=code_path,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            elapsed, gui_modules = json.loads(output)
+            best_time = elapsed if best_time is None else min(best_time, elapsed)
+        # 仅报告，是否超出预算由tests/test_import_budget.py检查
+        self.record("import", best_time, with_pages=False)
+        print(f"{'':>28}  预算 {budget:.0f} ms，{len(modules)} 个模块")
+        if gui_modules:
+            print(f"{'':>28}  无界面导入时加载了 {', '.join(gui_modules)}")
+        if best_time * 1000 > budget:
+            print(f"{'':>28}  导入耗时超出预算")
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="MTM性能测试")
+    argument_parser.add_argument(
+        "--pages",
+        type=int,
+        nargs="+",
+        default=[1, 100, 1000, 5000],
+        help="文档页数，可以指定多个规模",
+    )
+    argument_parser.add_argument(
+        "--dialogs", type=int, default=20, help="每页文本组数的平均值"
+    )
+    argument_parser.add_argument("--images", type=int, default=10, help="图片数量")
+    argument_parser.add_argument(
+        "--no-gui", action="store_true", help="跳过需要界面的测试"
+    )
+    argument_parser.add_argument("--output", help="将结果保存为JSON文件")
+    argument_parser.add_argument("--baseline", help="作为基准的JSON文件")
+    argument_parser.add_argument(
+        "--tolerance", type=float, default=1.5, help="超过基准的倍数时视为变慢"
+    )
+    argument_parser.add_argument(
+        "--import-budget", type=float, default=100, help="导入耗时预算，单位毫秒"
+    )
+    arguments = argument_parser.parse_args()
+    results = {}
+    for page_count in arguments.pages:
+        benchmark = Benchmark(page_count, arguments.dialogs, results=results)
+        benchmark.run_parser()
+        benchmark.run_generate()
+        benchmark.run_lazy()
+        benchmark.run_peak_rss()
+        if not arguments.no_gui:
+            benchmark.run_text_panel()
+    if not arguments.no_gui:
+        Benchmark(0, arguments.dialogs, results=results).run_image_panel(
+            arguments.images
+        )
+    benchmark.run_import(arguments.import_budget)
+
+    # 保存结果
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "arguments": vars(arguments),
+        "results": results,
+    }
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    # 与基准对比
+    if arguments.baseline:
+        with open(arguments.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = Benchmark.compare(results, baseline, arguments.tolerance)
+        for name, base_time, elapsed in regressions:
+            print(f"变慢：{name} {base_time:.2f} ms -> {elapsed:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print("与基准相比没有变慢的路径")
@@ -0,0 +1,198 @@
+from PyQt5.QtWidgets import QTableView, QAbstractItemView
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QModelIndex, QTimer
+import bisect
+
+from core.document_model import PagedDocument
+from core.markup_parser import MarkupParseError
+
+from dialog_table_model import DialogTableModel
+
+
+# 连续显示的文本组表格数据模型
+# 按照页面顺序依次显示所有文本组，每页前有一行页面分隔行
+# 仅记录每页分隔行所在的行号，行号对应的文本组在需要显示时才从文档中读取
+class ContinuousTableModel(DialogTableModel):
+    separator_color = QColor(220, 220, 220)  # 分隔行背景色
+
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.page_rows = []  # 每页分隔行所在的行号，按照页面顺序排列
+        self.row_count = 0  # 总行数
+
+    # 重新统计文档中每页的文本组数量，打开连续显示或文档被外部修改后调用
+    def reload(self, document):
+        self.beginResetModel()
+        self.document = document
+        self.page_rows = []
+        row = 0
+        # 仅统计数量，不读取页面
+        for page_number in document:
+            self.page_rows.append(row)
+            row += 1 + self.get_dialog_count(page_number)
+        self.row_count = row
+        self.endResetModel()
+
+    # 获取页面的文本组数量，分页文档无需读取页面即可统计
+    def get_dialog_count(self, page_number):
+        if not isinstance(self.document, PagedDocument):
+            return len(self.get_dialogs(page_number))
+        try:
+            return self.document.get_dialog_count(page_number)
+        except (MarkupParseError, KeyError):
+            return 0
+
+    # 获取某一行对应的页码与文本组序号，分隔行的文本组序号为None
+    def locate(self, row):
+        index = bisect.bisect_right(self.page_rows, row) - 1
+        dialog_row = row - self.page_rows[index] - 1
+        return index + 1, dialog_row if dialog_row >= 0 else None
+
+    # 获取某个文本组所在的行
+    def get_row(self, page_number, dialog_row):
+        return self.page_rows[page_number - 1] + 1 + dialog_row
+
+    # 获取页面分隔行所在的行
+    def get_page_row(self, page_number):
+        return self.page_rows[page_number - 1]
+
+    # 行数，包含分隔行
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.row_count
+
+    # 获取数据，分隔行仅显示页码
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        page_number, dialog_row = self.locate(index.row())
+        if dialog_row is None:
+            if role == Qt.DisplayRole and index.column() == 0:
+                return f"第{page_number}页"
+            if role == Qt.BackgroundRole:
+                return self.separator_color
+            if role == Qt.TextAlignmentRole:
+                return int(Qt.AlignCenter)
+            return None
+        return super().data(index, role)
+
+    # 行表头显示文本组在页面中的序号，分隔行不显示
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Vertical:
+            _, dialog_row = self.locate(section)
+            return "" if dialog_row is None else str(dialog_row + 1)
+        return super().headerData(section, orientation, role)
+
+    # 分隔行不可编辑
+    def flags(self, index):
+        if index.isValid() and self.locate(index.row())[1] is None:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return super().flags(index)
+
+    # 页面的行数改变后，其后页面的行号随之改变
+    def shift_rows(self, page_number, count):
+        for index in range(page_number, len(self.page_rows)):
+            self.page_rows[index] += count
+        self.row_count += count
+
+    # 插入页面，同时添加页面的所有行
+    def insert_page(self, page_number, dialogs):
+        if page_number <= len(self.page_rows):
+            row = self.page_rows[page_number - 1]
+        else:
+            row = self.row_count
+        count = 1 + len(dialogs)
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        self.document.insert_page(page_number, dialogs)
+        self.page_rows.insert(page_number - 1, row)
+        self.shift_rows(page_number, count)
+        self.endInsertRows()
+
+    # 删除页面，同时移除页面的所有行
+    def remove_page(self, page_number):
+        row = self.page_rows[page_number - 1]
+        if page_number < len(self.page_rows):
+            end = self.page_rows[page_number]
+        else:
+            end = self.row_count
+        self.beginRemoveRows(QModelIndex(), row, end - 1)
+        del self.document[page_number]
+        del self.page_rows[page_number - 1]
+        self.shift_rows(page_number - 1, row - end)
+        self.endRemoveRows()
+
+
+# 连续显示面板
+# 以一个表格显示整个文档，视图只向模型请求可见行的数据，因此页面再多也不会逐行创建控件
+# 所有行先以默认行高显示，滚动停止后仅按内容重新计算可见行的行高
+# 选中某一行时，文本面板的当前页与隔壁的图片同步切换到该行所在的页面
+class ContinuousPanel(QTableView):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.text_panel = None  # 隔壁的文本面板
+        self.continuous_model = ContinuousTableModel()
+        self.setModel(self.continuous_model)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+
+        # 防抖计时器，滚动停止后再计算可见行的行高
+        self.delay = 100  # 防抖时长，单位毫秒
+        self.resize_timer = QTimer()
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.timeout.connect(self.resize_visible_rows)
+
+        # 绑定事件
+        self.verticalScrollBar().valueChanged.connect(self.schedule_resize)
+        self.continuous_model.modelReset.connect(self.schedule_resize)
+        self.selectionModel().currentRowChanged.connect(self.on_current_row_changed)
+
+    # 关联文本面板
+    def set_text_panel(self, text_panel):
+        self.text_panel = text_panel
+        self.continuous_model.text_panel = text_panel
+
+    # 重新计时
+    def schedule_resize(self):
+        self.resize_timer.start(self.delay)
+
+    # 仅按内容重新计算可见行的行高
+    def resize_visible_rows(self):
+        first_row = self.rowAt(0)
+        if first_row < 0:
+            return
+        last_row = self.rowAt(self.viewport().height() - 1)
+        if last_row < 0:
+            last_row = self.continuous_model.rowCount() - 1
+        for row in range(first_row, last_row + 1):
+            self.resizeRowToContents(row)
+
+    # 滚动到某一页，并选中该页的分隔行
+    def scroll_to_page(self, page_number):
+        if not 0 < page_number <= len(self.continuous_model.page_rows):
+            return
+        index = self.continuous_model.index(
+            self.continuous_model.get_page_row(page_number), 0
+        )
+        self.setCurrentIndex(index)
+        self.scrollTo(index, QAbstractItemView.PositionAtTop)
+
+    # 选中的行改变时，同步当前页与隔壁的图片
+    def on_current_row_changed(self, current, previous):
+        if not current.isValid():
+            return
+        page_number, _ = self.continuous_model.locate(current.row())
+        if page_number == self.text_panel.current_page_number:
+            return
+        self.text_panel.current_page_number = page_number
+        self.text_panel.jump_page_number.setText(str(page_number))
+        # 隔壁同理
+        image_panel = self.text_panel.image_panel
+        if image_panel and image_panel.image_path_list:
+            image_panel.show_image(page_number - 1)
+
+    # 窗口大小改变时，可见行随之改变
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_resize()
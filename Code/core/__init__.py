@@ -0,0 +1,3 @@
+# 核心模块
+# 文档模型、解析器、存储格式、索引等与界面无关的部分，不依赖PyQt与剪贴板
+# 命令行工具与测试可以直接使用，无需加载界面相关的模块
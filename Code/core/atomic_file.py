@@ -0,0 +1,47 @@
+import contextlib
+import tempfile
+import os
+
+
+# 原子写入
+# 先写入同一文件夹中的临时文件，完成后再替换目标文件
+# 这样即便写入途中程序中断，原文件也不会被截断
+class AtomicFile:
+    # 以原子方式写入文件，content可以是字符串或字节
+    @classmethod
+    def write(cls, file_path, content):
+        with cls.open(file_path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+
+    # 以原子方式流式写入文件，在with语句中逐步写入，正常结束后替换目标文件
+    @staticmethod
+    @contextlib.contextmanager
+    def open(file_path, mode="w", newline=None, buffering=-1):
+        folder_path = os.path.dirname(os.path.abspath(file_path))
+        file_descriptor, temp_path = tempfile.mkstemp(
+            prefix=".", suffix=".tmp", dir=folder_path
+        )
+        try:
+            if "b" in mode:
+                file = os.fdopen(file_descriptor, mode, buffering=buffering)
+            else:
+                file = os.fdopen(
+                    file_descriptor,
+                    mode,
+                    buffering=buffering,
+                    encoding="utf-8",
+                    newline=newline,
+                )
+            with file:
+                yield file
+                file.flush()
+                os.fsync(file.fileno())
+            # 保留原文件的权限
+            if os.path.exists(file_path):
+                os.chmod(temp_path, os.stat(file_path).st_mode)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            # 出错时删除临时文件
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
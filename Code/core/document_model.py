@@ -0,0 +1,191 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import sys
+
+
+# 文本组记录
+# 仅包含讲述人、原文、译文三个属性，使用__slots__减少每条记录占用的内存
+# 讲述人通常在整个文档中反复出现，因此会被驻留，相同的讲述人共用同一个字符串
+class Dialog:
+    __slots__ = ("speaker", "original_text", "translated_text")
+    fields = ("speaker", "original_text", "translated_text")  # 各列对应的属性
+
+    # 构造函数
+    def __init__(self, speaker="", original_text="", translated_text=""):
+        self.speaker = sys.intern(speaker)  # 讲述人
+        self.original_text = original_text  # 原文
+        self.translated_text = translated_text  # 译文
+
+    # 由元组等可迭代对象创建
+    @classmethod
+    def from_values(cls, values):
+        return cls(*values)
+
+    # 设置某一列的文本，列号与表格的列相同
+    def set_field(self, column, text):
+        if column == 0:
+            text = sys.intern(text)
+        setattr(self, self.fields[column], text)
+
+    # 可以像元组一样按照讲述人、原文、译文的顺序解包
+    def __iter__(self):
+        return iter((self.speaker, self.original_text, self.translated_text))
+
+    def __eq__(self, other):
+        if not isinstance(other, Dialog):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Dialog{tuple(self)!r}"
+
+
+# 页面记录
+# 页面在存储中的位置由文档子类决定含义，例如文件中的字节范围或数据库中的编号
+class Page:
+    __slots__ = ("location", "dialogs", "dirty")
+
+    # 构造函数
+    def __init__(self, location=None):
+        self.location = location  # 页面在存储中的位置，新建的页面为None
+        self.dialogs = None  # 文本组列表，尚未读取或已被淘汰时为None
+        self.dirty = False  # 是否被修改过
+
+
+# 分页文档
+# 以页码为键的字典接口，页码即页面在列表中的序号加一，因此查找页面只需按下标取出
+# 在中间插入或删除页面时，其后的页面自动重新编号，无需逐一修改页码
+# 页面在被访问时才由子类的load_dialogs读取，读取后按照最近最少使用的顺序缓存
+# 被修改过的页面带有修改标记，写入前不会被淘汰，保存与显示时可以只处理被修改的页面
+class PagedDocument(MutableMapping):
+    max_cached_pages = 64  # 最多缓存的已读取页面数量
+    page_size = 100  # 估计内存时每个页面记录的大小，单位字节
+
+    # 构造函数，locations为各页面在存储中的位置，按照页面顺序排列
+    def __init__(self, locations):
+        self.pages = [Page(location) for location in locations]  # 页面列表
+        self.cache = OrderedDict()  # 已读取的未修改页面
+
+    # 读取页面的文本组，返回元组列表，由子类实现
+    def load_dialogs(self, page):
+        raise NotImplementedError
+
+    # 获取页面记录
+    def get_page(self, page_number):
+        if not isinstance(page_number, int) or not 0 < page_number <= len(self.pages):
+            raise KeyError(page_number)
+        return self.pages[page_number - 1]
+
+    # 获取页面，未加载的页面此时才读取
+    def __getitem__(self, page_number):
+        page = self.get_page(page_number)
+        if page.dialogs is None:
+            page.dialogs = [
+                Dialog.from_values(dialog) for dialog in self.load_dialogs(page)
+            ]
+        if not page.dirty:
+            self.cache[page] = None
+            self.cache.move_to_end(page)
+            self.evict()
+        return page.dialogs
+
+    # 设置页面，页码为总页数加一时添加到末尾
+    def __setitem__(self, page_number, dialogs):
+        if page_number == len(self.pages) + 1:
+            self.pages.append(Page())
+        page = self.get_page(page_number)
+        page.dialogs = [Dialog.from_values(dialog) for dialog in dialogs]
+        self.set_dirty(page)
+
+    # 删除页面，其后的页面页码减一
+    def __delitem__(self, page_number):
+        page = self.get_page(page_number)
+        del self.pages[page_number - 1]
+        self.cache.pop(page, None)
+
+    # 在某一页前插入页面，其后的页面页码加一
+    def insert_page(self, page_number, dialogs):
+        if not 0 < page_number <= len(self.pages) + 1:
+            raise KeyError(page_number)
+        page = Page()
+        page.dialogs = [Dialog.from_values(dialog) for dialog in dialogs]
+        self.pages.insert(page_number - 1, page)
+        self.set_dirty(page)
+
+    # 获取页面的文本组数量，已读取的页面直接统计，未读取的页面由count_dialogs统计
+    def get_dialog_count(self, page_number):
+        page = self.get_page(page_number)
+        if page.dialogs is not None:
+            return len(page.dialogs)
+        return self.count_dialogs(page)
+
+    # 统计未读取页面的文本组数量，子类可以不分析页面直接统计
+    def count_dialogs(self, page):
+        return len(self.load_dialogs(page))
+
+    # 判断页面是否存在，无需读取页面
+    def __contains__(self, page_number):
+        return isinstance(page_number, int) and 0 < page_number <= len(self.pages)
+
+    def __iter__(self):
+        return iter(range(1, len(self.pages) + 1))
+
+    def __len__(self):
+        return len(self.pages)
+
+    # 删除并返回最后一页，与字典的popitem相同
+    def popitem(self):
+        if not self.pages:
+            raise KeyError("popitem(): document is empty")
+        page_number = len(self.pages)
+        dialogs = self[page_number]
+        del self[page_number]
+        return page_number, dialogs
+
+    # 标记页面已被修改，在原处修改页面内容后调用，防止页面在写入前被淘汰
+    def mark_modified(self, page_number):
+        self[page_number]
+        self.set_dirty(self.get_page(page_number))
+
+    # 设置页面的修改标记
+    def set_dirty(self, page):
+        page.dirty = True
+        self.cache.pop(page, None)
+
+    # 获取被修改过的页码
+    def get_dirty_pages(self):
+        return [
+            page_number for page_number, page in enumerate(self.pages, 1) if page.dirty
+        ]
+
+    # 页面写入后清除修改标记，转为普通缓存
+    def clear_dirty(self, page_number=None):
+        pages = self.pages if page_number is None else [self.get_page(page_number)]
+        for page in pages:
+            if page.dirty:
+                page.dirty = False
+                self.cache[page] = None
+        self.evict()
+
+    # 淘汰最久未使用的页面
+    def evict(self):
+        while len(self.cache) > self.max_cached_pages:
+            page, _ = self.cache.popitem(last=False)
+            page.dialogs = None
+
+    # 淘汰所有未修改的页面，仅保留页面在存储中的位置
+    def release_pages(self):
+        for page in self.cache:
+            page.dialogs = None
+        self.cache.clear()
+
+    # 估计占用的内存，单位字节，包括页面记录与已读取的文本组
+    def get_memory_usage(self):
+        usage = len(self.pages) * self.page_size
+        for page in self.pages:
+            if page.dialogs is not None:
+                for dialog in page.dialogs:
+                    usage += sys.getsizeof(dialog) + sum(
+                        sys.getsizeof(text) for text in dialog
+                    )
+        return usage
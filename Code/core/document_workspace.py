@@ -0,0 +1,69 @@
+from collections import OrderedDict
+import os
+
+
+# 文档工作区
+# 保留最近切换离开的文档，切换回来时无需重新读取页面索引，已读取的页面与阅读位置也一并保留
+# 以文档自身估计的占用内存为准，超出预算时先将最久未使用的文档淘汰为仅含页面位置的紧凑形式，
+# 仍然超出时再移出整个文档，之后打开时重新从文件读取
+# 保留期间不监视文件，取出时比较文件状态，由调用者合并外部修改
+class DocumentWorkspace:
+    # 构造函数
+    def __init__(self, memory_budget=64 * 1024 * 1024):
+        self.memory_budget = memory_budget  # 内存预算，单位字节
+        # 保留的文档，文档地址为键，值为(文档, 页码, 文件状态)，越靠后越是最近使用
+        self.documents = OrderedDict()
+
+    # 获取文件的修改时间与大小，文件无法访问时返回None
+    @staticmethod
+    def get_file_stat(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # 判断文档是否保留在工作区中
+    def __contains__(self, file_path):
+        return file_path in self.documents
+
+    # 保留文档，需在文档的修改全部交给存储后端后调用
+    def put(self, file_path, document, page_number):
+        self.documents.pop(file_path, None)
+        self.documents[file_path] = (
+            document,
+            page_number,
+            self.get_file_stat(file_path),
+        )
+        self.trim()
+
+    # 取出文档，返回文档、页码与保留期间文件是否改变，不在工作区中时返回None
+    def take(self, file_path):
+        entry = self.documents.pop(file_path, None)
+        if entry is None:
+            return None
+        document, page_number, file_stat = entry
+        return document, page_number, self.get_file_stat(file_path) != file_stat
+
+    # 移出文档
+    def remove(self, file_path):
+        self.documents.pop(file_path, None)
+
+    # 估计保留的文档占用的内存，单位字节
+    def get_memory_usage(self):
+        return sum(
+            document.get_memory_usage() for document, _, _ in self.documents.values()
+        )
+
+    # 超出预算时，按照最近最少使用的顺序淘汰页面，仍然超出时移出文档
+    def trim(self):
+        usage = self.get_memory_usage()
+        for document, _, _ in self.documents.values():
+            if usage <= self.memory_budget:
+                return
+            usage -= document.get_memory_usage()
+            document.release_pages()
+            usage += document.get_memory_usage()
+        while usage > self.memory_budget and self.documents:
+            _, (document, _, _) = self.documents.popitem(last=False)
+            usage -= document.get_memory_usage()
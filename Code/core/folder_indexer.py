@@ -0,0 +1,82 @@
+import re
+import os
+
+
+# 文件夹索引，记录一个文件夹中的图片文件与MTM文件
+class FolderIndex:
+    # 构造函数
+    def __init__(self, folder_path, modified_time, image_paths, text_paths, names):
+        self.folder_path = folder_path  # 文件夹路径
+        self.modified_time = modified_time  # 扫描时文件夹的修改时间
+        self.image_paths = image_paths  # 图片文件路径列表，已按文件名中的数字排序
+        self.text_paths = text_paths  # MTM文件路径列表
+        self.names = names  # 图片文件与MTM文件的文件名集合，用于判断索引是否过期
+
+
+# 文件夹索引器
+# 仅遍历一次文件夹即可同时找出图片文件与MTM文件，排序用的键也在遍历时一并计算
+# 扫描结果按文件夹缓存，文件夹内增删文件会改变文件夹的修改时间，此时才会重新检查
+# 自动保存会在文件夹中写入临时文件、页面索引与日志，这些文件同样改变修改时间，
+# 因此修改时间改变后仅列出文件名，图片与MTM文件没有增删时继续使用原有索引
+class FolderIndexer:
+    image_extensions = (".png", ".jpg", ".jpeg", ".bmp", ".gif")  # 图片文件后缀
+    text_extension = ".mtm"  # MTM文件后缀
+    number_pattern = re.compile(r"\d+")  # 文件名中的数字
+
+    # 构造函数
+    def __init__(self):
+        self.indexes = {}  # 文件夹索引缓存，文件夹路径为键
+
+    # 获取文件夹索引
+    def get_index(self, folder_path):
+        folder_path = os.path.normpath(folder_path)
+        modified_time = os.stat(folder_path).st_mtime_ns
+        # 若文件夹未被修改，直接返回缓存
+        index = self.indexes.get(folder_path)
+        if index and index.modified_time == modified_time:
+            return index
+        # 仅其他文件发生变化时，更新修改时间后继续使用
+        names = self.list_names(folder_path)
+        if index and index.names == names:
+            index.modified_time = modified_time
+            return index
+        index = self.scan(folder_path, modified_time, names)
+        self.indexes[folder_path] = index
+        return index
+
+    # 列出文件夹中的图片文件与MTM文件的文件名
+    def list_names(self, folder_path):
+        with os.scandir(folder_path) as entries:
+            return frozenset(
+                entry.name
+                for entry in entries
+                if entry.name.lower().endswith(
+                    (*self.image_extensions, self.text_extension)
+                )
+            )
+
+    # 由文件名建立索引
+    def scan(self, folder_path, modified_time, names):
+        images = []
+        text_paths = []
+        for name in names:
+            file_path = os.path.normpath(os.path.join(folder_path, name))
+            if name.lower().endswith(self.image_extensions):
+                # 图片文件，同时计算排序键
+                images.append((self.get_sort_key(name), name, file_path))
+            else:
+                text_paths.append(file_path)
+        # 按排序键排序，排序键相同时按文件名排序
+        images.sort(key=lambda image: image[:2])
+        return FolderIndex(
+            folder_path,
+            modified_time,
+            [file_path for _, _, file_path in images],
+            sorted(text_paths),
+            names,
+        )
+
+    # 获取排序键，即文件名中的所有数字
+    @classmethod
+    def get_sort_key(cls, file_name):
+        return [int(number) for number in cls.number_pattern.findall(file_name)]
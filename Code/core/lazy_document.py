@@ -0,0 +1,294 @@
+import contextlib
+import json
+import zlib
+import re
+import os
+
+from core.markup_parser import MarkupParser, MarkupParseError
+from core.document_model import PagedDocument, Page, Dialog
+from core.mapped_file import MappedFile
+
+
+# 页面索引
+# 记录MTM文档中每个页面标记在文件中的字节起止位置、校验值与文本组数量，页面内容不做分析
+# 扫描结果保存在文档旁的索引文件中，文档的大小与修改时间不变时，再次打开无需重新扫描
+class PageIndex:
+    index_suffix = ".index"  # 索引文件后缀
+    index_version = 2  # 索引格式版本，格式改变后旧的索引文件需重新扫描
+    progress_interval = 1000  # 扫描时报告进度与交还内存的间隔页数
+    whitespace_pattern = re.compile(rb"\s*")  # 空白字符
+    dialog_end_tag = MarkupParser.dialog_end_tag.encode("utf-8")  # 文本组结束标记
+    page_pattern = re.compile(rb"\s*<Page(\d+)>")  # 页面开始标记，允许前面有空白
+    document_end_pattern = re.compile(
+        rb"\s*" + re.escape(MarkupParser.document_end_tag.encode("utf-8"))
+    )  # 文档结束标记，允许前面有空白
+
+    # 获取索引文件路径
+    @classmethod
+    def get_index_path(cls, file_path):
+        return file_path + cls.index_suffix
+
+    # 加载文档的页面索引，索引文件过期时重新扫描
+    # 返回(页码, 起点, 终点, 校验值, 文本组数量)的列表
+    # 若文档中没有文档标记，则返回None
+    # progress为进度回调，参数为已处理与总共的数量，扫描时调用
+    # rescan为True时不使用索引文件，用于大小与修改时间未变但内容已改变的文档
+    @classmethod
+    def load(cls, file_path, progress=None, rescan=False):
+        if not rescan:
+            stat = os.stat(file_path)
+            try:
+                with open(cls.get_index_path(file_path), "r", encoding="utf-8") as file:
+                    index = json.load(file)
+                if (
+                    index.get("version") == cls.index_version
+                    and index["size"] == stat.st_size
+                    and index["mtime_ns"] == stat.st_mtime_ns
+                ):
+                    return [tuple(entry) for entry in index["pages"]]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        entries = cls.scan(file_path, progress)
+        if entries is not None:
+            cls.save(file_path, entries)
+        return entries
+
+    # 保存页面索引，需在文档写入完成后调用
+    @classmethod
+    def save(cls, file_path, entries):
+        try:
+            stat = os.stat(file_path)
+            index = {
+                "version": cls.index_version,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "pages": entries,
+            }
+            with open(cls.get_index_path(file_path), "w", encoding="utf-8") as file:
+                json.dump(index, file, separators=(",", ":"))
+        except OSError:
+            # 索引仅用于加速，保存失败时下次重新扫描即可
+            pass
+
+    # 扫描文档，仅查找页面标记的起止位置并统计文本组结束标记的数量，不分析文本组
+    # 文件以内存映射的方式读取，扫描过的部分随即交还给系统
+    @classmethod
+    def scan(cls, file_path, progress=None):
+        with MappedFile.open(file_path) as data:
+            return cls.scan_data(data, progress)
+
+    # 扫描文档内容，data为字节或内存映射，扫描时每隔若干页报告一次进度
+    @classmethod
+    def scan_data(cls, data, progress=None):
+        size = len(data)
+        # 查找文档标记，文档标记前的内容不做处理
+        start_tag = MarkupParser.document_start_tag.encode("utf-8")
+        position = data.find(start_tag)
+        if position < 0:
+            return None
+        position += len(start_tag)
+        entries = []
+        released = 0  # 已交还给系统的位置
+        while True:
+            match = cls.page_pattern.match(data, position)
+            if not match:
+                if cls.document_end_pattern.match(data, position):
+                    if progress:
+                        progress(size, size)
+                    return entries
+                raise cls.error(data, position, "此处应为页面标记<PageXXX>")
+            start = match.start(1) - len("<Page")
+            end_tag = b"</Page" + match.group(1) + b">"
+            end = data.find(end_tag, match.end())
+            if end < 0:
+                raise cls.error(data, start, f"页面缺少结束标记{end_tag.decode()}")
+            end += len(end_tag)
+            entries.append(cls.get_entry(int(match.group(1)), start, data[start:end]))
+            position = end
+            if len(entries) % cls.progress_interval == 0:
+                if progress:
+                    progress(position, size)
+                released = MappedFile.release(data, released, start)
+
+    # 生成页面的索引条目，page_bytes为页面的原始字节
+    @classmethod
+    def get_entry(cls, page_number, start, page_bytes):
+        return (
+            page_number,
+            start,
+            start + len(page_bytes),
+            zlib.crc32(page_bytes),
+            page_bytes.count(cls.dialog_end_tag),
+        )
+
+    # 生成出错位置的错误，出错时才计算行号与列号
+    @classmethod
+    def error(cls, data, position, message):
+        position = cls.whitespace_pattern.match(data, position).end()
+        line = MappedFile.count_lines(data, position) + 1
+        line_start = data.rfind(b"\n", 0, position) + 1
+        column = len(data[line_start:position].decode("utf-8", "replace")) + 1
+        return MarkupParseError(message, line, column)
+
+
+# 惰性文档
+# 打开时仅加载页面索引，页面在被访问时才从文件中读取并分析
+# 保存时未修改的页面直接复制原始字节，仅重新生成被修改过的页面
+# 页面的位置为页面索引中的(页码, 起点, 终点, 校验值, 文本组数量)，页码为文件中页面标记上的编号
+class LazyDocument(PagedDocument):
+    # 构造函数
+    def __init__(self, file_path, entries, parser):
+        super().__init__(entries)
+        self.file_path = file_path  # 文档地址
+        self.parser = parser  # 解析器
+        self.source = None  # 尚未写入文件的文档内容，写入完成前从此处读取页面
+        self.source_generation = None  # 该内容对应的日志代数
+
+    # 从文件中读取并分析页面
+    def load_dialogs(self, page):
+        page_bytes = self.read_page_bytes(page)
+        # 校验值不符说明文档已被外部修改，重新扫描后再读取
+        # 索引文件可能仍与文档的大小与修改时间相符，因此不使用索引文件
+        if zlib.crc32(page_bytes) != page.location[3]:
+            entries = PageIndex.load(self.file_path, rescan=True)
+            if not entries:
+                raise MarkupParseError("文档中没有页面标记", 1, 1)
+            self.reindex(entries)
+            if page not in self.pages or page.location is None:
+                raise KeyError("页面已被外部删除")
+            return self.load_dialogs(page)
+        return self.parser.parse_page(page_bytes.decode("utf-8"))
+
+    # 统计未读取页面的文本组数量，直接使用页面索引中记录的数量
+    def count_dialogs(self, page):
+        return page.location[4]
+
+    # 读取页面的原始字节
+    def read_page_bytes(self, page, file=None):
+        _, start, end = page.location[:3]
+        source = self.source
+        if source is not None:
+            return source[start:end]
+        if file:
+            file.seek(start)
+            return file.read(end - start)
+        with open(self.file_path, "rb") as file:
+            file.seek(start)
+            return file.read(end - start)
+
+    # 生成文档内容，返回字节内容与新的页面索引
+    def serialize(self):
+        start_tag = f"{self.parser.document_start_tag}\n".encode("utf-8")
+        end_tag = f"\n{self.parser.document_end_tag}".encode("utf-8")
+        parts = [start_tag]
+        entries = []
+        position = len(start_tag)
+        # 内容尚未写入文件时无需打开文件
+        if self.source is None:
+            context = open(self.file_path, "rb")
+        else:
+            context = contextlib.nullcontext()
+        with context as file:
+            for page_number, page in enumerate(self.pages, 1):
+                if page.dirty or page.location is None:
+                    # 重新生成的页面文本以制表符开头，去掉后即为页面标记
+                    text = self.parser.generate_page(page_number, self[page_number])
+                    page_bytes = text[1:].encode("utf-8")
+                else:
+                    page_bytes = self.read_page_bytes(page, file)
+                    # 页码因插入或删除页面而改变时，仅替换页面标记
+                    if page.location[0] != page_number:
+                        page_bytes = (
+                            f"<Page{page_number:03}>".encode("utf-8")
+                            + page_bytes[
+                                page_bytes.index(b">")
+                                + 1 : page_bytes.rindex(b"</Page")
+                            ]
+                            + f"</Page{page_number:03}>".encode("utf-8")
+                        )
+                # 页面之间以换行符分隔，每页前有一个制表符
+                if entries:
+                    parts.append(b"\n")
+                    position += 1
+                parts.append(b"\t")
+                parts.append(page_bytes)
+                start = position + 1
+                position = start + len(page_bytes)
+                entries.append(PageIndex.get_entry(page_number, start, page_bytes))
+        parts.append(end_tag)
+        return b"".join(parts), entries
+
+    # 保存后，以新生成的内容作为页面来源，并清除修改标记
+    def rebase(self, content, entries, generation):
+        self.source = content
+        self.source_generation = generation
+        for page, entry in zip(self.pages, entries):
+            page.location = entry
+        self.clear_dirty()
+
+    # 内容写入文件后，改为从文件中读取页面，可由写入线程调用
+    def release_source(self, generation):
+        if generation == self.source_generation:
+            self.source = None
+
+    # 估计占用的内存，尚未写入文件的文档内容也计算在内
+    def get_memory_usage(self):
+        usage = super().get_memory_usage()
+        source = self.source
+        if source is not None:
+            usage += len(source)
+        return usage
+
+    # 文档被外部修改后，按照新的页面索引逐页比较校验值，返回内容改变的页码
+    # 被修改过的页面以本地修改为准，不会被覆盖
+    # 先分析正在使用的已改变页面再更新，分析出错时不会留下更新了一半的数据
+    def reindex(self, entries):
+        self.source = None
+        plan = []  # 更新后的页面，以及对应的位置与内容是否改变
+        changed_pages = set()
+        reloaded_dialogs = {}
+        with open(self.file_path, "rb") as file:
+            for index in range(max(len(self.pages), len(entries))):
+                page = self.pages[index] if index < len(self.pages) else None
+                entry = entries[index] if index < len(entries) else None
+                # 本地修改过的页面保持不变
+                if page is not None and page.dirty:
+                    plan.append((page, entry, False))
+                    continue
+                changed = (
+                    page is None
+                    or entry is None
+                    or page.location is None
+                    or page.location[3] != entry[3]
+                )
+                if changed:
+                    changed_pages.add(index + 1)
+                # 外部删除的页面
+                if entry is None:
+                    continue
+                if page is None:
+                    page = Page()
+                elif changed and page in self.cache:
+                    # 正在使用的页面立即重新分析
+                    _, start, end = entry[:3]
+                    file.seek(start)
+                    reloaded_dialogs[page] = self.parser.parse_page(
+                        file.read(end - start).decode("utf-8")
+                    )
+                plan.append((page, entry, changed))
+        # 全部分析成功后再更新
+        for page, entry, changed in plan:
+            page.location = entry
+            if changed:
+                page.dialogs = None
+                self.cache.pop(page, None)
+            if page in reloaded_dialogs:
+                page.dialogs = [
+                    Dialog.from_values(dialog) for dialog in reloaded_dialogs[page]
+                ]
+                self.cache[page] = None
+        self.pages = [page for page, _, _ in plan]
+        # 被删除的页面不再缓存
+        for page in set(self.cache) - set(self.pages):
+            self.cache.pop(page)
+        return changed_pages
@@ -0,0 +1,52 @@
+import contextlib
+import codecs
+import mmap
+import os
+
+
+# 内存映射文件
+# 以只读方式映射整个文件，查找与正则匹配直接在映射上进行，不把文件内容复制到内存中
+# 已处理过的部分可以交还给系统，使常驻内存不随文件大小增长
+# 映射仅在with语句中有效，结束后立即关闭，防止在Windows上阻止自动保存替换文件
+class MappedFile:
+    chunk_size = 1024 * 1024  # 逐块解码时每块的大小
+
+    # 映射文件，空文件无法映射，返回空字节
+    @staticmethod
+    @contextlib.contextmanager
+    def open(file_path):
+        with open(file_path, "rb") as file:
+            if not os.fstat(file.fileno()).st_size:
+                yield b""
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    # 将start到end之间已处理完的部分交还给系统，返回下次开始的位置，不是映射时不做处理
+    # 只读映射的内容再次访问时会重新从文件读取，因此不影响结果
+    @staticmethod
+    def release(mapped, start, end):
+        end -= end % mmap.PAGESIZE
+        if end <= start or not hasattr(mmap, "MADV_DONTNEED"):
+            return start
+        if isinstance(mapped, mmap.mmap):
+            mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return end
+
+    # 统计某个位置之前的换行符数量，逐块统计，不复制整个文件
+    @classmethod
+    def count_lines(cls, mapped, position):
+        count = 0
+        for start in range(0, position, cls.chunk_size):
+            count += mapped[start : min(start + cls.chunk_size, position)].count(b"\n")
+        return count
+
+    # 逐块解码为文本，分析器每次只持有一块文本
+    @classmethod
+    def iter_text(cls, mapped):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        released = 0
+        for start in range(0, len(mapped), cls.chunk_size):
+            end = start + cls.chunk_size
+            yield decoder.decode(mapped[start:end], end >= len(mapped))
+            released = cls.release(mapped, released, end)
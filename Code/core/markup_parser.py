@@ -0,0 +1,307 @@
+import csv
+import io
+import re
+
+from core.profiler import Profiler
+
+
+# 标记分析错误，记录出错位置的行号与列号
+class MarkupParseError(ValueError):
+    def __init__(self, message, line, column):
+        super().__init__(f"第{line}行第{column}列：{message}")
+        self.message = message  # 错误信息
+        self.line = line  # 行号，从1开始
+        self.column = column  # 列号，从1开始
+
+
+# 标记分词器
+# 从文本块的迭代器中逐块读取内容，仅保留尚未处理的部分，并记录当前位置的行号与列号
+# 查找标记时使用str.find，每个字符只会被检查常数次，因此分析时间与文本长度成正比
+class MarkupTokenizer:
+    non_whitespace_pattern = re.compile(r"\S")  # 非空白字符
+
+    # 构造函数
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)  # 文本块迭代器
+        self.buffer = ""  # 已读取但尚未处理的文本
+        self.pos = 0  # 当前位置在缓冲区中的下标
+        self.line = 1  # 当前位置的行号
+        self.column = 1  # 当前位置的列号
+
+    # 读取下一个文本块，若已读取完毕则返回False
+    def fill(self):
+        for chunk in self.chunks:
+            if chunk:
+                # 丢弃已处理的部分
+                self.buffer = self.buffer[self.pos :] + chunk
+                self.pos = 0
+                return True
+        return False
+
+    # 确保缓冲区中至少还有length个字符未处理，若文本不足则返回False
+    def ensure(self, length):
+        while len(self.buffer) - self.pos < length:
+            if not self.fill():
+                return False
+        return True
+
+    # 判断当前位置是否以某段文本开头
+    def startswith(self, text):
+        self.ensure(len(text))
+        return self.buffer.startswith(text, self.pos)
+
+    # 从当前位置开始查找某段文本，返回其相对当前位置的距离，找不到则返回-1
+    def find(self, text):
+        searched_length = 0
+        while True:
+            index = self.buffer.find(text, self.pos + searched_length)
+            if index >= 0:
+                return index - self.pos
+            # 下次从可能跨越文本块的位置继续查找
+            searched_length = max(0, len(self.buffer) - self.pos - len(text) + 1)
+            if not self.fill():
+                return -1
+
+    # 处理若干个字符，返回被处理的文本
+    def advance(self, length):
+        text = self.buffer[self.pos : self.pos + length]
+        self.pos += length
+        # 更新行号与列号
+        newline_count = text.count("\n")
+        if newline_count:
+            self.line += newline_count
+            self.column = len(text) - text.rfind("\n")
+        else:
+            self.column += len(text)
+        return text
+
+    # 跳过空白字符，若已到达文本末尾则返回False
+    def skip_whitespace(self):
+        while True:
+            match = self.non_whitespace_pattern.search(self.buffer, self.pos)
+            if match:
+                self.advance(match.start() - self.pos)
+                return True
+            self.advance(len(self.buffer) - self.pos)
+            if not self.fill():
+                return False
+
+    # 生成当前位置的错误
+    def error(self, message, line=None, column=None):
+        return MarkupParseError(message, line or self.line, column or self.column)
+
+
+# 标记分析器
+# 文档标记，由软件自身创建的适用于漫画对话管理的文本文档的标记，仅会存在一个：<MangaTextManager>内容物</MangaTextManager>
+# 页面标记，用于标记每页文本内容的标记：<PageXXX>内容物</PageXXX>
+# 文本组标记，用于标记每句文本内容的标记：<Dialog Speaker="">内容物</Dialog>
+# 分析时逐块读取文本并逐页生成结果，标记格式有误时抛出带有行号与列号的MarkupParseError
+class MarkupParser:
+    document_start_tag = "<MangaTextManager>"  # 文档开始标记
+    document_end_tag = "</MangaTextManager>"  # 文档结束标记
+    dialog_start_tag = '<Dialog Speaker="'  # 文本组开始标记的前半部分
+    dialog_end_tag = "</Dialog>"  # 文本组结束标记
+    page_tag_pattern = re.compile(r"<Page(\d+)>")  # 页面开始标记
+    dialog_pattern = re.compile(
+        r'<Dialog Speaker="([^"]*)">(.*?)</Dialog>', re.DOTALL
+    )  # 完整的文本组标记，非贪婪匹配在第一个结束标记处停止
+    chunk_size = 1024 * 1024  # 从文件中读取时每块的大小
+    csv_header = [
+        "PageNumber",
+        "Speaker",
+        "OriginalText",
+        "TranslatedText",
+    ]  # CSV文件的表头
+
+    # 构造函数，传入为空的文本使用的预设内容
+    def __init__(
+        self,
+        default_speaker="未知",
+        default_original_text="原文",
+        default_translated_text="译文",
+    ):
+        self.default_speaker = default_speaker
+        self.default_original_text = default_original_text
+        self.default_translated_text = default_translated_text
+
+    # 分析文档标记，返回页面列表，若文本中没有文档标记则返回空列表
+    @Profiler.trace
+    def parse_doucument(self, text):
+        return list(self.iter_pages(text))
+
+    # 逐页分析文档，source可以是字符串、文件对象或文本块的迭代器
+    # 每分析完一页即返回该页的页码与文本组
+    def iter_pages(self, source):
+        tokenizer = MarkupTokenizer(self.iter_chunks(source))
+        yield from self.iter_page_tokens(tokenizer)
+
+    # 分析单个页面的文本，返回文本组
+    @Profiler.trace
+    def parse_page(self, text):
+        tokenizer = MarkupTokenizer([text])
+        if not tokenizer.skip_whitespace() or not tokenizer.startswith("<Page"):
+            raise tokenizer.error("此处应为页面标记<PageXXX>")
+        return self.read_page(tokenizer)[1]
+
+    # 将来源转换为文本块的迭代器
+    def iter_chunks(self, source):
+        if isinstance(source, str):
+            yield source
+        elif hasattr(source, "read"):
+            yield from iter(lambda: source.read(self.chunk_size), "")
+        else:
+            yield from source
+
+    # 逐页分析，返回页码与文本组
+    def iter_page_tokens(self, tokenizer):
+        # 查找文档标记，文档标记前的内容不做处理
+        index = tokenizer.find(self.document_start_tag)
+        if index < 0:
+            return
+        tokenizer.advance(index + len(self.document_start_tag))
+        # 逐页分析
+        while True:
+            if not tokenizer.skip_whitespace():
+                raise tokenizer.error(f"文档缺少结束标记{self.document_end_tag}")
+            if tokenizer.startswith(self.document_end_tag):
+                return
+            if not tokenizer.startswith("<Page"):
+                raise tokenizer.error("此处应为页面标记<PageXXX>")
+            yield self.read_page(tokenizer)
+
+    # 读取页面标记，当前位置应为页面开始标记
+    def read_page(self, tokenizer):
+        line, column = tokenizer.line, tokenizer.column
+        # 读取页面开始标记
+        index = tokenizer.find(">")
+        match = self.page_tag_pattern.fullmatch(
+            tokenizer.buffer, tokenizer.pos, tokenizer.pos + index + 1
+        )
+        if index < 0 or not match:
+            raise tokenizer.error("无效的页面标记")
+        page_end_tag = f"</Page{match.group(1)}>"
+        tokenizer.advance(index + 1)
+        # 逐个读取文本组
+        dialogs = []
+        while True:
+            if not tokenizer.skip_whitespace():
+                raise tokenizer.error(f"页面缺少结束标记{page_end_tag}", line, column)
+            if tokenizer.startswith(self.dialog_start_tag):
+                dialogs.append(self.read_dialog(tokenizer))
+            elif tokenizer.startswith(page_end_tag):
+                tokenizer.advance(len(page_end_tag))
+                return int(match.group(1)), dialogs
+            else:
+                raise tokenizer.error(f"此处应为文本组标记或页面结束标记{page_end_tag}")
+
+    # 读取文本组标记，当前位置应为文本组开始标记
+    def read_dialog(self, tokenizer):
+        # 缓冲区中已有完整的文本组时，一次匹配即可取出讲述人与具体文本
+        match = self.dialog_pattern.match(tokenizer.buffer, tokenizer.pos)
+        if match is None and tokenizer.find(self.dialog_end_tag) >= 0:
+            match = self.dialog_pattern.match(tokenizer.buffer, tokenizer.pos)
+        if match:
+            tokenizer.advance(match.end() - tokenizer.pos)
+            return self.split_dialog(match.group(1).strip(), match.group(2))
+        # 否则逐段读取，以便报告出错位置
+        line, column = tokenizer.line, tokenizer.column
+        tokenizer.advance(len(self.dialog_start_tag))
+        # 获取讲述人
+        index = tokenizer.find('"')
+        if index < 0:
+            raise tokenizer.error("文本组标记的讲述人缺少结束引号", line, column)
+        speaker = tokenizer.advance(index).strip()
+        if not tokenizer.startswith('">'):
+            raise tokenizer.error('文本组标记的讲述人后应为">')
+        tokenizer.advance(2)
+        # 获取具体文本
+        index = tokenizer.find(self.dialog_end_tag)
+        if index < 0:
+            raise tokenizer.error(
+                f"文本组缺少结束标记{self.dialog_end_tag}", line, column
+            )
+        content = tokenizer.advance(index)
+        tokenizer.advance(len(self.dialog_end_tag))
+        return self.split_dialog(speaker, content)
+
+    # 拆分文本组的具体文本
+    def split_dialog(self, speaker, content):
+        # 以换行符为分隔符拆分为列表
+        lines = content.strip().split("\n")
+        # 正常情况下一个文本组应该包括两个文本，分别是原文本与翻译文本
+        if len(lines) == 2:
+            original_text, translated_text = lines
+        # 若非正常状况，则只获取原文本，不做错误捕获处理
+        else:
+            original_text, translated_text = lines[0], ""
+        # 整合为元组，包括讲述人、原文、译文
+        return (speaker, original_text.strip(), translated_text.strip())
+
+    # 生成文档
+    def generate_document(self, pages):
+        # 生成各页面文本后拼接为文档
+        return self.assemble_document(
+            [self.generate_page(page_number, dialogs) for page_number, dialogs in pages]
+        )
+
+    # 拼接文档，传入已生成好的页面文本列表
+    def assemble_document(self, page_texts):
+        # 生成文档文本
+        content = "\n".join(page_texts)
+        # 返回格式化后的文档文本
+        return f"<MangaTextManager>\n{content}\n</MangaTextManager>"
+
+    # 生成页面
+    def generate_page(self, page_number, dialogs):
+        # 生成页面文本
+        content = "\n".join(
+            [
+                self.generate_dialog(speaker, original_text, translated_text)
+                for speaker, original_text, translated_text in dialogs
+            ]
+        )
+        # 返回格式化后的页面文本
+        return f"\t<Page{page_number:03}>\n{content}\n\t</Page{page_number:03}>"
+
+    # 生成对话组
+    def generate_dialog(self, speaker, original_text, translated_text):
+        # 检查文本是否为空
+        speaker, original_text, translated_text = self.fill_defaults(
+            speaker, original_text, translated_text
+        )
+        # 返回格式化后的对话组文本
+        return f'\t\t<Dialog Speaker="{speaker}">\n\t\t\t{original_text}\t\t\t\n\t\t\t{translated_text}\t\t\t\n\t\t</Dialog>'
+
+    # 为空的文本使用预设内容
+    def fill_defaults(self, speaker, original_text, translated_text):
+        if not speaker:
+            speaker = self.default_speaker
+        if not original_text:
+            original_text = self.default_original_text
+        if not translated_text:
+            translated_text = self.default_translated_text
+        return speaker, original_text, translated_text
+
+    # 生成CSV文本，每个文本组为一行
+    def generate_csv(self, pages):
+        file = io.StringIO()
+        writer = csv.writer(file)
+        # 表头
+        writer.writerow(self.csv_header)
+        # 内容
+        for page_number, dialogs in pages:
+            for dialog in dialogs:
+                writer.writerow([page_number, *self.fill_defaults(*dialog)])
+        return file.getvalue()
+
+    # 逐页分析CSV文本，source为文件对象或行的迭代器，返回页码与文本组
+    # 页面按照页码首次出现的顺序排列，同一页的文本组保持原有顺序
+    def iter_csv_pages(self, source):
+        pages = {}
+        for row_number, row in enumerate(csv.reader(source), 1):
+            if row_number == 1 and row == self.csv_header:
+                continue
+            if len(row) != len(self.csv_header) or not row[0].strip().isdigit():
+                raise MarkupParseError("CSV行的格式有误", row_number, 1)
+            pages.setdefault(int(row[0]), []).append(tuple(row[1:]))
+        yield from pages.items()
@@ -0,0 +1,268 @@
+import json
+import time
+import zlib
+import os
+
+from core.atomic_file import AtomicFile
+
+
+# 预写日志
+# 每次修改都会以一行JSON的形式追加到文档旁的日志文件中，例如：
+# {"op": "set", "page": 3, "dialogs": [["讲述人", "原文", "译文"]], "seq": 7}
+# {"op": "remove", "page": 12, "seq": 8}
+# 每条记录带有递增的序号，自动保存器写入文档前会将当前日志轮换为带编号的旧日志，写入成功后再删除这些旧日志
+# 打开文档时会按顺序重放旧日志与当前日志，因此程序中途被关闭也不会丢失修改
+# 写入前另外记录即将写入的内容的大小、校验值与其中最后一条记录的序号，
+# 若文档已写入但旧日志尚未删除时程序被关闭，打开时据此判断文档已包含哪些记录，
+# 不大于该序号的记录不再重放，防止插入与删除页面被重复应用
+class MtmJournal:
+    # 构造函数
+    def __init__(self):
+        self.document_path = None  # 当前文档地址
+        self.file = None  # 当前日志文件
+        self.generation = 0  # 已轮换的最新日志编号
+        self.record_count = 0  # 当前日志中的记录数量
+        self.sequence = 0  # 最后一条记录的序号
+        self.unsynced_count = 0  # 尚未同步到磁盘的记录数量
+        self.last_sync_time = 0.0  # 上次同步到磁盘的时间
+        self.sync_batch = 32  # 每积攒多少条记录同步一次
+        self.sync_interval = 1.0  # 距离上次同步超过多少秒后同步一次
+
+    # 获取日志地址
+    @staticmethod
+    def get_journal_path(document_path):
+        return document_path + ".journal"
+
+    # 获取旧日志地址
+    @staticmethod
+    def get_rotated_path(document_path, generation):
+        return f"{document_path}.journal.{generation}"
+
+    # 获取文档旁所有旧日志的编号，从小到大排列
+    @staticmethod
+    def list_generations(document_path):
+        folder_path = os.path.dirname(os.path.abspath(document_path))
+        prefix = os.path.basename(document_path) + ".journal."
+        generations = []
+        for file_name in os.listdir(folder_path):
+            if file_name.startswith(prefix) and file_name[len(prefix) :].isdigit():
+                generations.append(int(file_name[len(prefix) :]))
+        return sorted(generations)
+
+    # 获取写入标记地址
+    @staticmethod
+    def get_marker_path(document_path):
+        return document_path + ".journal.written"
+
+    # 记录即将写入文档的内容对应的旧日志编号与最后一条记录的序号，需在替换文档之前调用
+    @classmethod
+    def mark_written(cls, document_path, generation, sequence, content):
+        marker = {
+            "generation": generation,
+            "sequence": sequence,
+            "size": len(content),
+            "crc": zlib.crc32(content),
+        }
+        AtomicFile.write(cls.get_marker_path(document_path), json.dumps(marker))
+
+    # 处理上次写入留下的标记，若文档已是标记中的内容，则删除已写入文档的旧日志
+    # 返回文档已包含的最后一条记录的序号，文档不包含任何记录时返回0
+    @classmethod
+    def resolve_written(cls, document_path):
+        marker_path = cls.get_marker_path(document_path)
+        try:
+            with open(marker_path, "r", encoding="utf-8") as file:
+                marker = json.load(file)
+            generation, size, crc = marker["generation"], marker["size"], marker["crc"]
+            sequence = marker.get("sequence", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            # 没有标记，或标记本身没有写完，此时文档尚未被替换
+            if os.path.exists(marker_path):
+                os.remove(marker_path)
+            return 0
+        if cls.get_file_crc(document_path, size) != crc:
+            os.remove(marker_path)
+            return 0
+        try:
+            cls.discard(document_path, generation)
+        except OSError:
+            # 旧日志无法删除时保留标记，重放时按照序号跳过已写入文档的记录
+            pass
+        return sequence
+
+    # 计算文件的校验值，大小不符时返回None
+    @staticmethod
+    def get_file_crc(file_path, size):
+        try:
+            if os.path.getsize(file_path) != size:
+                return None
+            crc = 0
+            with open(file_path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    crc = zlib.crc32(chunk, crc)
+            return crc
+        except OSError:
+            return None
+
+    # 打开文档对应的日志，返回需要重放的记录
+    def open(self, document_path):
+        # 打开前关闭旧日志
+        self.close()
+        self.document_path = document_path
+        # 已写入文档的旧日志不再重放
+        written_sequence = self.resolve_written(document_path)
+        # 读取旧日志与当前日志中的记录
+        generations = self.list_generations(document_path)
+        records = []
+        for generation in generations:
+            records.extend(
+                self.read_records(self.get_rotated_path(document_path, generation))
+            )
+        journal_path = self.get_journal_path(document_path)
+        records.extend(self.read_records(journal_path))
+        self.generation = generations[-1] if generations else 0
+        # 新的记录接着已有的序号编号
+        self.sequence = max(
+            [written_sequence] + [record.get("seq", 0) for record in records]
+        )
+        # 跳过已写入文档的记录，没有序号的旧记录总是重放
+        records = [
+            record
+            for record in records
+            if "seq" not in record or record["seq"] > written_sequence
+        ]
+        # 打开当前日志，若其中已有记录，则先轮换，以便下次写入文档后一并删除
+        self.file = open(journal_path, "a", encoding="utf-8")
+        self.record_count = 1 if self.file.tell() else 0
+        self.rotate()
+        return records
+
+    # 读取日志文件中的记录
+    @staticmethod
+    def read_records(journal_path):
+        records = []
+        if not os.path.exists(journal_path):
+            return records
+        with open(journal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # 程序中断时最后一行可能不完整，忽略即可
+                    break
+        return records
+
+    # 关闭日志
+    def close(self):
+        if self.file:
+            self.sync()
+            self.file.close()
+            # 若当前日志为空，则删除
+            if not self.record_count:
+                journal_path = self.get_journal_path(self.document_path)
+                if os.path.exists(journal_path):
+                    os.remove(journal_path)
+        self.file = None
+        self.document_path = None
+        self.record_count = 0
+
+    # 记录页面内容
+    def append_page(self, page_number, dialogs):
+        self.append(
+            {
+                "op": "set",
+                "page": page_number,
+                "dialogs": [list(dialog) for dialog in dialogs],
+            }
+        )
+
+    # 记录页面插入
+    def append_insertion(self, page_number, dialogs):
+        self.append(
+            {
+                "op": "insert",
+                "page": page_number,
+                "dialogs": [list(dialog) for dialog in dialogs],
+            }
+        )
+
+    # 记录页面删除
+    def append_removal(self, page_number):
+        self.append({"op": "remove", "page": page_number})
+
+    # 追加一条记录，并为其分配序号
+    def append(self, record):
+        # 判断日志是否已打开
+        if not self.file:
+            return
+        self.sequence += 1
+        record["seq"] = self.sequence
+        # 写入一行，并交给操作系统，这样即便程序被强行关闭，记录也不会丢失
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.record_count += 1
+        self.unsynced_count += 1
+        # 批量同步到磁盘，防止断电丢失
+        if (
+            self.unsynced_count >= self.sync_batch
+            or time.monotonic() - self.last_sync_time >= self.sync_interval
+        ):
+            self.sync()
+
+    # 同步到磁盘
+    def sync(self):
+        if self.file and self.unsynced_count:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.unsynced_count = 0
+        self.last_sync_time = time.monotonic()
+
+    # 轮换日志，返回最新的旧日志编号
+    # 写入文档前调用，写入成功后应调用discard删除不大于该编号的旧日志
+    def rotate(self):
+        # 当前日志为空时无需轮换
+        if not self.file or not self.record_count:
+            return self.generation
+        self.sync()
+        self.file.close()
+        self.generation += 1
+        journal_path = self.get_journal_path(self.document_path)
+        os.replace(
+            journal_path, self.get_rotated_path(self.document_path, self.generation)
+        )
+        self.file = open(journal_path, "a", encoding="utf-8")
+        self.record_count = 0
+        return self.generation
+
+    # 删除不大于某编号的旧日志与写入标记，文档写入成功后由写入线程调用
+    @classmethod
+    def discard(cls, document_path, generation):
+        for old_generation in cls.list_generations(document_path):
+            if old_generation <= generation:
+                os.remove(cls.get_rotated_path(document_path, old_generation))
+        marker_path = cls.get_marker_path(document_path)
+        if os.path.exists(marker_path):
+            os.remove(marker_path)
+
+    # 将记录应用到文档中，返回受影响的页码
+    # 插入与删除页面会使其后的页面重新编号，因此记录需要按顺序应用
+    # 已写入文档的记录在打开日志时已按序号跳过，此处的记录均尚未应用
+    @staticmethod
+    def replay(records, data):
+        page_numbers = set()
+        for record in records:
+            page_number = record.get("page")
+            try:
+                if record.get("op") == "set":
+                    data[page_number] = record["dialogs"]
+                elif record.get("op") == "insert":
+                    data.insert_page(page_number, record["dialogs"])
+                elif record.get("op") == "remove":
+                    del data[page_number]
+                else:
+                    continue
+            except KeyError:
+                # 与文档对不上的记录直接跳过
+                continue
+            page_numbers.add(page_number)
+        return page_numbers
@@ -0,0 +1,65 @@
+import csv
+
+from core.markup_parser import MarkupParseError
+from core.atomic_file import AtomicFile
+from core.mapped_file import MappedFile
+
+
+# 逐页读写MTM文档与CSV文件
+# 读写均为逐页流式处理，内存占用与文档大小无关，界面的导出与批处理工具共用
+class PageIO:
+    text_extension = ".mtm"  # MTM文件后缀
+    csv_extension = ".csv"  # CSV文件后缀
+    buffer_size = 1024 * 1024  # 写入时的缓冲区大小
+
+    # 判断是否为CSV文件
+    @classmethod
+    def is_csv(cls, file_path):
+        return file_path.lower().endswith(cls.csv_extension)
+
+    # 逐页读取文档，返回页码与文本组
+    # MTM文档以内存映射的方式读取，逐块解码后交给分析器，读过的部分随即交还给系统
+    # CSV文件逐行读取本就不会复制整个文件，仍使用普通的文件对象
+    @classmethod
+    def read_pages(cls, parser, file_path):
+        if cls.is_csv(file_path):
+            with open(file_path, "r", encoding="utf-8", newline="") as file:
+                yield from parser.iter_csv_pages(file)
+        else:
+            with MappedFile.open(file_path) as data:
+                # 分析器会跳过没有文档标记的文本，逐页读取时视为格式错误
+                if data.find(parser.document_start_tag.encode("utf-8")) < 0:
+                    raise MarkupParseError(
+                        f"文档缺少开始标记{parser.document_start_tag}", 1, 1
+                    )
+                yield from parser.iter_pages(MappedFile.iter_text(data))
+
+    # 逐页写入文档，返回页数与文本组数量
+    @classmethod
+    def write_pages(cls, parser, file_path, pages):
+        page_count = dialog_count = 0
+        if cls.is_csv(file_path):
+            with AtomicFile.open(
+                file_path, newline="", buffering=cls.buffer_size
+            ) as file:
+                writer = csv.writer(file)
+                writer.writerow(parser.csv_header)
+                for page_number, dialogs in pages:
+                    writer.writerows(
+                        [page_number, *parser.fill_defaults(*dialog)]
+                        for dialog in dialogs
+                    )
+                    page_count += 1
+                    dialog_count += len(dialogs)
+        else:
+            # 与解析器拼接文档的格式一致
+            with AtomicFile.open(file_path, buffering=cls.buffer_size) as file:
+                file.write(f"{parser.document_start_tag}\n")
+                for page_number, dialogs in pages:
+                    if page_count:
+                        file.write("\n")
+                    file.write(parser.generate_page(page_number, dialogs))
+                    page_count += 1
+                    dialog_count += len(dialogs)
+                file.write(f"\n{parser.document_end_tag}")
+        return page_count, dialog_count
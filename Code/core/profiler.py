@@ -0,0 +1,131 @@
+import collections
+import threading
+import functools
+import json
+import time
+import os
+
+from core.atomic_file import AtomicFile
+
+
+# 性能分析器
+# 以装饰器记录函数每次调用的耗时，按函数统计次数与耗时分布，并保留最近的记录
+# 记录可以导出为Chrome的trace格式，在chrome://tracing或Perfetto中按时间轴查看
+# 仅在启动前设置了环境变量MTM_PROFILE时启用，未启用时装饰器直接返回原函数，没有任何额外开销
+class Profiler:
+    enabled = bool(os.environ.get("MTM_PROFILE"))  # 是否启用
+    max_events = 100000  # 保留的最近记录数量
+    bucket_count = 24  # 耗时分布的区间数量，第i个区间为[2^i, 2^(i+1))微秒
+    lock = threading.Lock()  # 记录可能来自多个线程
+    # 最近的记录，(名称, 开始时间, 耗时, 线程)，单位纳秒
+    events = collections.deque(maxlen=max_events)
+    stats = {}  # 每个函数的统计，名称为键，值为[次数, 总耗时, 最大耗时, 区间计数]
+    origin = time.perf_counter_ns()  # 计时起点
+
+    # 装饰器，记录函数的耗时，名称为函数的限定名
+    @classmethod
+    def trace(cls, function):
+        if not cls.enabled:
+            return function
+        name = function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                cls.record(name, start, time.perf_counter_ns() - start)
+
+        return wrapper
+
+    # 记录一次调用
+    @classmethod
+    def record(cls, name, start, duration):
+        bucket = min((duration // 1000).bit_length(), cls.bucket_count) - 1
+        with cls.lock:
+            cls.events.append((name, start, duration, threading.get_ident()))
+            stats = cls.stats.get(name)
+            if stats is None:
+                stats = cls.stats[name] = [0, 0, 0, [0] * cls.bucket_count]
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            stats[3][max(bucket, 0)] += 1
+
+    # 清空记录
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.events.clear()
+            cls.stats.clear()
+
+    # 由耗时分布估计分位数，返回所在区间的上界，单位毫秒，汇总时不超过最大耗时
+    @staticmethod
+    def get_percentile(buckets, fraction):
+        target = fraction * sum(buckets)
+        count = 0
+        for index, bucket in enumerate(buckets):
+            count += bucket
+            if count >= target:
+                return 2 ** (index + 1) / 1000
+        return 2 ** len(buckets) / 1000
+
+    # 汇总每个函数的次数、平均、中位数、95分位与最大耗时，单位毫秒，按总耗时降序排列
+    @classmethod
+    def get_summary(cls):
+        with cls.lock:
+            stats = {
+                name: (count, total, maximum, list(buckets))
+                for name, (count, total, maximum, buckets) in cls.stats.items()
+            }
+        summary = []
+        for name, (count, total, maximum, buckets) in sorted(
+            stats.items(), key=lambda item: item[1][1], reverse=True
+        ):
+            summary.append(
+                {
+                    "name": name,
+                    "count": count,
+                    "total_ms": total / 1e6,
+                    "mean_ms": total / count / 1e6,
+                    "p50_ms": min(cls.get_percentile(buckets, 0.5), maximum / 1e6),
+                    "p95_ms": min(cls.get_percentile(buckets, 0.95), maximum / 1e6),
+                    "max_ms": maximum / 1e6,
+                    "histogram_us": buckets,
+                }
+            )
+        return summary
+
+    # 生成一行汇总文字，显示总耗时最多的若干函数的次数、中位数与95分位
+    @classmethod
+    def format_summary(cls, limit=4):
+        return "  ".join(
+            f"{item['name'].split('.')[-1]}×{item['count']} "
+            f"p50≤{item['p50_ms']:.3g}ms p95≤{item['p95_ms']:.3g}ms "
+            f"max {item['max_ms']:.3g}ms"
+            for item in cls.get_summary()[:limit]
+        )
+
+    # 导出为Chrome的trace格式，汇总与耗时分布放在附加数据中
+    @classmethod
+    def export_trace(cls, file_path):
+        with cls.lock:
+            events = list(cls.events)
+        process_id = os.getpid()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - cls.origin) / 1000,
+                    "dur": duration / 1000,
+                    "pid": process_id,
+                    "tid": thread_id,
+                }
+                for name, start, duration, thread_id in events
+            ],
+            "displayTimeUnit": "ms",
+            "otherData": {"summary": cls.get_summary()},
+        }
+        AtomicFile.write(file_path, json.dumps(trace, ensure_ascii=False))
@@ -0,0 +1,217 @@
+import sqlite3
+import time
+import os
+
+from core.markup_parser import MarkupParser, MarkupParseError
+
+
+# 项目索引
+# 将一个文件夹及其子文件夹中的所有MTM文档索引到文件夹下的数据库中，以便在整个系列中查找
+# 每个文档记录大小与修改时间，更新时只重新索引新增或改变的文档，并移除已被删除的文档
+# 文本使用FTS5的三字词元索引，中文与日文无需分词，三个字及以上的查询直接由索引得出结果
+# 更短的查询逐行匹配，按讲述人查找时使用普通索引
+class ProjectIndex:
+    index_file_name = ".mtmproject"  # 索引数据库文件名
+    text_extension = ".mtm"  # MTM文件后缀
+    min_match_length = 3  # 可以使用全文索引的最短查询
+    max_hits = 500  # 最多返回的结果数量
+    commit_interval = 1.0  # 更新索引时的提交间隔，单位秒
+    schema = (
+        "CREATE TABLE IF NOT EXISTS files ("
+        "id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, "
+        "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS dialogs ("
+        "id INTEGER PRIMARY KEY, file INTEGER NOT NULL, page INTEGER NOT NULL, "
+        "row INTEGER NOT NULL, speaker TEXT NOT NULL, "
+        "original_text TEXT NOT NULL, translated_text TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS dialogs_file ON dialogs (file)",
+        "CREATE INDEX IF NOT EXISTS dialogs_speaker ON dialogs (speaker)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS dialog_text USING fts5("
+        "speaker, original_text, translated_text, "
+        "content='dialogs', content_rowid='id', tokenize='trigram')",
+    )  # 表结构，全文索引的内容来自文本组表
+    select_hits = (
+        "SELECT files.path, dialogs.page, dialogs.row, dialogs.speaker, "
+        "dialogs.original_text, dialogs.translated_text FROM dialogs "
+        "JOIN files ON files.id = dialogs.file "
+    )  # 查询结果的公共部分
+
+    # 构造函数
+    def __init__(self, root_path):
+        self.root_path = os.path.normpath(root_path)  # 项目文件夹
+        self.parser = MarkupParser()  # 解析器
+        self.indexed_file_ids = []  # 最近一次更新中重新索引的文档编号
+        self.connection = self.connect(
+            os.path.join(self.root_path, self.index_file_name)
+        )  # 数据库连接，只能在创建它的线程中使用
+
+    # 连接数据库，若表不存在则创建
+    @classmethod
+    def connect(cls, file_path):
+        connection = sqlite3.connect(file_path)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        for statement in cls.schema:
+            connection.execute(statement)
+        connection.commit()
+        return connection
+
+    # 关闭数据库
+    def close(self):
+        self.connection.close()
+
+    # 遍历项目文件夹，返回MTM文档的相对路径与大小、修改时间，跳过隐藏的文件夹
+    def scan_files(self):
+        files = {}
+        for folder_path, folder_names, file_names in os.walk(self.root_path):
+            folder_names[:] = [
+                name for name in folder_names if not name.startswith(".")
+            ]
+            for file_name in file_names:
+                if not file_name.lower().endswith(self.text_extension):
+                    continue
+                file_path = os.path.join(folder_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files[os.path.relpath(file_path, self.root_path)] = (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                )
+        return files
+
+    # 更新索引，仅处理新增、改变与删除的文档，返回重新索引与移除的文档数量
+    def update(self):
+        files = self.scan_files()
+        known_files = {
+            path: (file_id, size, mtime_ns)
+            for file_id, path, size, mtime_ns in self.connection.execute(
+                "SELECT id, path, size, mtime_ns FROM files"
+            )
+        }
+        # 移除已被删除的文档
+        removed_paths = set(known_files) - set(files)
+        for path in removed_paths:
+            self.remove_file(known_files[path][0])
+            self.connection.commit()
+        # 重新索引新增或改变的文档，每隔一段时间提交一次，索引途中也可以查找已提交的文档
+        self.indexed_file_ids = []
+        commit_time = time.monotonic()
+        for path, (size, mtime_ns) in sorted(files.items()):
+            known = known_files.get(path)
+            if known and known[1:] == (size, mtime_ns):
+                continue
+            self.indexed_file_ids.append(
+                self.index_file(path, size, mtime_ns, known[0] if known else None)
+            )
+            if time.monotonic() - commit_time >= self.commit_interval:
+                self.connection.commit()
+                commit_time = time.monotonic()
+        self.connection.commit()
+        return len(self.indexed_file_ids), len(removed_paths)
+
+    # 移除文档的文本组，file_id为文档编号，remove_record为是否同时删除文档记录
+    def remove_file(self, file_id, remove_record=True):
+        cursor = self.connection.cursor()
+        # 全文索引的内容来自文本组表，需要以原内容通知其删除
+        cursor.execute(
+            "INSERT INTO dialog_text (dialog_text, rowid, speaker, original_text, "
+            "translated_text) SELECT 'delete', id, speaker, original_text, "
+            "translated_text FROM dialogs WHERE file = ?",
+            (file_id,),
+        )
+        cursor.execute("DELETE FROM dialogs WHERE file = ?", (file_id,))
+        if remove_record:
+            cursor.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    # 索引文档，格式有误或无法读取的文档仅记录大小与修改时间，改变后再重新索引
+    def index_file(self, path, size, mtime_ns, file_id=None):
+        cursor = self.connection.cursor()
+        if file_id is None:
+            cursor.execute(
+                "INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                (path, size, mtime_ns),
+            )
+            file_id = cursor.lastrowid
+        else:
+            self.remove_file(file_id, remove_record=False)
+            cursor.execute(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                (size, mtime_ns, file_id),
+            )
+        # 页码为页面的排列位置，与文本面板一致
+        rows = []
+        try:
+            with open(
+                os.path.join(self.root_path, path), "r", encoding="utf-8"
+            ) as file:
+                for page_number, (_, dialogs) in enumerate(
+                    self.parser.iter_pages(file), 1
+                ):
+                    for row, dialog in enumerate(dialogs):
+                        rows.append((file_id, page_number, row, *dialog))
+        except (OSError, UnicodeDecodeError, MarkupParseError):
+            rows = []
+        cursor.executemany(
+            "INSERT INTO dialogs (file, page, row, speaker, original_text, "
+            "translated_text) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        cursor.execute(
+            "INSERT INTO dialog_text (rowid, speaker, original_text, translated_text) "
+            "SELECT id, speaker, original_text, translated_text FROM dialogs "
+            "WHERE file = ?",
+            (file_id,),
+        )
+        return file_id
+
+    # 遍历若干文档中的原文与译文
+    def iter_segments(self, file_ids):
+        for file_id in file_ids:
+            yield from self.connection.execute(
+                "SELECT original_text, translated_text FROM dialogs WHERE file = ? "
+                "ORDER BY page, row",
+                (file_id,),
+            )
+
+    # 查找包含查询的文本组，返回(文档路径, 页码, 行号, 讲述人, 原文, 译文)的列表
+    def search(self, query):
+        if not query:
+            return []
+        if len(query) >= self.min_match_length:
+            # 作为短语交给全文索引
+            rows = self.connection.execute(
+                self.select_hits + "JOIN dialog_text ON dialog_text.rowid = dialogs.id "
+                "WHERE dialog_text MATCH ? "
+                "ORDER BY files.path, dialogs.page, dialogs.row LIMIT ?",
+                ('"' + query.replace('"', '""') + '"', self.max_hits),
+            )
+        else:
+            # 查询过短时逐行匹配
+            pattern = (
+                "%"
+                + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                + "%"
+            )
+            rows = self.connection.execute(
+                self.select_hits + "WHERE dialogs.speaker LIKE ?1 ESCAPE '\\' "
+                "OR dialogs.original_text LIKE ?1 ESCAPE '\\' "
+                "OR dialogs.translated_text LIKE ?1 ESCAPE '\\' "
+                "ORDER BY files.path, dialogs.page, dialogs.row LIMIT ?2",
+                (pattern, self.max_hits),
+            )
+        return self.to_hits(rows)
+
+    # 查找某个讲述人的所有文本组
+    def search_speaker(self, speaker):
+        rows = self.connection.execute(
+            self.select_hits + "WHERE dialogs.speaker = ? "
+            "ORDER BY files.path, dialogs.page, dialogs.row LIMIT ?",
+            (speaker, self.max_hits),
+        )
+        return self.to_hits(rows)
+
+    # 将相对路径转为完整路径
+    def to_hits(self, rows):
+        return [(os.path.join(self.root_path, path), *fields) for path, *fields in rows]
@@ -0,0 +1,142 @@
+from core.markup_parser import MarkupParseError
+
+
+# 全文搜索索引
+# 以字与相邻两字为词元建立倒排索引，中文与日文无需分词，任意长度的子串都能通过索引查找
+# 查找时取出查询中每个词元对应的文本组并求交集，再逐个确认是否包含查询，无需遍历整个文档
+# 索引在第一次查找时建立，此后随文本组的修改逐页或逐行更新，文档整体改变后重新建立
+# 与预设内容相同的文本在表格中显示为空，建立索引时同样视为空，不会被查找与替换
+class SearchIndex:
+    gram_size = 2  # 词元的最大长度
+
+    # 构造函数，default_texts为讲述人、原文、译文的预设内容
+    def __init__(self, default_texts=("", "", "")):
+        self.default_texts = default_texts  # 各列的预设内容
+        self.document = {}  # 被索引的文档
+        self.postings = {}  # 词元对应的文本组，文本组以(页码, 行号)表示
+        self.entries = {}  # 文本组建立索引时的讲述人、原文、译文
+        self.page_row_counts = {}  # 每页已建立索引的文本组数量
+        self.is_stale = True  # 索引是否需要重新建立
+        self.version = 0  # 索引的版本，每次更新后加一，用于判断查找结果是否过期
+
+    # 关联文档，索引在下次查找时建立
+    def attach(self, document):
+        self.document = document
+        self.invalidate()
+
+    # 文档整体改变后调用，释放旧的索引，下次查找时重新建立
+    def invalidate(self):
+        self.postings = {}
+        self.entries = {}
+        self.page_row_counts = {}
+        self.is_stale = True
+        self.version += 1
+
+    # 获取文本的词元，不区分大小写
+    @classmethod
+    def get_grams(cls, text):
+        text = text.lower()
+        grams = set(text)
+        for size in range(2, cls.gram_size + 1):
+            grams.update(text[i : i + size] for i in range(len(text) - size + 1))
+        return grams
+
+    # 获取查询的词元，查询较长时只需最长的词元即可覆盖全部内容
+    @classmethod
+    def get_query_grams(cls, query):
+        query = query.lower()
+        size = min(len(query), cls.gram_size)
+        return {query[i : i + size] for i in range(len(query) - size + 1)}
+
+    # 建立整个文档的索引
+    def build(self):
+        self.invalidate()
+        for page_number in self.document:
+            self.add_page(page_number)
+        self.is_stale = False
+
+    # 添加文本组，预设内容视为空
+    def add_dialog(self, page_number, row, dialog):
+        key = (page_number, row)
+        texts = tuple(
+            "" if text == default_text else text
+            for text, default_text in zip(dialog, self.default_texts)
+        )
+        self.entries[key] = texts
+        for gram in set().union(*map(self.get_grams, texts)):
+            self.postings.setdefault(gram, set()).add(key)
+
+    # 移除文本组
+    def remove_dialog(self, page_number, row):
+        key = (page_number, row)
+        texts = self.entries.pop(key, None)
+        if texts is None:
+            return
+        for gram in set().union(*map(self.get_grams, texts)):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    # 添加页面的所有文本组，格式有误的页面不建立索引
+    def add_page(self, page_number):
+        try:
+            dialogs = self.document[page_number]
+        except (MarkupParseError, KeyError):
+            dialogs = []
+        for row, dialog in enumerate(dialogs):
+            self.add_dialog(page_number, row, dialog)
+        self.page_row_counts[page_number] = len(dialogs)
+
+    # 移除页面的所有文本组
+    def remove_page(self, page_number):
+        if self.is_stale:
+            return
+        for row in range(self.page_row_counts.pop(page_number, 0)):
+            self.remove_dialog(page_number, row)
+        self.version += 1
+
+    # 页面被修改后，重新建立该页的索引
+    def update_page(self, page_number):
+        if self.is_stale:
+            return
+        self.remove_page(page_number)
+        if page_number in self.document:
+            self.add_page(page_number)
+
+    # 文本组被修改后，仅重新建立该文本组的索引
+    def update_dialog(self, page_number, row):
+        if self.is_stale:
+            return
+        if row >= self.page_row_counts.get(page_number, 0):
+            self.update_page(page_number)
+            return
+        self.remove_dialog(page_number, row)
+        self.add_dialog(page_number, row, self.document[page_number][row])
+        self.version += 1
+
+    # 查找包含查询的文本组，返回按照顺序排列的(页码, 行号, 列号)列表
+    def search(self, query, match_case=False):
+        if not query:
+            return []
+        if self.is_stale:
+            self.build()
+        # 从最少的词元开始求交集，交集为空时提前结束
+        candidates = None
+        for keys in sorted(
+            (self.postings.get(gram, set()) for gram in self.get_query_grams(query)),
+            key=len,
+        ):
+            candidates = set(keys) if candidates is None else candidates & keys
+            if not candidates:
+                return []
+        # 逐个确认是否包含查询
+        if not match_case:
+            query = query.lower()
+        hits = []
+        for key in sorted(candidates):
+            for column, text in enumerate(self.entries[key]):
+                if query in (text if match_case else text.lower()):
+                    hits.append((*key, column))
+        return hits
@@ -0,0 +1,64 @@
+# 存储后端
+# 文本面板通过存储后端打开与保存文档，不同的后端以不同的格式保存同样的页面数据
+# 文档以页码为键的字典接口提供给文本面板，修改页面后调用mark_dirty，由后端决定何时写入
+class StorageBackend:
+    file_extensions = ()  # 该后端处理的文件后缀，为空时处理所有文件
+
+    # 构造函数
+    def __init__(self):
+        self.file_path = None  # 当前文档地址
+        self.data = {}  # 当前数据，与文本面板共用同一个文档
+        self.last_error = None  # 最近一次写入时发生的错误
+
+    # 判断某个文件是否由该后端处理
+    @classmethod
+    def accepts(cls, file_path):
+        return not cls.file_extensions or file_path.lower().endswith(
+            cls.file_extensions
+        )
+
+    # 打开文档，返回文档对象，若文件不是该后端的格式则返回None
+    # progress为进度回调，参数为已处理与总共的数量，可以不调用
+    def open_document(self, file_path, parser, progress=None):
+        raise NotImplementedError
+
+    # 关联文档，打开文档后调用，返回打开时恢复的页码
+    def attach(self, file_path, data):
+        self.detach()
+        self.file_path = file_path
+        self.data = data
+        return set()
+
+    # 取消关联，取消前会保存尚未写入的修改
+    def detach(self):
+        self.flush()
+        self.file_path = None
+        self.data = {}
+
+    # 标记页面已被修改，row为被修改的行，为None时表示整页都可能改变
+    def mark_dirty(self, page_number, row=None):
+        raise NotImplementedError
+
+    # 标记新插入的页面
+    def mark_inserted(self, page_number):
+        self.mark_dirty(page_number)
+
+    # 标记已删除的页面，page_number为删除前的页码
+    def mark_removed(self, page_number):
+        raise NotImplementedError
+
+    # 立即保存所有修改
+    def flush(self):
+        pass
+
+    # 判断文件的当前状态是否由自身写入
+    def is_own_write(self, file_path):
+        return False
+
+    # 合并外部修改后的页面，返回内容改变的页码
+    def merge_external_pages(self, entries):
+        return set()
+
+    # 等待所有写入完成，通常在程序退出前调用
+    def wait_for_writes(self):
+        pass
@@ -0,0 +1,301 @@
+from collections import Counter
+import sqlite3
+import array
+import math
+import os
+
+
+# 翻译记忆
+# 保存出现过的原文与译文，查询某句原文时给出完全相同与相似原文的译文
+# 相似度为两句原文相邻两字词元的Dice系数，每个词元对应包含它的句子编号，即倒排索引
+# 查询时只需读取最少出现的若干词元，相似度达到阈值的句子必然包含其中之一，再逐个计算相似度
+# 句子与倒排索引均保存在数据库中，打开时无需加载，添加句子时只更新相关的词元
+# 文档中记录的句子同时保存其所在位置，同一位置再次记录时更新原有的句子，不会留下修改过程中的文本
+class TranslationMemory:
+    file_name = ".mtm_memory"  # 默认的数据库文件名，位于用户目录下
+    threshold = 0.5  # 相似度阈值
+    max_candidates = 100  # 最多计算相似度的句子数量
+    max_suggestions = 5  # 最多给出的建议数量
+    batch_size = 500  # 更新倒排索引时每次读取的词元数量
+    schema = (
+        "CREATE TABLE IF NOT EXISTS segments ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, original_text TEXT NOT NULL, "
+        "translated_text TEXT NOT NULL, UNIQUE (original_text, translated_text))",
+        "CREATE TABLE IF NOT EXISTS grams ("
+        "gram TEXT PRIMARY KEY, count INTEGER NOT NULL, postings BLOB NOT NULL) "
+        "WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS sources ("
+        "document TEXT NOT NULL, page INTEGER NOT NULL, row INTEGER NOT NULL, "
+        "segment INTEGER NOT NULL, PRIMARY KEY (document, page, row)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS sources_segment ON sources (segment)",
+    )  # 表结构，倒排索引中的句子编号以无符号整数数组保存
+
+    # 构造函数
+    def __init__(self, file_path=None):
+        self.file_path = file_path or self.get_default_path()  # 数据库地址
+        self.ignored_texts = set()  # 不记录的文本，例如预设内容
+        self.connection = sqlite3.connect(self.file_path)  # 数据库连接
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        for statement in self.schema:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    # 获取默认的数据库地址
+    @classmethod
+    def get_default_path(cls):
+        return os.path.join(os.path.expanduser("~"), cls.file_name)
+
+    # 关闭数据库
+    def close(self):
+        self.connection.close()
+
+    # 获取文本的词元，不足两字时以单字为词元
+    @staticmethod
+    def get_grams(text):
+        text = text.lower()
+        if len(text) < 2:
+            return {text} if text else set()
+        return {text[i : i + 2] for i in range(len(text) - 1)}
+
+    # 判断原文与译文是否需要记录，空白与预设内容不记录
+    def accepts(self, original_text, translated_text):
+        return (
+            original_text
+            and translated_text
+            and original_text not in self.ignored_texts
+            and translated_text not in self.ignored_texts
+        )
+
+    # 添加原文与译文，已有的组合会被忽略，返回新增的数量
+    def add_segments(self, pairs):
+        cursor = self.connection.cursor()
+        new_postings = {}  # 新句子的词元
+        added_count = 0
+        for original_text, translated_text in pairs:
+            original_text = original_text.strip()
+            translated_text = translated_text.strip()
+            if not self.accepts(original_text, translated_text):
+                continue
+            cursor.execute(
+                "INSERT OR IGNORE INTO segments (original_text, translated_text) "
+                "VALUES (?, ?)",
+                (original_text, translated_text),
+            )
+            if cursor.rowcount:
+                added_count += 1
+                self.collect_postings(new_postings, original_text, cursor.lastrowid)
+        self.write_postings(cursor, new_postings)
+        self.connection.commit()
+        return added_count
+
+    # 记录文档中各位置的原文与译文，records为(页码, 行号, 原文, 译文)的列表
+    # 该位置已有句子且句子仅属于该位置时，直接修改句子，否则新增句子或指向相同的已有句子
+    # 修改原文时同时从不再包含的词元的倒排列表中移除，不再属于任何位置的句子连同倒排列表一并删除
+    def record_segments(self, document_path, records):
+        cursor = self.connection.cursor()
+        new_postings = {}  # 新句子与原文改变的句子的词元
+        for page_number, row, original_text, translated_text in records:
+            original_text = original_text.strip()
+            translated_text = translated_text.strip()
+            if not self.accepts(original_text, translated_text):
+                continue
+            location = (document_path, page_number, row)
+            result = cursor.execute(
+                "SELECT segment FROM sources WHERE document = ? AND page = ? "
+                "AND row = ?",
+                location,
+            ).fetchone()
+            segment_id = result[0] if result else None
+            result = cursor.execute(
+                "SELECT id FROM segments WHERE original_text = ? "
+                "AND translated_text = ?",
+                (original_text, translated_text),
+            ).fetchone()
+            if result:
+                # 已有相同的句子
+                if result[0] == segment_id:
+                    continue
+                cursor.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                    (*location, result[0]),
+                )
+                self.remove_orphan(cursor, new_postings, segment_id)
+            elif segment_id is not None and self.count_sources(cursor, segment_id) == 1:
+                # 修改该位置原有的句子，原文改变时更新倒排列表
+                (old_original_text,) = cursor.execute(
+                    "SELECT original_text FROM segments WHERE id = ?", (segment_id,)
+                ).fetchone()
+                cursor.execute(
+                    "UPDATE segments SET original_text = ?, translated_text = ? "
+                    "WHERE id = ?",
+                    (original_text, translated_text, segment_id),
+                )
+                old_grams = self.get_grams(old_original_text)
+                grams = self.get_grams(original_text)
+                self.remove_postings(
+                    cursor, new_postings, segment_id, old_grams - grams
+                )
+                self.collect_postings(
+                    new_postings, original_text, segment_id, old_grams
+                )
+            else:
+                # 新增句子
+                cursor.execute(
+                    "INSERT INTO segments (original_text, translated_text) "
+                    "VALUES (?, ?)",
+                    (original_text, translated_text),
+                )
+                self.collect_postings(new_postings, original_text, cursor.lastrowid)
+                cursor.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                    (*location, cursor.lastrowid),
+                )
+        self.write_postings(cursor, new_postings)
+        self.connection.commit()
+
+    # 统计句子所属的位置数量
+    @staticmethod
+    def count_sources(cursor, segment_id):
+        (count,) = cursor.execute(
+            "SELECT COUNT(*) FROM sources WHERE segment = ?", (segment_id,)
+        ).fetchone()
+        return count
+
+    # 删除不再属于任何位置的句子，同时从倒排列表中移除
+    def remove_orphan(self, cursor, new_postings, segment_id):
+        if segment_id is None or self.count_sources(cursor, segment_id):
+            return
+        (original_text,) = cursor.execute(
+            "SELECT original_text FROM segments WHERE id = ?", (segment_id,)
+        ).fetchone()
+        self.remove_postings(
+            cursor, new_postings, segment_id, self.get_grams(original_text)
+        )
+        cursor.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+
+    # 收集句子的词元，known_grams为倒排列表中已有该句子的词元
+    # new_postings以词元为键，值为句子编号的集合，同一句子只会被追加一次
+    def collect_postings(self, new_postings, original_text, segment_id, known_grams=()):
+        for gram in self.get_grams(original_text) - set(known_grams):
+            new_postings.setdefault(gram, set()).add(segment_id)
+
+    # 从词元的倒排列表中移除句子，包括尚未写入的部分，列表为空时删除该词元
+    def remove_postings(self, cursor, new_postings, segment_id, grams):
+        for gram in grams:
+            if gram in new_postings:
+                new_postings[gram].discard(segment_id)
+        grams = list(grams)
+        for start in range(0, len(grams), self.batch_size):
+            batch = grams[start : start + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            for gram, blob in cursor.execute(
+                f"SELECT gram, postings FROM grams WHERE gram IN ({placeholders})",
+                batch,
+            ).fetchall():
+                postings = array.array("I")
+                postings.frombytes(blob)
+                postings = array.array(
+                    "I", (posting for posting in postings if posting != segment_id)
+                )
+                if postings:
+                    cursor.execute(
+                        "UPDATE grams SET count = ?, postings = ? WHERE gram = ?",
+                        (len(postings), postings.tobytes(), gram),
+                    )
+                else:
+                    cursor.execute("DELETE FROM grams WHERE gram = ?", (gram,))
+
+    # 将句子追加到词元的倒排列表末尾，已在列表中的句子不再追加，分批读取已有的倒排列表
+    def write_postings(self, cursor, new_postings):
+        grams = [gram for gram, segment_ids in new_postings.items() if segment_ids]
+        for start in range(0, len(grams), self.batch_size):
+            batch = grams[start : start + self.batch_size]
+            postings_by_gram = {gram: array.array("I") for gram in batch}
+            placeholders = ",".join("?" * len(batch))
+            for gram, blob in cursor.execute(
+                f"SELECT gram, postings FROM grams WHERE gram IN ({placeholders})",
+                batch,
+            ).fetchall():
+                postings_by_gram[gram].frombytes(blob)
+            for gram, postings in postings_by_gram.items():
+                postings.extend(sorted(new_postings[gram] - set(postings)))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO grams VALUES (?, ?, ?)",
+                (
+                    (gram, len(postings), postings.tobytes())
+                    for gram, postings in postings_by_gram.items()
+                ),
+            )
+
+    # 查询原文，返回(相似度, 原文, 译文)的列表，完全相同的原文排在最前
+    # excluded_translation为该原文当前的译文，不作为建议
+    def lookup(self, text, excluded_translation=None):
+        text = text.strip()
+        if not text:
+            return []
+        if excluded_translation is not None:
+            excluded_translation = excluded_translation.strip()
+        # 完全相同的原文，新的译文在前
+        suggestions = [
+            (1.0, original_text, translated_text)
+            for original_text, translated_text in self.connection.execute(
+                "SELECT original_text, translated_text FROM segments "
+                "WHERE original_text = ? AND translated_text IS NOT ? "
+                "ORDER BY id DESC LIMIT ?",
+                (text, excluded_translation, self.max_suggestions),
+            )
+        ]
+        grams = self.get_grams(text)
+        # 相似度达到阈值时，共有的词元数量不少于该值
+        min_common = math.ceil(
+            self.threshold * len(grams) / (2 - self.threshold) - 1e-9
+        )
+        # 出现最少的若干词元，相似的句子必然包含其中之一，不存在的词元出现次数为0
+        counts = dict.fromkeys(grams, 0)
+        placeholders = ",".join("?" * len(grams))
+        counts.update(
+            self.connection.execute(
+                f"SELECT gram, count FROM grams WHERE gram IN ({placeholders})",
+                list(grams),
+            )
+        )
+        prefix = sorted(grams, key=counts.get)[: len(grams) - min_common + 1]
+        prefix = [gram for gram in prefix if counts[gram]]
+        if not prefix:
+            return suggestions
+        # 统计候选句子包含的词元数量
+        counter = Counter()
+        placeholders = ",".join("?" * len(prefix))
+        for (blob,) in self.connection.execute(
+            f"SELECT postings FROM grams WHERE gram IN ({placeholders})", prefix
+        ):
+            postings = array.array("I")
+            postings.frombytes(blob)
+            counter.update(postings)
+        candidate_ids = [
+            segment_id for segment_id, _ in counter.most_common(self.max_candidates)
+        ]
+        # 逐个计算相似度
+        placeholders = ",".join("?" * len(candidate_ids))
+        scored = []
+        for segment_id, original_text, translated_text in self.connection.execute(
+            "SELECT id, original_text, translated_text FROM segments "
+            f"WHERE id IN ({placeholders})",
+            candidate_ids,
+        ):
+            if original_text == text:
+                continue
+            candidate_grams = self.get_grams(original_text)
+            score = (
+                2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            )
+            if score >= self.threshold:
+                scored.append((score, segment_id, original_text, translated_text))
+        # 相似度相同时，新的译文在前
+        scored.sort(reverse=True)
+        suggestions.extend(
+            (score, original_text, translated_text)
+            for score, _, original_text, translated_text in scored
+        )
+        return suggestions[: self.max_suggestions]
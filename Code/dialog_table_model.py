@@ -0,0 +1,157 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+from core.markup_parser import MarkupParseError
+from core.document_model import Dialog
+
+
+# 文本组表格数据模型
+# 直接读取文档中当前页面的文本组，不再为每个单元格创建表格项，翻页时只需重设模型
+# 修改、添加与删除文本组时仅通知视图改变的行，视图只重绘并重新计算这些行
+class DialogTableModel(QAbstractTableModel):
+    headers = ("讲述人", "原文", "译文")  # 表头
+    alignments = (
+        Qt.AlignCenter,
+        Qt.AlignLeft | Qt.AlignVCenter,
+        Qt.AlignLeft | Qt.AlignVCenter,
+    )  # 各列文本的对齐方式
+    dialog_edited = pyqtSignal(int, int)  # 文本组被人工修改，参数为页码与文本组序号
+
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.text_panel = None  # 文本面板，提供预设内容
+        self.document = {}  # 当前文档
+        self.page_number = -1  # 当前页码
+
+    # 获取页面的文本组，每次都从文档中获取，防止页面被淘汰后修改了旧的列表
+    def get_dialogs(self, page_number):
+        if page_number not in self.document:
+            return []
+        try:
+            return self.document[page_number]
+        except (MarkupParseError, KeyError):
+            return []
+
+    # 获取某一行对应的页码与文本组序号
+    def locate(self, row):
+        return self.page_number, row
+
+    # 获取某个文本组所在的行
+    def get_row(self, page_number, dialog_row):
+        return dialog_row
+
+    # 显示文档中的某一页
+    def set_page(self, document, page_number):
+        self.beginResetModel()
+        self.document = document
+        self.page_number = page_number
+        self.endResetModel()
+
+    # 行数，即文本组数量
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.get_dialogs(self.page_number))
+
+    # 列数，即讲述人、原文、译文
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    # 获取数据
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            page_number, dialog_row = self.locate(index.row())
+            dialogs = self.get_dialogs(page_number)
+            if dialog_row >= len(dialogs):
+                return None
+            text = getattr(dialogs[dialog_row], Dialog.fields[index.column()])
+            # 预设内容显示为空
+            if text == self.get_default_texts()[index.column()]:
+                return ""
+            return text
+        if role == Qt.TextAlignmentRole:
+            return int(self.alignments[index.column()])
+        return None
+
+    # 获取各列的预设内容
+    def get_default_texts(self):
+        if self.text_panel is None:
+            return ("", "", "")
+        return (
+            self.text_panel.default_speaker,
+            self.text_panel.default_original_text,
+            self.text_panel.deafult_translated_text,
+        )
+
+    # 表头
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    # 所有单元格均可编辑
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    # 人工修改单元格后，仅更新对应的文本组
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        page_number, dialog_row = self.locate(index.row())
+        dialogs = self.get_dialogs(page_number)
+        if dialog_row is None or dialog_row >= len(dialogs):
+            return False
+        dialogs[dialog_row].set_field(index.column(), value)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.dialog_edited.emit(page_number, dialog_row)
+        return True
+
+    # 页面的行数改变后更新行号，由连续显示的模型实现
+    def shift_rows(self, page_number, count):
+        pass
+
+    # 在页面末尾添加文本组，返回文本组序号
+    def append_dialog(self, page_number, dialog):
+        dialogs = self.get_dialogs(page_number)
+        dialog_row = len(dialogs)
+        row = self.get_row(page_number, dialog_row)
+        self.beginInsertRows(QModelIndex(), row, row)
+        dialogs.append(dialog)
+        self.shift_rows(page_number, 1)
+        self.endInsertRows()
+        return dialog_row
+
+    # 删除页面的最后一个文本组，返回被删除的文本组序号
+    def remove_last_dialog(self, page_number):
+        dialogs = self.get_dialogs(page_number)
+        dialog_row = len(dialogs) - 1
+        row = self.get_row(page_number, dialog_row)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del dialogs[dialog_row]
+        self.shift_rows(page_number, -1)
+        self.endRemoveRows()
+        return dialog_row
+
+    # 插入页面，仅显示一页时无需更新视图
+    def insert_page(self, page_number, dialogs):
+        self.document.insert_page(page_number, dialogs)
+
+    # 删除页面
+    def remove_page(self, page_number):
+        del self.document[page_number]
+
+    # 文本组在模型之外被修改后，通知视图更新这些行
+    def update_rows(self, page_number, first_row, last_row):
+        if first_row > last_row:
+            return
+        self.dataChanged.emit(
+            self.index(self.get_row(page_number, first_row), 0),
+            self.index(self.get_row(page_number, last_row), self.columnCount() - 1),
+            [Qt.DisplayRole, Qt.EditRole],
+        )
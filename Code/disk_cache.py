@@ -0,0 +1,238 @@
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt
+import threading
+import hashlib
+import json
+import time
+import os
+
+from core.atomic_file import AtomicFile
+
+
+# 磁盘缓存
+# 在图集文件夹下的隐藏文件夹中保存每张图片的缩小版本，例如预览图、缩略图与金字塔级别
+# 缓存以图片内容的哈希值为键，同时记录图片的大小与修改时间，未改变的图片无需重新计算哈希值
+# 缓存总大小超过上限时，按照最近最少使用的顺序删除
+class DiskCache:
+    folder_name = ".mtm_cache"  # 缓存文件夹名称
+    index_name = "index.json"  # 索引文件名称
+    preview_size = 1600  # 预览图的最大边长
+    thumbnail_size = 256  # 缩略图的最大边长
+
+    # 构造函数
+    def __init__(self, image_folder_path, max_size=512 * 1024 * 1024):
+        self.cache_path = os.path.join(image_folder_path, self.folder_name)
+        self.index_path = os.path.join(self.cache_path, self.index_name)
+        self.max_size = max_size  # 缓存大小上限，单位字节
+        self.files = {}  # 图片信息，文件名为键，值为大小、修改时间与哈希值
+        self.entries = {}  # 缓存条目，条目文件名为键，值为大小与最近使用时间
+        self.total_size = 0  # 当前缓存大小
+        self.unsaved_count = 0  # 尚未保存到索引的修改数量
+        self.lock = threading.Lock()
+        # 创建缓存文件夹，若无法创建，则不使用缓存
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            self.enabled = True
+        except OSError:
+            self.enabled = False
+            return
+        self.load_index()
+
+    # 读取索引
+    def load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+            self.files = index.get("files", {})
+            self.entries = index.get("entries", {})
+        except (OSError, ValueError):
+            self.files = {}
+            self.entries = {}
+        # 与实际文件核对，删除不存在的条目，并收录索引中缺失的条目
+        existing_names = set(os.listdir(self.cache_path)) - {self.index_name}
+        for entry_name in set(self.entries) - existing_names:
+            del self.entries[entry_name]
+        for entry_name in existing_names - set(self.entries):
+            entry_path = os.path.join(self.cache_path, entry_name)
+            if entry_name.startswith("."):
+                # 写入途中中断留下的临时文件
+                os.remove(entry_path)
+                continue
+            self.entries[entry_name] = {
+                "size": os.path.getsize(entry_path),
+                "last_access": 0,
+            }
+        self.total_size = sum(entry["size"] for entry in self.entries.values())
+
+    # 保存索引
+    def save_index(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            content = json.dumps({"files": self.files, "entries": self.entries})
+            self.unsaved_count = 0
+        try:
+            AtomicFile.write(self.index_path, content)
+        except OSError:
+            pass
+
+    # 获取条目文件名
+    @staticmethod
+    def get_entry_name(digest, tag):
+        return f"{digest}.{tag}.jpg"
+
+    # 查询图片的哈希值，仅当图片大小与修改时间均未改变时返回，否则返回None
+    def lookup_digest(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        with self.lock:
+            info = self.files.get(os.path.basename(file_path))
+        if (
+            info
+            and info["size"] == stat.st_size
+            and info["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return info["digest"]
+        return None
+
+    # 计算图片的哈希值并记录，若图片内容改变，则同时删除旧的缓存条目
+    def compute_digest(self, file_path):
+        digest = self.lookup_digest(file_path)
+        if digest:
+            return digest
+        stat = os.stat(file_path)
+        hasher = hashlib.sha1()
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        file_name = os.path.basename(file_path)
+        with self.lock:
+            old_info = self.files.get(file_name)
+            self.files[file_name] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "digest": digest,
+            }
+            # 旧内容已经失效，若没有其他图片使用，则删除
+            if old_info and old_info["digest"] != digest:
+                self.remove_digest(old_info["digest"])
+            self.unsaved_count += 1
+        return digest
+
+    # 删除某个哈希值对应的所有缓存条目，调用时需持有锁
+    def remove_digest(self, digest):
+        if any(info["digest"] == digest for info in self.files.values()):
+            return
+        for entry_name in [name for name in self.entries if name.startswith(digest)]:
+            self.remove_entry(entry_name)
+
+    # 删除缓存条目，调用时需持有锁
+    def remove_entry(self, entry_name):
+        entry = self.entries.pop(entry_name)
+        self.total_size -= entry["size"]
+        try:
+            os.remove(os.path.join(self.cache_path, entry_name))
+        except OSError:
+            pass
+
+    # 判断是否存在某个缓存条目，不会计算哈希值
+    def contains(self, file_path, tag):
+        if not self.enabled:
+            return False
+        digest = self.lookup_digest(file_path)
+        if not digest:
+            return False
+        with self.lock:
+            return self.get_entry_name(digest, tag) in self.entries
+
+    # 读取缓存条目，不存在时返回None，不会计算哈希值
+    def load(self, file_path, tag):
+        if not self.enabled:
+            return None
+        digest = self.lookup_digest(file_path)
+        if not digest:
+            return None
+        entry_name = self.get_entry_name(digest, tag)
+        with self.lock:
+            entry = self.entries.get(entry_name)
+            if entry is None:
+                return None
+            entry["last_access"] = time.time()
+        image = QImage(os.path.join(self.cache_path, entry_name))
+        return None if image.isNull() else image
+
+    # 写入缓存条目，会计算哈希值，建议在后台线程中调用
+    def store(self, file_path, tag, image):
+        if not self.enabled or image.isNull():
+            return
+        try:
+            digest = self.compute_digest(file_path)
+            entry_name = self.get_entry_name(digest, tag)
+            entry_path = os.path.join(self.cache_path, entry_name)
+            # 先写入临时文件，防止读取到不完整的文件
+            temp_path = os.path.join(self.cache_path, "." + entry_name)
+            if not image.save(temp_path, "JPG", 90):
+                return
+            os.replace(temp_path, entry_path)
+            size = os.path.getsize(entry_path)
+        except OSError:
+            return
+        with self.lock:
+            if entry_name in self.entries:
+                self.total_size -= self.entries[entry_name]["size"]
+            self.entries[entry_name] = {"size": size, "last_access": time.time()}
+            self.total_size += size
+            self.unsaved_count += 1
+            self.evict()
+            should_save = self.unsaved_count >= 32
+        # 每积攒一定数量的修改保存一次索引
+        if should_save:
+            self.save_index()
+
+    # 生成并写入预览图与缩略图，建议在后台线程中调用
+    def store_renditions(self, file_path, image):
+        if not self.enabled or image.isNull():
+            return
+        preview = image
+        if max(image.width(), image.height()) > self.preview_size:
+            preview = image.scaled(
+                self.preview_size,
+                self.preview_size,
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation,
+            )
+        self.store(file_path, "preview", preview)
+        self.store(
+            file_path,
+            "thumbnail",
+            preview.scaled(
+                self.thumbnail_size,
+                self.thumbnail_size,
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation,
+            ),
+        )
+
+    # 淘汰最久未使用的条目，直到缓存大小不超过上限的九成，调用时需持有锁
+    def evict(self):
+        if self.total_size <= self.max_size:
+            return
+        for entry_name in sorted(
+            self.entries, key=lambda name: self.entries[name]["last_access"]
+        ):
+            if self.total_size <= self.max_size * 0.9:
+                break
+            self.remove_entry(entry_name)
+
+    # 删除已不在图集中的图片的记录与缓存
+    def prune(self, file_names):
+        if not self.enabled:
+            return
+        with self.lock:
+            for file_name in set(self.files) - set(file_names):
+                digest = self.files.pop(file_name)["digest"]
+                self.remove_digest(digest)
+                self.unsaved_count += 1
@@ -0,0 +1,141 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+import threading
+import sqlite3
+
+from core.markup_parser import MarkupParseError
+from core.atomic_file import AtomicFile
+from core.mapped_file import MappedFile
+from sqlite_storage import SqliteStorage
+from core.page_io import PageIO
+
+
+# 任务被取消时，由进度回调抛出，中断正在进行的读取或写入
+class TaskCanceled(Exception):
+    pass
+
+
+# 文档任务的信号，参数中的整数为任务编号，界面据此忽略已过时的任务
+class DocumentWorkerSignals(QObject):
+    progress = pyqtSignal(int, int)  # 任务进度，参数为任务编号与百分比
+    # 文档读取完成，参数为任务编号、文档、普通文本与格式错误信息
+    # 文档为None时以普通文本显示
+    opened = pyqtSignal(int, object, object, str)
+    saved = pyqtSignal(int, str)  # 文档写入完成，参数为任务编号与文件地址
+    failed = pyqtSignal(int, str)  # 任务出错，参数为任务编号与错误信息
+    canceled = pyqtSignal(int)  # 任务已取消，参数为任务编号
+
+
+# 文档任务
+# 所有任务在同一个单线程的线程池中按提交顺序执行，因此先提交的写入一定先于之后的读取完成
+# 读写过程中通过进度回调报告进度，同时检查是否已被取消
+class DocumentTask(QRunnable):
+    # 构造函数
+    def __init__(self, task_id, signals, file_path):
+        super().__init__()
+        self.setAutoDelete(False)  # 界面仍需通过任务对象取消任务
+        self.task_id = task_id  # 任务编号
+        self.signals = signals  # 信号
+        self.file_path = file_path  # 文件地址
+        self.canceled = threading.Event()  # 是否已被取消
+        self.percent = -1  # 上次报告的进度百分比
+
+    # 取消任务，可由界面线程调用，任务在下次报告进度时停止
+    def cancel(self):
+        self.canceled.set()
+
+    # 报告进度，百分比改变时才发出信号，若任务已被取消则中断任务
+    def report_progress(self, done, total):
+        if self.canceled.is_set():
+            raise TaskCanceled()
+        percent = done * 100 // total if total else 100
+        if percent != self.percent:
+            self.percent = percent
+            self.signals.progress.emit(self.task_id, percent)
+
+    # 执行任务，出错与取消时发出对应的信号
+    def run(self):
+        try:
+            self.report_progress(0, 1)
+            self.execute()
+        except TaskCanceled:
+            self.signals.canceled.emit(self.task_id)
+        except (OSError, UnicodeDecodeError, MarkupParseError, sqlite3.Error) as error:
+            self.signals.failed.emit(self.task_id, str(error))
+
+    # 任务内容，由子类实现
+    def execute(self):
+        raise NotImplementedError
+
+
+# 文档读取任务，扫描mtm文档的页面索引，不是mtm文档或格式有误时读取为普通文本
+class OpenDocumentTask(DocumentTask):
+    # 构造函数
+    def __init__(self, task_id, signals, file_path, storage, parser):
+        super().__init__(task_id, signals, file_path)
+        self.storage = storage  # 存储后端，仅限可以在其他线程中打开文档的后端
+        self.parser = parser  # 解析器
+
+    # 执行任务
+    def execute(self):
+        message = ""
+        try:
+            document = self.storage.open_document(
+                self.file_path, self.parser, self.report_progress
+            )
+        except MarkupParseError as error:
+            # 格式有误时以普通文本显示，防止内容丢失
+            document = None
+            message = str(error)
+        text = None
+        if document is None:
+            text = self.read_text()
+        self.signals.opened.emit(self.task_id, document, text, message)
+
+    # 读取普通文本，文件以内存映射的方式读取后直接解码，不再额外复制一份字节
+    def read_text(self):
+        with MappedFile.open(self.file_path) as data:
+            return str(data, "utf-8")
+
+
+# 文档写入任务，逐页写入mtm文档、CSV文件或数据库，也可以直接写入普通文本
+# pages为返回页码与文本组的可迭代对象，page_count为页数，用于计算进度
+# 写入前先调用before_write，用于等待自动保存完成后再从文件中读取页面
+class SaveDocumentTask(DocumentTask):
+    # 构造函数
+    def __init__(
+        self,
+        task_id,
+        signals,
+        file_path,
+        parser,
+        pages=None,
+        page_count=0,
+        content=None,
+        before_write=None,
+    ):
+        super().__init__(task_id, signals, file_path)
+        self.parser = parser  # 解析器
+        self.pages = pages  # 页面
+        self.page_count = page_count  # 页数
+        self.content = content  # 普通文本，不为None时直接写入
+        self.before_write = before_write  # 写入前调用的函数
+
+    # 执行任务
+    def execute(self):
+        if self.before_write:
+            self.before_write()
+        if self.content is not None:
+            AtomicFile.write(self.file_path, self.content)
+        elif SqliteStorage.accepts(self.file_path):
+            # 数据库的连接在本线程中创建与使用
+            SqliteStorage.write_pages(self.file_path, self.iter_pages())
+        else:
+            PageIO.write_pages(self.parser, self.file_path, self.iter_pages())
+        self.signals.saved.emit(self.task_id, self.file_path)
+
+    # 逐页返回页面，页码按排列位置重新编号，同时报告进度
+    def iter_pages(self):
+        pages = self.pages() if callable(self.pages) else self.pages
+        for page_number, (_, dialogs) in enumerate(pages, 1):
+            yield page_number, dialogs
+            self.report_progress(page_number, self.page_count)
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+import threading
+import os
+
+
+# 图片缓存
+# 以图片路径与修改时间为键，缓存解码后的QImage，按照最近最少使用的顺序淘汰
+# 同一张图片可以按变体分别缓存，例如不同缩放级别的渲染结果
+# QImage可以在线程间安全传递，因此预读线程与界面线程共用同一个缓存
+class ImageCache:
+    # 构造函数
+    def __init__(self, memory_budget=512 * 1024 * 1024):
+        self.memory_budget = memory_budget  # 内存预算，单位字节
+        self.memory_usage = 0  # 当前占用内存
+        self.images = OrderedDict()  # 缓存内容，越靠后越是最近使用
+        self.lock = threading.Lock()
+
+    # 获取缓存键，文件修改后键随之改变，旧内容自然失效
+    @staticmethod
+    def get_key(file_path, variant=None):
+        try:
+            return (file_path, os.stat(file_path).st_mtime_ns, variant)
+        except OSError:
+            return None
+
+    # 判断是否已缓存
+    def contains(self, file_path, variant=None):
+        key = self.get_key(file_path, variant)
+        with self.lock:
+            return key in self.images
+
+    # 获取缓存的图片，若不存在则返回None
+    def get(self, file_path, variant=None):
+        key = self.get_key(file_path, variant)
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.images.move_to_end(key)
+            return image
+
+    # 缓存图片
+    def put(self, file_path, image, variant=None):
+        key = self.get_key(file_path, variant)
+        # 无法读取的文件与解码失败的图片不做缓存
+        if key is None or image.isNull():
+            return
+        with self.lock:
+            if key in self.images:
+                self.memory_usage -= self.images.pop(key).sizeInBytes()
+            self.images[key] = image
+            self.memory_usage += image.sizeInBytes()
+            self.evict()
+
+    # 移除某个文件的所有缓存
+    def remove(self, file_path):
+        with self.lock:
+            for key in [key for key in self.images if key[0] == file_path]:
+                self.memory_usage -= self.images.pop(key).sizeInBytes()
+
+    # 淘汰最久未使用的内容，直到占用内存不超过预算，至少保留最近使用的一张
+    def evict(self):
+        while self.memory_usage > self.memory_budget and len(self.images) > 1:
+            _, image = self.images.popitem(last=False)
+            self.memory_usage -= image.sizeInBytes()
@@ -7,11 +7,24 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QPushButton,
     QLineEdit,
+    QStackedWidget,
 )
-from PyQt5.QtGui import QPixmap, QMouseEvent
-from PyQt5.QtCore import Qt, QDir, QPoint, QEvent
+from PyQt5.QtGui import QPixmap, QImage, QImageReader, QMouseEvent
+from PyQt5.QtCore import Qt, QDir, QPoint, QSize, QEvent, QThreadPool, QTimer
 from menu_box import MenuBox
-import re
+from image_cache import ImageCache
+from image_workers import (
+    ImageLoadTask,
+    ImageScaleTask,
+    ImageWorkerSignals,
+    DiskCacheStoreTask,
+)
+from tiled_image_view import TiledImageView
+from disk_cache import DiskCache
+from core.folder_indexer import FolderIndexer
+from core.profiler import Profiler
+from path_watcher import PathWatcher
+import math
 import os
 
 
@@ -43,8 +56,14 @@ class ImagePanel(QWidget):
         self.scroll_area.setWidget(self.image_label)
         # 允许面板缩放
         self.scroll_area.setWidgetResizable(True)
+        # 分块图片视图，用于显示超大图片
+        self.tiled_view = TiledImageView()
+        # 切换
+        self.image_stack = QStackedWidget()
+        self.image_stack.addWidget(self.scroll_area)
+        self.image_stack.addWidget(self.tiled_view)
         # 添加图片面板到总布局中
-        self.layout.addWidget(self.scroll_area)
+        self.layout.addWidget(self.image_stack)
 
         # 添加底部控制栏
         self.down_control_layout = QHBoxLayout()
@@ -69,11 +88,44 @@ class ImagePanel(QWidget):
 
         # 其他数据成员
         self.image = None  # 图片文件
+        self.source_image = None  # 解码后的原始图片，供后台缩放使用
+        self.current_image_path = None  # 当前图片路径
+        self.current_image_key = None  # 加载时当前图片的缓存键，用于判断图片是否被修改
         self.scale_factor = 1.0  # 缩放比例
         self.image_path_list = []  # 图片文件路径列表
         self.current_image_index = -1  # 当前图片索引
+        self.use_tiled_view = False  # 是否使用分块显示
         self.menu_box = MenuBox()  # 信息盒子
         self.text_panel = None  # 隔壁的图片面板
+        self.thumbnail_panel = None  # 缩略图面板
+        self.folder_indexer = FolderIndexer()  # 文件夹索引器，文本面板也会使用
+        self.current_folder_path = None  # 当前图集路径
+        self.folder_watcher = PathWatcher(self.refresh_image_folder, 1000)  # 监视图集
+        self.image_cache = ImageCache()  # 解码后的图片缓存
+        self.prefetch_count = 2  # 向前向后各预读几张图片
+        self.prefetching_paths = set()  # 正在预读的图片路径
+        self.thread_pool = QThreadPool()  # 预读线程池
+        self.thread_pool.setMaxThreadCount(2)
+        self.worker_signals = ImageWorkerSignals()  # 预读任务的信号
+        self.disk_cache = None  # 当前图集的磁盘缓存
+        self.disk_thread_pool = QThreadPool()  # 磁盘缓存写入线程池
+        self.disk_thread_pool.setMaxThreadCount(1)
+        self.showing_preview = False  # 当前是否正在显示磁盘缓存中的预览图
+        # 无法解码的图片可能仍在写入，稍后重新加载
+        self.retry_delay = 1000  # 重新加载的间隔，单位毫秒
+        self.max_retries = 10  # 最多重新加载的次数
+        self.retry_count = 0  # 当前图片已重新加载的次数
+        self.retry_timer = QTimer()
+        self.retry_timer.setSingleShot(True)
+
+        # 缩放相关
+        self.render_cache = ImageCache(128 * 1024 * 1024)  # 平滑缩放结果的缓存
+        self.zoom_step = 1.05  # 缩放级别的间隔，缩放比例会向下取整到该值的整数次幂
+        self.render_delay = 150  # 滚轮停止多久后开始平滑缩放，单位毫秒
+        self.render_timer = QTimer()
+        self.render_timer.setSingleShot(True)
+        self.render_thread_pool = QThreadPool()  # 缩放线程池
+        self.render_thread_pool.setMaxThreadCount(1)
 
         # 鼠标拖拽相关
         self.last_mouse_pos = QPoint()
@@ -85,15 +137,45 @@ class ImagePanel(QWidget):
         self.jump_button.clicked.connect(self.jump_to_image)
         self.prev_button.clicked.connect(self.show_prev_image)  # 绑定信号与信号槽
         self.next_button.clicked.connect(self.show_next_image)  # 绑定信号与信号槽
+        self.worker_signals.loaded.connect(self.on_image_loaded)
+        self.worker_signals.rendered.connect(self.show_rendered_image)
+        self.render_timer.timeout.connect(self.start_smooth_render)
+        self.retry_timer.timeout.connect(self.retry_load_image)
 
     # 其他函数
     # 重设自身
     def reset_self(self):
         self.image = None  # 图片文件
+        self.source_image = None  # 原始图片
+        self.current_image_path = None  # 当前图片路径
+        self.render_timer.stop()
         self.scale_factor = 1.0  # 缩放比例
         self.image_path_list = []  # 图片文件路径列表
         self.current_image_index = -1  # 当前图片索引
+        self.showing_preview = False  # 是否正在显示预览图
+        self.current_folder_path = None  # 当前图集路径
+        self.folder_watcher.clear()
         self.image_label.clear()
+        self.tiled_view.clear_image()
+        if self.thumbnail_panel:
+            self.thumbnail_panel.reset_thumbnails()
+        # 保存磁盘缓存的索引
+        self.close_disk_cache()
+
+    # 关闭磁盘缓存，等待后台正在写入缓存的任务完成后保存索引
+    # 索引中记录了图片与缓存条目的对应关系，未保存时下次打开找不到已生成的预览图
+    def close_disk_cache(self):
+        if not self.disk_cache:
+            return
+        # 尚未开始的预读与缩略图任务直接取消
+        self.thread_pool.clear()
+        self.prefetching_paths.clear()
+        if self.thumbnail_panel:
+            self.thumbnail_panel.wait_for_tasks()
+        self.thread_pool.waitForDone()
+        self.disk_thread_pool.waitForDone()
+        self.disk_cache.save_index()
+        self.disk_cache = None
 
     # 获取默认文件位置
     def get_default_path(self):
@@ -108,18 +190,78 @@ class ImagePanel(QWidget):
         else:
             return QDir.homePath()
 
+    # 获取当前缩放比例对应的缩放级别
+    def get_zoom_level(self):
+        # 向下取整，保证适应面板时图片不会超出面板
+        return math.floor(math.log(self.scale_factor, self.zoom_step) + 1e-9)
+
     # 更新图片大小
-    def update_image(self):
+    # 若已有当前缩放级别的平滑缩放结果，则直接显示
+    # 若没有，则先显示快速缩放的预览，等待一段时间没有新的缩放后再在后台平滑缩放
+    @Profiler.trace
+    def update_image(self, render_delay=None):
         # 判断图片文件是否存在
         if self.image:
-            # 若存在，根据当前scale_factor缩放
-            scaled_image = self.image.scaled(
-                self.image.size() * self.scale_factor,
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
+            # 若正在显示预览图，预览图较小，直接平滑缩放即可，也不放入缓存
+            if self.showing_preview:
+                self.image_label.setPixmap(
+                    self.image.scaled(
+                        self.image.size() * self.scale_factor,
+                        Qt.KeepAspectRatio,
+                        Qt.SmoothTransformation,
+                    )
+                )
+                self.image_label.adjustSize()
+                return
+            # 若存在，根据当前缩放级别查找缓存
+            level = self.get_zoom_level()
+            scaled_image = self.render_cache.get(self.current_image_path, level)
+            if scaled_image is not None:
+                # 缓存存在时直接显示
+                self.render_timer.stop()
+                self.image_label.setPixmap(QPixmap.fromImage(scaled_image))
+            else:
+                # 缓存不存在时，先显示预览
+                self.image_label.setPixmap(
+                    self.image.scaled(
+                        self.image.size() * self.zoom_step**level,
+                        Qt.KeepAspectRatio,
+                        Qt.FastTransformation,
+                    )
+                )
+                # 重新计时，计时结束后开始平滑缩放
+                if render_delay is None:
+                    render_delay = self.render_delay
+                self.render_timer.start(render_delay)
+            self.image_label.adjustSize()
+
+    # 开始平滑缩放
+    def start_smooth_render(self):
+        # 判断图片文件是否存在
+        if self.source_image is None or self.showing_preview:
+            return
+        # 取消尚未开始的缩放任务
+        self.render_thread_pool.clear()
+        level = self.get_zoom_level()
+        self.render_thread_pool.start(
+            ImageScaleTask(
+                self.current_image_path,
+                self.source_image,
+                self.source_image.size() * self.zoom_step**level,
+                level,
+                self.render_cache,
+                self.worker_signals,
             )
-            # 缩放完成后显示
-            self.image_label.setPixmap(scaled_image)
+        )
+
+    # 平滑缩放完成后显示
+    def show_rendered_image(self, file_path, level):
+        # 判断图片与缩放级别是否仍是当前的
+        if file_path != self.current_image_path or level != self.get_zoom_level():
+            return
+        scaled_image = self.render_cache.get(file_path, level)
+        if scaled_image is not None:
+            self.image_label.setPixmap(QPixmap.fromImage(scaled_image))
             self.image_label.adjustSize()
 
     # 打开图集
@@ -149,12 +291,8 @@ class ImagePanel(QWidget):
     def judge_images_exist(self, folder_path):
         # 判断是否有路径
         if folder_path:
-            # 获取目标文件夹下所有图片文件
-            image_paths = [
-                os.path.normpath(os.path.join(folder_path, f))
-                for f in os.listdir(folder_path)
-                if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))
-            ]
+            # 从文件夹索引中获取目标文件夹下所有图片文件
+            image_paths = self.folder_indexer.get_index(folder_path).image_paths
             # 检测是否成功获取图片文件路径列表
             if image_paths:
                 # 若成功获取，返回真
@@ -168,37 +306,84 @@ class ImagePanel(QWidget):
     def open_image_folder_with_path(self, folder_path):
         # 对目标文件夹进行判断
         if folder_path:
-            # 获取目标文件夹下所有图片文件
-            self.image_path_list = [
-                os.path.normpath(os.path.join(folder_path, f))
-                for f in os.listdir(folder_path)
-                if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))
-            ]
-
-            # 对图片文件进行排序
-            # 自定义排序方法
-            def extract_numbers(file_name):
-                # 提取文件名称中的所有数字，并转化为整数
-                numbers = re.findall(r"\d+", file_name)
-                return [int(num) for num in numbers]
-
-            # 排序
-            self.image_path_list.sort(
-                key=lambda f: extract_numbers(os.path.basename(f))
+            # 从文件夹索引中获取目标文件夹下所有图片文件，索引中已排好序
+            self.image_path_list = list(
+                self.folder_indexer.get_index(folder_path).image_paths
+            )
+            # 监视图集，以便在图片增删时更新
+            self.current_folder_path = os.path.normpath(folder_path)
+            self.folder_watcher.watch(self.current_folder_path)
+
+            # 打开图集的磁盘缓存，并清理已不存在的图片的缓存
+            self.close_disk_cache()
+            self.disk_cache = DiskCache(folder_path)
+            self.disk_cache.prune(
+                [os.path.basename(file_path) for file_path in self.image_path_list]
             )
 
+            # 更新缩略图
+            if self.thumbnail_panel:
+                self.thumbnail_panel.reset_thumbnails()
+
             # 设置各项参数
             self.image_max_number.setText(str(len(self.image_path_list)))
             self.show_image(0)
 
+    # 图集中的文件发生变化后，更新图片路径列表，仅清除受影响的缓存
+    def refresh_image_folder(self):
+        # 判断是否有图集
+        if not self.current_folder_path:
+            return
+        # 获取文件夹索引，自动保存写入的临时文件、页面索引与日志不会使索引过期
+        try:
+            new_path_list = list(
+                self.folder_indexer.get_index(self.current_folder_path).image_paths
+            )
+        except OSError:
+            return
+        # 当前图片若被修改，则需要重新加载
+        current_path = self.current_image_path
+        current_changed = (
+            current_path is not None
+            and ImageCache.get_key(current_path) != self.current_image_key
+        )
+        # 图片没有增删且当前图片未被修改时，变化来自其他文件，无需处理
+        if new_path_list == self.image_path_list and not current_changed:
+            return
+        # 被删除的图片，清除其缓存
+        removed_paths = set(self.image_path_list) - set(new_path_list)
+        for file_path in removed_paths:
+            self.image_cache.remove(file_path)
+            self.render_cache.remove(file_path)
+        if self.disk_cache:
+            self.disk_cache.prune(
+                [os.path.basename(file_path) for file_path in new_path_list]
+            )
+        # 判断列表是否改变
+        if new_path_list != self.image_path_list:
+            self.image_path_list = new_path_list
+            self.image_max_number.setText(str(len(self.image_path_list)))
+            if self.thumbnail_panel:
+                self.thumbnail_panel.update_thumbnails(removed_paths)
+            # 尽量保持显示当前图片
+            if current_path in self.image_path_list:
+                self.current_image_index = self.image_path_list.index(current_path)
+                self.jump_image_number.setText(str(self.current_image_index + 1))
+            else:
+                current_changed = True
+        # 若当前图片被删除或修改，则重新显示
+        if current_changed and self.image_path_list:
+            self.show_image(
+                min(self.current_image_index, len(self.image_path_list) - 1)
+            )
+        elif not self.image_path_list:
+            self.image_label.clear()
+            self.tiled_view.clear_image()
+
     # 判断是否需要创建文档文件
     def judge_path_has_doc_or_not(self, folder_path):
         # 并检测目录下是否存在mtm后缀的文件
-        text_file_path_list = [
-            os.path.normpath(os.path.join(folder_path, f))
-            for f in os.listdir(folder_path)
-            if f.lower().endswith(".mtm")
-        ]
+        text_file_path_list = self.folder_indexer.get_index(folder_path).text_paths
         # 判断数量
         if len(text_file_path_list) == 1:
             # 若存在且只存在一个，则读取
@@ -216,32 +401,170 @@ class ImagePanel(QWidget):
             self.menu_box.show_message("提示", "路径下存在多个文档文件，请保留其一")
 
     # 加载图片
+    @Profiler.trace
     def load_image(self, file_path):
         # 判断路径是否存在
         if os.path.exists(file_path):
-            # 若存在，读取
-            self.image = QPixmap(file_path)
-
-            # 计算缩放比例
-            # 获取面板大小
-            panel_width = self.scroll_area.viewport().width()
-            panel_height = self.scroll_area.viewport().height()
-            # 获取图片原始长宽
-            original_width = self.image.width()
-            original_height = self.image.height()
-            # 计算长宽缩放比例
-            scale_width = panel_width / original_width
-            scale_height = panel_height / original_height
-            # 选取缩放比例更小的，作为真正缩放比例
-            self.scale_factor = min(scale_width, scale_height)
-
-            # 自动缩放图片适应面板大小
-            if not self.image.isNull():
-                self.update_image()
+            # 若存在，优先从内存缓存中读取
+            image = self.image_cache.get(file_path)
+            self.source_image = image
+            # 切换到其他图片时，重新计算重试次数
+            if file_path != self.current_image_path:
+                self.retry_count = 0
+            self.retry_timer.stop()
+            self.current_image_path = file_path
+            self.current_image_key = ImageCache.get_key(file_path)
+            self.showing_preview = False
+
+            # 判断是否使用分块显示
+            if self.use_tiled_view:
+                # 若是，交给分块图片视图，不生成完整的缩放图片
+                # 原图大小仅读取文件头获得，缩小后的级别优先从磁盘缓存读取
+                # 原图的图块仅解码对应的区域
+                self.image = None
+                size = image.size() if image else QImageReader(file_path).size()
+                if size.isEmpty():
+                    self.retry_image(file_path)
+                self.tiled_view.set_image(
+                    size,
+                    lambda level: self.load_pyramid_level(file_path, level),
+                    lambda level, level_image: self.store_pyramid_level(
+                        file_path, level, level_image
+                    ),
+                    lambda rect: self.load_image_region(file_path, rect),
+                )
+            else:
+                # 若内存缓存中没有，则先尝试读取磁盘缓存中的预览图，并在后台解码原图
+                if image is None and self.disk_cache:
+                    image = self.disk_cache.load(file_path, "preview")
+                    if image is not None:
+                        self.showing_preview = True
+                        self.start_image_load(file_path)
+                # 若都没有，则直接解码
+                if image is None:
+                    image = self.decode_image(file_path)
+                    self.source_image = image
+                # 无法解码时清空显示，稍后重试
+                if image.isNull():
+                    self.image = None
+                    self.source_image = None
+                    self.image_label.clear()
+                    self.image_name_lable.setText(os.path.basename(file_path))
+                    self.retry_image(file_path)
+                    return
+                self.image = QPixmap.fromImage(image)
+
+                # 计算缩放比例
+                # 获取面板大小
+                panel_width = self.scroll_area.viewport().width()
+                panel_height = self.scroll_area.viewport().height()
+                # 获取图片原始长宽
+                original_width = self.image.width()
+                original_height = self.image.height()
+                # 计算长宽缩放比例
+                scale_width = panel_width / original_width
+                scale_height = panel_height / original_height
+                # 选取缩放比例更小的，作为真正缩放比例
+                self.scale_factor = min(scale_width, scale_height)
+
+                # 自动缩放图片适应面板大小，切换图片时立即开始平滑缩放
+                if not self.image.isNull():
+                    self.update_image(render_delay=0)
 
             # 更改图片名称显示
             self.image_name_lable.setText(os.path.basename(file_path))
 
+    # 稍后重新加载无法解码的图片，例如仍在写入的扫描图，超过次数后不再重试
+    # 分块显示时每个图块都可能解码失败，已在等待重试时不再计数
+    def retry_image(self, file_path):
+        if file_path != self.current_image_path or self.retry_timer.isActive():
+            return
+        if self.retry_count < self.max_retries:
+            self.retry_count += 1
+            self.retry_timer.start(self.retry_delay)
+
+    # 重新加载当前图片
+    def retry_load_image(self):
+        if self.current_image_path:
+            self.load_image(self.current_image_path)
+
+    # 解码图片，放入内存缓存，并在后台写入磁盘缓存
+    def decode_image(self, file_path):
+        image = QImage(file_path)
+        self.image_cache.put(file_path, image)
+        if self.disk_cache and not self.disk_cache.contains(file_path, "preview"):
+            self.disk_thread_pool.start(
+                DiskCacheStoreTask(self.disk_cache, file_path, image)
+            )
+        return image
+
+    # 获取金字塔某一级别的图片，0级为原图，其余级别优先从磁盘缓存读取
+    # 磁盘缓存中没有时直接以缩小后的大小解码，不必先解码出完整的原图
+    def load_pyramid_level(self, file_path, level):
+        if level == 0:
+            image = self.image_cache.get(file_path)
+            if image is None:
+                image = self.decode_image(file_path)
+                if image.isNull():
+                    self.retry_image(file_path)
+            return image
+        if self.disk_cache:
+            image = self.disk_cache.load(file_path, f"level{level}")
+            if image is not None:
+                return image
+        # 与逐级缩小一半得到的大小相同
+        source_image = self.image_cache.get(file_path)
+        reader = QImageReader(file_path)
+        size = source_image.size() if source_image else reader.size()
+        size = QSize(max(1, size.width() >> level), max(1, size.height() >> level))
+        if source_image:
+            image = source_image.scaled(
+                size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+            )
+        else:
+            reader.setScaledSize(size)
+            image = reader.read()
+        if not image.isNull():
+            self.store_pyramid_level(file_path, level, image)
+        return image
+
+    # 读取原图的某一区域，内存缓存中有原图时直接复制，否则仅解码该区域
+    def load_image_region(self, file_path, rect):
+        image = self.image_cache.get(file_path)
+        if image is not None:
+            return image.copy(rect)
+        reader = QImageReader(file_path)
+        reader.setClipRect(rect)
+        image = reader.read()
+        if image.isNull():
+            self.retry_image(file_path)
+        return image
+
+    # 在后台将金字塔级别写入磁盘缓存
+    def store_pyramid_level(self, file_path, level, image):
+        if self.disk_cache:
+            self.disk_thread_pool.start(
+                DiskCacheStoreTask(self.disk_cache, file_path, image, f"level{level}")
+            )
+
+    # 在后台读取图片
+    def start_image_load(self, file_path):
+        if file_path in self.prefetching_paths:
+            return
+        self.prefetching_paths.add(file_path)
+        self.thread_pool.start(
+            ImageLoadTask(
+                file_path, self.image_cache, self.worker_signals, self.disk_cache
+            )
+        )
+
+    # 后台读取完成后
+    def on_image_loaded(self, file_path):
+        self.prefetching_paths.discard(file_path)
+        # 若当前正在显示该图片的预览图，则换为原图
+        if file_path == self.current_image_path and self.showing_preview:
+            self.load_image(file_path)
+
     # 切换至某张图片
     def show_image(self, index):
         # 判断图片文件路径列表是否存在
@@ -252,6 +575,41 @@ class ImagePanel(QWidget):
             self.load_image(self.image_path_list[self.current_image_index])
             # 顺便更改当前页数的值
             self.jump_image_number.setText(str(self.current_image_index + 1))
+            # 缩略图面板同样选中当前页
+            if self.thumbnail_panel:
+                self.thumbnail_panel.select_index(self.current_image_index)
+            # 在后台预读前后几张图片
+            self.prefetch_images(self.current_image_index)
+
+    # 预读某张图片前后的图片
+    def prefetch_images(self, index):
+        # 取消尚未开始的预读任务
+        self.thread_pool.clear()
+        self.prefetching_paths.clear()
+        # 由近及远，先后再前，当前图片尚未解码时也一并读取
+        for distance in range(0, self.prefetch_count + 1):
+            for neighbor_index in (index + distance, index - distance):
+                # 仅预读存在的图片，不做循环
+                if not 0 <= neighbor_index < len(self.image_path_list):
+                    continue
+                file_path = self.image_path_list[neighbor_index]
+                if not self.image_cache.contains(file_path):
+                    self.start_image_load(file_path)
+
+    # 切换分块显示
+    def toggle_tiled_view(self):
+        self.use_tiled_view = not self.use_tiled_view
+        # 切换面板
+        if self.use_tiled_view:
+            self.image_stack.setCurrentWidget(self.tiled_view)
+            self.image_label.clear()
+            self.render_timer.stop()
+        else:
+            self.image_stack.setCurrentWidget(self.scroll_area)
+            self.tiled_view.clear_image()
+        # 以新的方式重新加载当前图片
+        if self.image_path_list:
+            self.load_image(self.image_path_list[self.current_image_index])
 
     # 切换至前一张图片
     def show_prev_image(self):
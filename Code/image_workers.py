@@ -0,0 +1,110 @@
+from PyQt5.QtCore import Qt, QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+
+# 后台任务的信号
+# QRunnable自身无法发出信号，因此由这个对象代为发出，信号会在界面线程中被处理
+class ImageWorkerSignals(QObject):
+    loaded = pyqtSignal(str)  # 图片读取完成，参数为图片路径
+    rendered = pyqtSignal(str, int)  # 图片缩放完成，参数为图片路径与缩放级别
+    thumbnail_ready = pyqtSignal(str, QImage)  # 缩略图生成完成，参数为图片路径与缩略图
+
+
+# 图片读取任务，在线程池中解码图片并放入缓存
+# 若提供了磁盘缓存，则顺便生成预览图与缩略图
+class ImageLoadTask(QRunnable):
+    # 构造函数
+    def __init__(self, file_path, image_cache, signals, disk_cache=None):
+        super().__init__()
+        self.file_path = file_path  # 图片路径
+        self.image_cache = image_cache  # 图片缓存
+        self.signals = signals  # 信号
+        self.disk_cache = disk_cache  # 磁盘缓存
+
+    # 执行任务
+    def run(self):
+        # 若已经缓存，则无需重复读取
+        image = self.image_cache.get(self.file_path)
+        if image is None:
+            image = QImage(self.file_path)
+            self.image_cache.put(self.file_path, image)
+        # 若磁盘缓存中没有预览图，则生成
+        if self.disk_cache and not self.disk_cache.contains(self.file_path, "preview"):
+            self.disk_cache.store_renditions(self.file_path, image)
+        self.signals.loaded.emit(self.file_path)
+
+
+# 图片缩放任务，在线程池中进行平滑缩放并放入缓存
+class ImageScaleTask(QRunnable):
+    # 构造函数
+    def __init__(self, file_path, image, size, level, render_cache, signals):
+        super().__init__()
+        self.file_path = file_path  # 图片路径
+        self.image = image  # 原始图片，需为QImage
+        self.size = size  # 目标大小
+        self.level = level  # 缩放级别
+        self.render_cache = render_cache  # 缩放结果缓存
+        self.signals = signals  # 信号
+
+    # 执行任务
+    def run(self):
+        scaled_image = self.image.scaled(
+            self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation
+        )
+        self.render_cache.put(self.file_path, scaled_image, self.level)
+        self.signals.rendered.emit(self.file_path, self.level)
+
+
+# 磁盘缓存写入任务，未提供标签时写入预览图与缩略图
+class DiskCacheStoreTask(QRunnable):
+    # 构造函数
+    def __init__(self, disk_cache, file_path, image, tag=None):
+        super().__init__()
+        self.disk_cache = disk_cache  # 磁盘缓存
+        self.file_path = file_path  # 图片路径
+        self.image = image  # 需要写入的图片
+        self.tag = tag  # 缓存标签
+
+    # 执行任务
+    def run(self):
+        if self.tag is None:
+            self.disk_cache.store_renditions(self.file_path, self.image)
+        else:
+            self.disk_cache.store(self.file_path, self.tag, self.image)
+
+
+# 缩略图生成任务，优先读取磁盘缓存，没有时以缩小解码的方式读取原图
+class ThumbnailTask(QRunnable):
+    # 构造函数
+    def __init__(self, file_path, size, signals, disk_cache=None):
+        super().__init__()
+        self.file_path = file_path  # 图片路径
+        self.size = size  # 缩略图的最大边长
+        self.signals = signals  # 信号
+        self.disk_cache = disk_cache  # 磁盘缓存
+
+    # 执行任务
+    def run(self):
+        image = None
+        if self.disk_cache:
+            image = self.disk_cache.load(self.file_path, "thumbnail")
+        if image is None:
+            # 有磁盘缓存时按磁盘缓存的缩略图大小解码，以便写入缓存
+            decode_size = (
+                self.disk_cache.thumbnail_size if self.disk_cache else self.size
+            )
+            # 仅解码到所需大小，JPEG等格式可以大幅减少解码时间
+            reader = QImageReader(self.file_path)
+            original_size = reader.size()
+            if max(original_size.width(), original_size.height()) > decode_size:
+                reader.setScaledSize(
+                    original_size.scaled(decode_size, decode_size, Qt.KeepAspectRatio)
+                )
+            image = reader.read()
+            if self.disk_cache and not image.isNull():
+                self.disk_cache.store(self.file_path, "thumbnail", image)
+        if not image.isNull():
+            image = image.scaled(
+                self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation
+            )
+        self.signals.thumbnail_ready.emit(self.file_path, image)
@@ -0,0 +1,198 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+import sqlite3
+
+from core.markup_parser import MarkupParseError
+from core.translation_memory import TranslationMemory
+
+
+# 翻译记忆记录任务的信号
+class MemoryWorkerSignals(QObject):
+    recorded = pyqtSignal()  # 记录完成
+    failed = pyqtSignal(str)  # 记录失败，参数为错误信息
+
+
+# 翻译记忆记录任务，在线程池中使用单独的数据库连接写入
+class MemoryRecordTask(QRunnable):
+    # 构造函数
+    def __init__(self, memory_path, ignored_texts, records, signals):
+        super().__init__()
+        self.memory_path = memory_path  # 翻译记忆地址
+        self.ignored_texts = set(ignored_texts)  # 不记录的文本
+        self.records = records  # 以文档地址为键，值为(页码, 行号, 原文, 译文)的列表
+        self.signals = signals  # 信号
+
+    # 执行任务
+    def run(self):
+        try:
+            translation_memory = TranslationMemory(self.memory_path)
+            try:
+                translation_memory.ignored_texts = self.ignored_texts
+                for document_path, records in self.records.items():
+                    translation_memory.record_segments(document_path, records)
+            finally:
+                translation_memory.close()
+        except sqlite3.Error as error:
+            self.signals.failed.emit(str(error))
+            return
+        self.signals.recorded.emit()
+
+
+# 翻译记忆栏
+# 选中单元格时以该文本组的原文查询翻译记忆，列出完全相同与相似原文的译文，双击即可填入译文
+# 当前文本组自身的原文与译文不作为建议
+# 显示过的页面与修改过的文本组会被记录到翻译记忆中，记录先按位置暂存，
+# 短时间内的多次修改只保留最后的文本，稍后在后台线程中写入，界面线程只负责查询
+class MemoryPanel(QWidget):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.text_panel = None  # 隔壁的文本面板
+        self.translation_memory = None  # 翻译记忆，打开失败时为空
+        self.current_location = None  # 当前查询的文本组，(页码, 行号)
+        self.recorded_page_number = None  # 最近记录的页面，避免重复记录
+        self.suggestions = []  # 当前建议，(相似度, 原文, 译文)的列表
+        # 尚未写入的记录，键为(文档地址, 页码, 行号)，值为原文与译文
+        self.pending_records = {}
+
+        # 记录线程池，单线程保证按顺序写入
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.worker_signals = MemoryWorkerSignals()
+        self.worker_signals.recorded.connect(self.on_recorded)
+        self.worker_signals.failed.connect(self.on_record_failed)
+        # 防抖计时器，停止修改一段时间后才写入
+        self.delay = 1000  # 防抖时长，单位毫秒
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+        # 布局
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.status_label = QLabel("翻译记忆")
+        self.suggestion_list = QListWidget()
+        self.layout.addWidget(self.status_label)
+        self.layout.addWidget(self.suggestion_list)
+
+        # 绑定方法
+        self.suggestion_list.itemDoubleClicked.connect(self.apply_suggestion)
+
+    # 打开翻译记忆，file_path为空时使用默认位置
+    def open_memory(self, file_path=None):
+        self.close_memory()
+        try:
+            self.translation_memory = TranslationMemory(file_path)
+        except sqlite3.Error as error:
+            self.status_label.setText(f"无法打开翻译记忆：{error}")
+            return
+        # 预设内容不记录
+        self.translation_memory.ignored_texts = {
+            self.text_panel.default_original_text,
+            self.text_panel.deafult_translated_text,
+        }
+        self.status_label.setText("翻译记忆")
+
+    # 关闭翻译记忆，关闭前写入暂存的记录
+    def close_memory(self):
+        if self.translation_memory:
+            self.flush()
+            self.thread_pool.waitForDone()
+            self.translation_memory.close()
+            self.translation_memory = None
+
+    # 获取文本组，页面格式有误或文本组不存在时返回空
+    def get_dialogs(self, page_number):
+        try:
+            return self.text_panel.current_data[page_number]
+        except (KeyError, MarkupParseError):
+            return []
+
+    # 记录某页的所有文本组
+    def record_page(self, page_number):
+        if not self.translation_memory:
+            return
+        self.recorded_page_number = page_number
+        for row in range(len(self.get_dialogs(page_number))):
+            self.record_dialog(page_number, row)
+
+    # 暂存某个文本组的原文与译文，同一位置只保留最后一次的文本
+    def record_dialog(self, page_number, row):
+        dialogs = self.get_dialogs(page_number)
+        if not 0 <= row < len(dialogs):
+            return
+        document_path = self.text_panel.current_text_path or ""
+        self.pending_records[(document_path, page_number, row)] = (
+            dialogs[row].original_text,
+            dialogs[row].translated_text,
+        )
+        self.timer.start(self.delay)
+
+    # 在后台写入暂存的记录
+    def flush(self):
+        self.timer.stop()
+        if not self.translation_memory or not self.pending_records:
+            return
+        records = {}
+        for (document_path, page_number, row), texts in self.pending_records.items():
+            records.setdefault(document_path, []).append((page_number, row, *texts))
+        self.pending_records = {}
+        self.thread_pool.start(
+            MemoryRecordTask(
+                self.translation_memory.file_path,
+                self.translation_memory.ignored_texts,
+                records,
+                self.worker_signals,
+            )
+        )
+
+    # 写入完成后，重新查询当前文本组
+    def on_recorded(self):
+        if self.translation_memory and self.current_location:
+            self.show_suggestions(*self.current_location)
+
+    # 写入失败时仅提示
+    def on_record_failed(self, message):
+        self.status_label.setText(f"翻译记忆写入失败：{message}")
+
+    # 选中单元格时，查询该文本组的原文
+    def show_suggestions(self, page_number, row):
+        self.current_location = (page_number, row)
+        self.suggestion_list.clear()
+        self.suggestions = []
+        if not self.translation_memory:
+            return
+        # 第一次选中某页时记录该页
+        if page_number != self.recorded_page_number:
+            self.record_page(page_number)
+        dialogs = self.get_dialogs(page_number)
+        if not 0 <= row < len(dialogs):
+            return
+        try:
+            self.suggestions = self.translation_memory.lookup(
+                dialogs[row].original_text, dialogs[row].translated_text
+            )
+        except sqlite3.Error as error:
+            self.status_label.setText(f"翻译记忆查询失败：{error}")
+            return
+        for score, original_text, translated_text in self.suggestions:
+            self.suggestion_list.addItem(
+                f"{score:.0%}  {original_text}  →  {translated_text}"
+            )
+
+    # 文本组被修改后，暂存新的原文与译文，若正在查询该文本组则重新查询
+    def on_dialog_edited(self, page_number, row):
+        if not self.translation_memory:
+            return
+        self.record_dialog(page_number, row)
+        if self.current_location == (page_number, row):
+            self.show_suggestions(page_number, row)
+
+    # 将建议的译文填入当前文本组
+    def apply_suggestion(self, item):
+        if not self.current_location:
+            return
+        page_number, row = self.current_location
+        translated_text = self.suggestions[self.suggestion_list.row(item)][2]
+        model = self.text_panel.get_table_view().model()
+        model.setData(model.index(model.get_row(page_number, row), 2), translated_text)
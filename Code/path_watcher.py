@@ -0,0 +1,45 @@
+from PyQt5.QtCore import QFileSystemWatcher, QTimer
+import os
+
+
+# 路径监视器
+# 监视一个文件或文件夹，发生变化后等待一段时间，若期间没有新的变化，则调用回调函数
+# 文件被替换后系统会停止监视，因此每次变化后会重新添加路径
+class PathWatcher:
+    # 构造函数
+    def __init__(self, callback, delay=500):
+        self.callback = callback  # 回调函数
+        self.path = None  # 当前监视的路径
+        self.watcher = QFileSystemWatcher()
+        # 防抖计时器，连续的变化只会调用一次回调函数
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.on_timeout)
+        self.watcher.fileChanged.connect(lambda _: self.timer.start())
+        self.watcher.directoryChanged.connect(lambda _: self.timer.start())
+
+    # 开始监视某个路径
+    def watch(self, path):
+        self.clear()
+        if path and os.path.exists(path):
+            self.path = path
+            self.watcher.addPath(path)
+
+    # 停止监视
+    def clear(self):
+        self.timer.stop()
+        watched_paths = self.watcher.files() + self.watcher.directories()
+        if watched_paths:
+            self.watcher.removePaths(watched_paths)
+        self.path = None
+
+    # 计时结束后
+    def on_timeout(self):
+        if not self.path:
+            return
+        # 若路径因被替换而不再被监视，则重新添加
+        watched_paths = self.watcher.files() + self.watcher.directories()
+        if self.path not in watched_paths and os.path.exists(self.path):
+            self.watcher.addPath(self.path)
+        self.callback()
@@ -0,0 +1,299 @@
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPushButton,
+    QLineEdit,
+    QCheckBox,
+    QLabel,
+    QTableView,
+    QHeaderView,
+    QAbstractItemView,
+    QFileDialog,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QTimer,
+    QAbstractTableModel,
+    QModelIndex,
+    QDir,
+    pyqtSignal,
+)
+import itertools
+import sqlite3
+import os
+
+from core.project_index import ProjectIndex
+from core.translation_memory import TranslationMemory
+
+
+# 项目索引任务的信号
+class ProjectWorkerSignals(QObject):
+    # 索引更新完成，参数为项目文件夹与更新、移除的文档数量
+    indexed = pyqtSignal(str, int, int)
+    failed = pyqtSignal(str, str)  # 索引更新失败，参数为项目文件夹与错误信息
+
+
+# 项目索引更新任务，在线程池中使用单独的数据库连接更新索引
+# 重新索引的文档中的原文与译文随后导入翻译记忆
+class ProjectIndexTask(QRunnable):
+    batch_size = 5000  # 每次写入翻译记忆的文本组数量
+
+    # 构造函数
+    def __init__(self, root_path, signals, memory_path=None, ignored_texts=()):
+        super().__init__()
+        self.root_path = root_path  # 项目文件夹
+        self.signals = signals  # 信号
+        self.memory_path = memory_path  # 翻译记忆地址，为空时不导入
+        self.ignored_texts = set(ignored_texts)  # 不导入翻译记忆的文本
+
+    # 执行任务
+    def run(self):
+        try:
+            project_index = ProjectIndex(self.root_path)
+            try:
+                indexed_count, removed_count = project_index.update()
+                if self.memory_path and project_index.indexed_file_ids:
+                    translation_memory = TranslationMemory(self.memory_path)
+                    translation_memory.ignored_texts = self.ignored_texts
+                    # 分批写入，避免长时间占用翻译记忆，使界面线程无法写入
+                    segments = project_index.iter_segments(
+                        project_index.indexed_file_ids
+                    )
+                    try:
+                        batch = list(itertools.islice(segments, self.batch_size))
+                        while batch:
+                            translation_memory.add_segments(batch)
+                            batch = list(itertools.islice(segments, self.batch_size))
+                    finally:
+                        translation_memory.close()
+            finally:
+                project_index.close()
+        except (OSError, sqlite3.Error) as error:
+            self.signals.failed.emit(self.root_path, str(error))
+            return
+        self.signals.indexed.emit(self.root_path, indexed_count, removed_count)
+
+
+# 项目查找结果数据模型
+class ProjectHitModel(QAbstractTableModel):
+    headers = ("文档", "页码", "讲述人", "原文", "译文")  # 表头
+
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.root_path = None  # 项目文件夹，文档以相对路径显示
+        self.hits = []  # 查找结果，(文档路径, 页码, 行号, 讲述人, 原文, 译文)的列表
+
+    # 设置查找结果
+    def set_hits(self, root_path, hits):
+        self.beginResetModel()
+        self.root_path = root_path
+        self.hits = hits
+        self.endResetModel()
+
+    # 行数，即结果数量
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.hits)
+
+    # 列数
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    # 获取数据
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        file_path, page_number, _, speaker, original_text, translated_text = self.hits[
+            index.row()
+        ]
+        column = index.column()
+        if column == 0:
+            return os.path.relpath(file_path, self.root_path)
+        if column == 1:
+            return str(page_number)
+        return (speaker, original_text, translated_text)[column - 2]
+
+    # 表头
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+
+# 项目检索面板
+# 打开一个文件夹作为项目，在后台更新项目索引，随后可以在整个系列中查找词语或讲述人
+# 双击结果时打开对应的文档与图集，并跳转到对应的单元格
+class ProjectPanel(QWidget):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.text_panel = None  # 隔壁的文本面板
+        self.image_panel = None  # 隔壁的图片面板
+        self.project_index = None  # 当前项目索引，仅在界面线程中用于查找
+        self.is_indexing = False  # 是否正在更新索引
+
+        # 布局
+        self.layout = QVBoxLayout(self)
+        self.control_layout = QHBoxLayout()
+        self.open_button = QPushButton("打开项目")
+        self.update_button = QPushButton("更新索引")
+        self.status_label = QLabel("未打开项目")
+        self.control_layout.addWidget(self.open_button)
+        self.control_layout.addWidget(self.update_button)
+        self.control_layout.addWidget(self.status_label, 1)
+        self.layout.addLayout(self.control_layout)
+        self.query_layout = QHBoxLayout()
+        self.query_text = QLineEdit()
+        self.query_text.setPlaceholderText("在项目中查找")
+        self.speaker_box = QCheckBox("按讲述人")
+        self.query_layout.addWidget(self.query_text, 1)
+        self.query_layout.addWidget(self.speaker_box)
+        self.layout.addLayout(self.query_layout)
+        self.hit_model = ProjectHitModel()
+        self.hit_view = QTableView()
+        self.hit_view.setModel(self.hit_model)
+        self.hit_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.hit_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.hit_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.layout.addWidget(self.hit_view)
+
+        # 后台更新索引
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.worker_signals = ProjectWorkerSignals()
+        self.worker_signals.indexed.connect(self.on_indexed)
+        self.worker_signals.failed.connect(self.on_index_failed)
+
+        # 防抖计时器，输入停止后再查找
+        self.delay = 200  # 防抖时长，单位毫秒
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.search)
+
+        # 绑定方法
+        self.open_button.clicked.connect(self.open_project)
+        self.update_button.clicked.connect(self.update_index)
+        self.query_text.textChanged.connect(lambda: self.search_timer.start(self.delay))
+        self.query_text.returnPressed.connect(self.search)
+        self.speaker_box.toggled.connect(self.search)
+        self.hit_view.doubleClicked.connect(self.open_hit)
+
+    # 打开项目
+    def open_project(self):
+        if self.project_index:
+            default_path = self.project_index.root_path
+        elif self.text_panel.current_text_path:
+            default_path = os.path.dirname(self.text_panel.current_text_path)
+        else:
+            default_path = QDir.homePath()
+        folder_path = QFileDialog.getExistingDirectory(self, "打开项目", default_path)
+        if folder_path:
+            self.open_project_with_path(folder_path)
+
+    # 打开项目，传入了路径的版本
+    def open_project_with_path(self, folder_path):
+        self.close_project()
+        try:
+            self.project_index = ProjectIndex(folder_path)
+        except sqlite3.Error as error:
+            self.text_panel.menu_box.show_message("提示", f"无法打开项目索引：{error}")
+            return
+        self.update_index()
+
+    # 关闭项目
+    def close_project(self):
+        if self.project_index:
+            self.project_index.close()
+            self.project_index = None
+        self.hit_model.set_hits(None, [])
+        self.status_label.setText("未打开项目")
+
+    # 在后台更新索引
+    def update_index(self):
+        if not self.project_index or self.is_indexing:
+            return
+        self.is_indexing = True
+        self.status_label.setText("正在更新索引……")
+        # 同时将重新索引的文档导入翻译记忆
+        translation_memory = self.text_panel.memory_panel.translation_memory
+        self.thread_pool.start(
+            ProjectIndexTask(
+                self.project_index.root_path,
+                self.worker_signals,
+                translation_memory.file_path if translation_memory else None,
+                translation_memory.ignored_texts if translation_memory else (),
+            )
+        )
+
+    # 索引更新完成后，重新查找
+    def on_indexed(self, root_path, indexed_count, removed_count):
+        self.is_indexing = False
+        if not self.project_index or root_path != self.project_index.root_path:
+            return
+        self.status_label.setText(
+            f"索引已更新，更新{indexed_count}个文档，移除{removed_count}个文档"
+        )
+        self.search()
+
+    # 索引更新失败
+    def on_index_failed(self, root_path, message):
+        self.is_indexing = False
+        self.status_label.setText(f"索引更新失败：{message}")
+
+    # 查找
+    def search(self):
+        self.search_timer.stop()
+        if not self.project_index:
+            return
+        query = self.query_text.text()
+        try:
+            if self.speaker_box.isChecked():
+                hits = self.project_index.search_speaker(query)
+            else:
+                hits = self.project_index.search(query)
+        except sqlite3.Error as error:
+            self.status_label.setText(f"查找失败：{error}")
+            return
+        self.hit_model.set_hits(self.project_index.root_path, hits)
+
+    # 打开结果所在的文档与图集，并跳转到对应的单元格
+    def open_hit(self, model_index):
+        hit = self.hit_model.hits[model_index.row()]
+        # 打开文档，文档在后台读取，读取完成后再跳转
+        if os.path.normpath(self.text_panel.current_text_path or "") != hit[0]:
+            self.text_panel.open_text_file_with_path(hit[0], lambda: self.show_hit(hit))
+        else:
+            self.show_hit(hit)
+
+    # 跳转到已打开的文档中结果所在的单元格，同时打开对应的图集
+    def show_hit(self, hit):
+        file_path, page_number, row, *texts = hit
+        if not self.text_panel.text_is_mtm:
+            return
+        # 打开文档所在文件夹的图集
+        folder_path = os.path.dirname(file_path)
+        if (
+            self.image_panel.current_folder_path != folder_path
+            and self.image_panel.judge_images_exist(folder_path)
+        ):
+            self.image_panel.open_image_folder_with_path(folder_path)
+        # 跳转到包含查询的列，按讲述人查找时跳转到讲述人
+        query = self.query_text.text().lower()
+        column = 1
+        if self.speaker_box.isChecked():
+            column = 0
+        else:
+            for index, text in enumerate(texts):
+                if query in text.lower():
+                    column = index
+                    break
+        if page_number in self.text_panel.current_data:
+            self.text_panel.show_hit(page_number, row, column)
@@ -0,0 +1,104 @@
+from PyQt5.QtWidgets import (
+    QWidget,
+    QHBoxLayout,
+    QLineEdit,
+    QPushButton,
+    QCheckBox,
+    QLabel,
+)
+from PyQt5.QtCore import Qt
+
+
+# 查找替换栏
+# 输入时即时查找，结果来自文本面板的搜索索引，可以逐个跳转到匹配的单元格
+# 全部替换时一次修改所有匹配的文本组，随后只保存一次
+class SearchPanel(QWidget):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.text_panel = None  # 隔壁的文本面板
+        self.hits = []  # 查找结果，(页码, 行号, 列号)的列表
+        self.hit_index = -1  # 当前跳转到的结果
+        self.hits_version = None  # 查找结果对应的索引版本
+
+        # 布局
+        self.layout = QHBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.find_text = QLineEdit()
+        self.find_text.setPlaceholderText("查找")
+        self.replace_text = QLineEdit()
+        self.replace_text.setPlaceholderText("替换为")
+        self.match_case_box = QCheckBox("区分大小写")
+        self.hit_label = QLabel("0/0")  # 当前结果序号与结果总数
+        self.prev_button = QPushButton("上一个")
+        self.next_button = QPushButton("下一个")
+        self.replace_button = QPushButton("全部替换")
+        self.layout.addWidget(self.find_text, 30)
+        self.layout.addWidget(self.replace_text, 30)
+        self.layout.addWidget(self.match_case_box)
+        self.layout.addWidget(self.hit_label, 5, alignment=Qt.AlignCenter)
+        self.layout.addWidget(self.prev_button, 10)
+        self.layout.addWidget(self.next_button, 10)
+        self.layout.addWidget(self.replace_button, 10)
+
+        # 绑定方法
+        self.find_text.textChanged.connect(self.update_hits)
+        self.find_text.returnPressed.connect(self.show_next_hit)
+        self.match_case_box.toggled.connect(self.update_hits)
+        self.prev_button.clicked.connect(self.show_prev_hit)
+        self.next_button.clicked.connect(self.show_next_hit)
+        self.replace_button.clicked.connect(self.replace_all)
+
+    # 重新查找
+    def update_hits(self):
+        search_index = self.text_panel.search_index
+        self.hits = search_index.search(
+            self.find_text.text(), self.match_case_box.isChecked()
+        )
+        self.hits_version = search_index.version
+        self.hit_index = -1
+        self.update_hit_label()
+
+    # 更新结果数量显示
+    def update_hit_label(self):
+        self.hit_label.setText(f"{self.hit_index + 1}/{len(self.hits)}")
+
+    # 跳转到前后第step个结果
+    def show_hit(self, step):
+        # 文档修改后查找结果可能已经过期，此时重新查找，并尽量保持当前位置
+        if self.hits_version != self.text_panel.search_index.version:
+            hit_index = self.hit_index
+            self.update_hits()
+            self.hit_index = min(hit_index, len(self.hits) - 1)
+        if not self.hits:
+            return
+        if self.hit_index < 0:
+            # 尚未跳转时，向后从第一个开始，向前从最后一个开始
+            self.hit_index = 0 if step > 0 else len(self.hits) - 1
+        else:
+            self.hit_index = (self.hit_index + step) % len(self.hits)
+        self.update_hit_label()
+        self.text_panel.show_hit(*self.hits[self.hit_index])
+
+    # 上一个结果
+    def show_prev_hit(self):
+        self.show_hit(-1)
+
+    # 下一个结果
+    def show_next_hit(self):
+        self.show_hit(1)
+
+    # 全部替换
+    def replace_all(self):
+        count = self.text_panel.replace_all_text(
+            self.find_text.text(),
+            self.replace_text.text(),
+            self.match_case_box.isChecked(),
+        )
+        self.update_hits()
+        self.text_panel.menu_box.show_message("提示", f"共替换了{count}处")
+
+    # 显示时聚焦到查找框
+    def focus_find_text(self):
+        self.find_text.setFocus()
+        self.find_text.selectAll()
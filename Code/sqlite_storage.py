@@ -0,0 +1,264 @@
+import tempfile
+import sqlite3
+import os
+
+from core.storage_backend import StorageBackend
+from core.document_model import PagedDocument
+
+
+# 数据库文档
+# 页面列表在打开时读取，文本组在页面被访问时才从数据库中读取
+# 页面的位置为数据库中的页面编号，页码由页面的排列位置决定
+# 页面表同时保存页面标记上的编号，导出为mtm文档或CSV文件时保持原有的编号
+# 修改后仅执行对应行的语句，事务由存储后端统一提交
+class SqliteDocument(PagedDocument):
+    # 构造函数
+    def __init__(self, connection):
+        super().__init__(
+            [
+                page_id
+                for page_id, in connection.execute(
+                    "SELECT id FROM pages ORDER BY position"
+                )
+            ]
+        )
+        self.connection = connection  # 数据库连接
+        self.removed_page_ids = []  # 已删除但尚未写入数据库的页面编号
+
+    # 从数据库中读取页面
+    def load_dialogs(self, page):
+        return self.connection.execute(
+            "SELECT speaker, original_text, translated_text FROM dialogs "
+            "WHERE page = ? ORDER BY row",
+            (page.location,),
+        ).fetchall()
+
+    # 统计未读取页面的文本组数量，无需读取文本
+    def count_dialogs(self, page):
+        if page.location is None:
+            return 0
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM dialogs WHERE page = ?", (page.location,)
+        ).fetchone()
+        return count
+
+    # 删除页面，记录页面编号以便写入
+    def __delitem__(self, page_number):
+        page = self.get_page(page_number)
+        super().__delitem__(page_number)
+        if page.location is not None:
+            self.removed_page_ids.append((page_number, page.location))
+
+    # 将删除的页面写入数据库，其后页面的排列位置与编号减一
+    def write_removals(self):
+        cursor = self.connection.cursor()
+        for page_number, page_id in self.removed_page_ids:
+            cursor.execute("DELETE FROM dialogs WHERE page = ?", (page_id,))
+            cursor.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+            cursor.execute(
+                "UPDATE pages SET position = position - 1, number = number - 1 "
+                "WHERE position > ?",
+                (page_number,),
+            )
+        self.removed_page_ids.clear()
+
+    # 将页面的修改写入数据库，row为被修改的行，为None时重写整页
+    def write(self, page_number, row=None):
+        cursor = self.connection.cursor()
+        page = self.get_page(page_number)
+        dialogs = self[page_number]
+        # 新建的页面，其后页面的排列位置与编号加一
+        # 新页面使用原来在该位置的页面的编号，在末尾时为上一页的编号加一
+        if page.location is None:
+            (number,) = cursor.execute(
+                "SELECT COALESCE((SELECT number FROM pages WHERE position = ?), "
+                "(SELECT number + 1 FROM pages WHERE position = ?), ?)",
+                (page_number, page_number - 1, page_number),
+            ).fetchone()
+            cursor.execute(
+                "UPDATE pages SET position = position + 1, number = number + 1 "
+                "WHERE position >= ?",
+                (page_number,),
+            )
+            cursor.execute(
+                "INSERT INTO pages (position, number) VALUES (?, ?)",
+                (page_number, number),
+            )
+            page.location = cursor.lastrowid
+            row = None
+        if row is None:
+            # 重写整页
+            cursor.execute("DELETE FROM dialogs WHERE page = ?", (page.location,))
+            cursor.executemany(
+                "INSERT INTO dialogs VALUES (?, ?, ?, ?, ?)",
+                [
+                    (page.location, index, *dialog)
+                    for index, dialog in enumerate(dialogs)
+                ],
+            )
+        elif row < len(dialogs):
+            # 仅更新一行，该行不存在时插入
+            cursor.execute(
+                "UPDATE dialogs SET speaker = ?, original_text = ?, "
+                "translated_text = ? WHERE page = ? AND row = ?",
+                (*dialogs[row], page.location, row),
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "INSERT INTO dialogs VALUES (?, ?, ?, ?, ?)",
+                    (page.location, row, *dialogs[row]),
+                )
+        else:
+            # 删除末尾多余的行
+            cursor.execute(
+                "DELETE FROM dialogs WHERE page = ? AND row >= ?",
+                (page.location, len(dialogs)),
+            )
+        self.clear_dirty(page_number)
+
+    # 关闭数据库
+    def close(self):
+        self.connection.close()
+
+
+# 数据库存储后端
+# 以SQLite数据库保存文档，每个文本组为一行，以(页面编号, 行号)为主键
+# 修改时仅更新对应的行，无需重写整个文件，数据库使用WAL模式，提交时只追加日志
+class SqliteStorage(StorageBackend):
+    file_extensions = (".mtmdb",)  # 数据库文件后缀
+    schema = (
+        "CREATE TABLE IF NOT EXISTS pages ("
+        "id INTEGER PRIMARY KEY, position INTEGER NOT NULL, number INTEGER)",
+        "CREATE INDEX IF NOT EXISTS pages_position ON pages (position)",
+        "CREATE TABLE IF NOT EXISTS dialogs ("
+        "page INTEGER NOT NULL, row INTEGER NOT NULL, speaker TEXT NOT NULL, "
+        "original_text TEXT NOT NULL, translated_text TEXT NOT NULL, "
+        "PRIMARY KEY (page, row)) WITHOUT ROWID",
+    )  # 表结构
+
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        # 防抖计时器，短时间内的多次修改在同一个事务中提交
+        # 界面才需要计时器，在此导入，使数据库的读写方法无需加载Qt即可使用
+        from PyQt5.QtCore import QTimer
+
+        self.delay = 500  # 防抖时长，单位毫秒
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    # 连接数据库，若表不存在则创建
+    @classmethod
+    def connect(cls, file_path):
+        connection = sqlite3.connect(file_path)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        for statement in cls.schema:
+            connection.execute(statement)
+        # 旧版本的数据库没有页面编号，导出时以排列位置代替
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(pages)")]
+        if "number" not in columns:
+            connection.execute("ALTER TABLE pages ADD COLUMN number INTEGER")
+        connection.commit()
+        return connection
+
+    # 打开文档
+    def open_document(self, file_path, parser, progress=None):
+        return SqliteDocument(self.connect(file_path))
+
+    # 取消关联，关闭数据库
+    def detach(self):
+        data = self.data
+        super().detach()
+        if isinstance(data, SqliteDocument):
+            data.close()
+
+    # 标记页面已被修改，立即执行对应的语句，稍后统一提交
+    def mark_dirty(self, page_number, row=None):
+        try:
+            self.data.write(page_number, row)
+        except sqlite3.Error as error:
+            self.last_error = error
+        self.timer.start(self.delay)
+
+    # 标记页面已被删除
+    def mark_removed(self, page_number):
+        try:
+            self.data.write_removals()
+        except sqlite3.Error as error:
+            self.last_error = error
+        self.timer.start(self.delay)
+
+    # 提交事务
+    def flush(self):
+        self.timer.stop()
+        if not self.file_path:
+            return
+        try:
+            # 写入尚未写入的修改过的页面
+            for page_number in self.data.get_dirty_pages():
+                self.data.write(page_number)
+            self.data.connection.commit()
+        except sqlite3.Error as error:
+            self.last_error = error
+
+    # 将页面写入新的数据库，若文件已存在则替换，返回页数与文本组数量
+    # 先写入同目录下的临时文件，完成后再替换目标文件
+    @classmethod
+    def write_pages(cls, file_path, pages):
+        folder_path = os.path.dirname(os.path.abspath(file_path))
+        file_descriptor, temp_path = tempfile.mkstemp(
+            prefix=".", suffix=".tmp", dir=folder_path
+        )
+        os.close(file_descriptor)
+        dialog_count = 0
+        try:
+            connection = cls.connect(temp_path)
+            try:
+                # 页面编号与排列位置相同，页面标记上的编号另外保存
+                position = 0
+                for position, (page_number, dialogs) in enumerate(pages, 1):
+                    connection.execute(
+                        "INSERT INTO pages VALUES (?, ?, ?)",
+                        (position, position, page_number),
+                    )
+                    connection.executemany(
+                        "INSERT INTO dialogs VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (position, row, *dialog)
+                            for row, dialog in enumerate(dialogs)
+                        ],
+                    )
+                    dialog_count += len(dialogs)
+                connection.commit()
+            finally:
+                connection.close()
+            # 删除旧数据库残留的日志，防止被应用到新数据库上
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(file_path + suffix):
+                    os.remove(file_path + suffix)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            # 出错时删除临时文件
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return position, dialog_count
+
+    # 读取数据库中的所有页面，返回页面标记上的编号与文本组
+    @classmethod
+    def iter_pages(cls, file_path):
+        connection = cls.connect(file_path)
+        try:
+            document = SqliteDocument(connection)
+            page_numbers = [
+                page_number
+                for page_number, in connection.execute(
+                    "SELECT COALESCE(number, position) FROM pages ORDER BY position"
+                )
+            ]
+            for page_number, page in zip(page_numbers, document.pages):
+                yield page_number, document.load_dialogs(page)
+        finally:
+            connection.close()
@@ -0,0 +1,127 @@
+import subprocess
+import contextlib
+import tempfile
+import unittest
+import io
+import os
+import sys
+
+from batch_tool import BatchTool
+from core.markup_parser import MarkupParser
+
+
+# 批处理工具的测试
+class BatchToolTest(unittest.TestCase):
+    script_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "batch_tool.py"
+    )  # 批处理工具的脚本
+
+    # 创建包含七页的文档，每页一个文本组
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.parser = MarkupParser()
+        self.batch_tool = BatchTool(1)
+        self.pages = [(i, [("甲", f"o{i}", f"t{i}")]) for i in range(1, 8)]
+        self.file_path = self.write_file(
+            "a.mtm", self.parser.generate_document(self.pages)
+        )
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    # 在临时文件夹中写入文件，返回文件路径
+    def write_file(self, file_name, text):
+        file_path = os.path.join(self.folder.name, file_name)
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return file_path
+
+    # 读取文件的字节内容
+    @staticmethod
+    def read_bytes(file_path):
+        with open(file_path, "rb") as file:
+            return file.read()
+
+    # 执行命令，返回退出码与输出
+    def run_command(self, function, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            exit_code = function(*args)
+        return exit_code, output.getvalue()
+
+    def test_validate_reports_position(self):
+        bad_path = self.write_file(
+            "bad.mtm",
+            "<MangaTextManager>\n\t<Page001>\n\t\tjunk\n\t</Page001>\n</MangaTextManager>",
+        )
+        exit_code, output = self.run_command(
+            self.batch_tool.validate, [self.file_path, bad_path]
+        )
+        self.assertEqual(exit_code, 1)
+        self.assertIn(f"{bad_path}：第3行第3列", output)
+        self.assertNotIn(f"{self.file_path}：", output)
+
+    def test_validate_missing_start_tag(self):
+        bad_path = self.write_file("bad.mtm", "<Page001>\n</Page001>\n")
+        exit_code, output = self.run_command(self.batch_tool.validate, [bad_path])
+        self.assertEqual(exit_code, 1)
+        self.assertIn(MarkupParser.document_start_tag, output)
+
+    def test_validate_valid_file(self):
+        exit_code, _ = self.run_command(self.batch_tool.validate, [self.file_path])
+        self.assertEqual(exit_code, 0)
+
+    def test_command_exit_code(self):
+        bad_path = self.write_file("bad.mtm", "<MangaTextManager>\n<Page001>\n")
+        result = subprocess.run(
+            [sys.executable, self.script_path, "--jobs", "1", "validate", bad_path],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+        )
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("第2行第1列", result.stdout)
+
+    def test_split_and_merge_round_trip(self):
+        parts_folder = os.path.join(self.folder.name, "parts")
+        exit_code, _ = self.run_command(
+            self.batch_tool.split, self.file_path, 3, parts_folder
+        )
+        self.assertEqual(exit_code, 0)
+        part_names = sorted(os.listdir(parts_folder))
+        self.assertEqual(part_names, ["a_001.mtm", "a_002.mtm", "a_003.mtm"])
+        # 每份的页码重新从1开始编号
+        self.assertEqual(
+            [
+                page_number
+                for page_number, _ in self.batch_tool.read_pages(
+                    self.parser, os.path.join(parts_folder, "a_003.mtm")
+                )
+            ],
+            [1],
+        )
+        merged_path = os.path.join(self.folder.name, "merged.mtm")
+        exit_code, _ = self.run_command(
+            self.batch_tool.merge, [parts_folder], merged_path
+        )
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(self.read_bytes(merged_path), self.read_bytes(self.file_path))
+
+    def test_stats_skips_placeholders(self):
+        file_path = self.write_file(
+            "b.mtm",
+            self.parser.generate_document(
+                [(1, [("", "", ""), ("甲", "原文本", "译文"), ("乙", "", "真译文")])]
+            ),
+        )
+        _, error, stats = BatchTool.inspect_file(file_path)
+        self.assertIsNone(error)
+        self.assertEqual(stats["dialogs"], 3)
+        # 预设的原文与译文都不计入字数
+        self.assertEqual(stats["original_characters"], len("原文本"))
+        self.assertEqual(stats["translated"], 1)
+        self.assertEqual(stats["translated_characters"], len("真译文"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import subprocess
+import unittest
+import json
+import sys
+import os
+
+
+# 无界面模块的导入测试
+# 在子进程中导入core包中的所有模块与批处理工具，检查没有加载界面相关的库，且耗时不超过预算
+class ImportBudgetTest(unittest.TestCase):
+    budget = 100  # 导入耗时预算，单位毫秒，与benchmark.py的默认值相同
+    repeat = 5  # 重复次数，取最短耗时，排除磁盘缓存的影响
+    code_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (
+        "import importlib, json, os, sys, time\n"
+        "start = time.perf_counter()\n"
+        "for file_name in sorted(os.listdir('core')):\n"
+        "    if file_name.endswith('.py'):\n"
+        "        importlib.import_module('core.' + file_name[:-3])\n"
+        "importlib.import_module('batch_tool')\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps([elapsed, sorted(name for name in sys.modules "
+        "if name.split('.')[0] in ('PyQt5', 'pyperclip'))]))"
+    )
+
+    # 在子进程中导入，返回耗时与加载的界面相关模块
+    def run_import(self):
+        output = subprocess.run(
+            [sys.executable, "-c", self.script],
+            cwd=self.code_path,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return json.loads(output)
+
+    def test_no_gui_modules(self):
+        _, gui_modules = self.run_import()
+        self.assertEqual(gui_modules, [])
+
+    def test_import_time(self):
+        best_time = min(self.run_import()[0] for _ in range(self.repeat))
+        self.assertLessEqual(best_time * 1000, self.budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
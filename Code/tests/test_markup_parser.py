@@ -0,0 +1,180 @@
+import re
+import unittest
+
+from core.markup_parser import MarkupParser, MarkupParseError, MarkupTokenizer
+
+
+# 原有的正则表达式分析器，用于对照逐块分析的结果
+class RegexParser:
+    document_pattern = re.compile(
+        r"<MangaTextManager>(.*?)</MangaTextManager>", re.DOTALL
+    )
+    page_pattern = re.compile(r"<Page(\d+)>(.*?)</Page\1>", re.DOTALL)
+    dialog_pattern = re.compile(r'<Dialog Speaker="([^"]*)">(.*?)</Dialog>', re.DOTALL)
+
+    # 分析文档标记，返回页面列表
+    def parse_doucument(self, text):
+        match = self.document_pattern.search(text)
+        if not match:
+            return []
+        pages = []
+        for page_match in self.page_pattern.finditer(match.group(1)):
+            dialogs = []
+            for dialog_match in self.dialog_pattern.finditer(page_match.group(2)):
+                content = dialog_match.group(2).strip().split("\n")
+                if len(content) == 2:
+                    original_text, translated_text = content
+                else:
+                    original_text, translated_text = content[0], ""
+                dialogs.append(
+                    (
+                        dialog_match.group(1).strip(),
+                        original_text.strip(),
+                        translated_text.strip(),
+                    )
+                )
+            pages.append((int(page_match.group(1)), dialogs))
+        return pages
+
+
+# 标记分析器的测试
+class MarkupParserTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = MarkupParser()
+
+    # 按固定大小切分文本
+    @staticmethod
+    def split_chunks(text, size):
+        return [text[index : index + size] for index in range(0, len(text), size)]
+
+    # 用于测试的文档，包含多行文本、空白讲述人与标记前后的无关内容
+    def sample_document(self):
+        dialogs = [("甲", "今天天气很好", "It is fine"), ("乙", "明日下雨", "")]
+        document = "\n".join(
+            [
+                "<MangaTextManager>",
+                self.parser.generate_page(1, dialogs),
+                self.parser.generate_page(2, []),
+                "\t<Page012>",
+                '\t\t<Dialog Speaker=" 丙 ">\n第一行\n第二行\n第三行\n\t\t</Dialog>',
+                '<Dialog Speaker="">原文\n译文</Dialog>',
+                "\t</Page012>",
+                "</MangaTextManager>",
+            ]
+        )
+        return "说明文字<Page999>\n" + document + "\n结尾"
+
+    # 断言分析时抛出的错误位置
+    def assert_error_at(self, text, line, column):
+        with self.assertRaises(MarkupParseError) as context:
+            list(self.parser.iter_pages(text))
+        self.assertEqual(
+            (context.exception.line, context.exception.column), (line, column)
+        )
+        return context.exception
+
+    def test_matches_regex_parser(self):
+        text = self.sample_document()
+        self.assertEqual(
+            self.parser.parse_doucument(text), RegexParser().parse_doucument(text)
+        )
+
+    def test_generated_document_matches_regex_parser(self):
+        pages = [
+            (
+                page_number,
+                [("讲述人", f"原文{index}", f"译文{index}") for index in range(3)],
+            )
+            for page_number in range(1, 20)
+        ]
+        text = self.parser.generate_document(pages)
+        self.assertEqual(self.parser.parse_doucument(text), pages)
+        self.assertEqual(RegexParser().parse_doucument(text), pages)
+
+    def test_chunk_boundaries(self):
+        text = self.sample_document()
+        expected = self.parser.parse_doucument(text)
+        # 每种块大小都会让标记或文本在不同位置被切开
+        for size in range(1, 40):
+            with self.subTest(size=size):
+                self.assertEqual(
+                    list(self.parser.iter_pages(self.split_chunks(text, size))),
+                    expected,
+                )
+
+    def test_chunk_boundaries_with_empty_chunks(self):
+        text = self.sample_document()
+        chunks = []
+        for chunk in self.split_chunks(text, 3):
+            chunks.extend(["", chunk])
+        self.assertEqual(
+            list(self.parser.iter_pages(chunks)), self.parser.parse_doucument(text)
+        )
+
+    def test_tokenizer_find_across_chunks(self):
+        tokenizer = MarkupTokenizer(["ab<Dia", "lo", "g>"])
+        self.assertEqual(tokenizer.find("<Dialog>"), 2)
+        tokenizer = MarkupTokenizer(["ab", "c"])
+        self.assertEqual(tokenizer.find("<Dialog>"), -1)
+
+    def test_tokenizer_position(self):
+        tokenizer = MarkupTokenizer(["a\nb", "c\n\n", "  d"])
+        self.assertTrue(tokenizer.skip_whitespace())
+        tokenizer.advance(tokenizer.find("d"))
+        self.assertEqual((tokenizer.line, tokenizer.column), (4, 3))
+
+    def test_error_missing_page_end_tag(self):
+        error = self.assert_error_at(
+            '<MangaTextManager>\n\t<Page001>\n\t\t<Dialog Speaker="A">\nx\ny\n</Dialog>\n'
+            "</MangaTextManager>",
+            7,
+            1,
+        )
+        self.assertIn("</Page001>", error.message)
+        # 文本在页面中结束时，报告页面开始标记的位置
+        self.assert_error_at("<MangaTextManager>\n  <Page002>\n", 2, 3)
+
+    def test_error_unexpected_text(self):
+        self.assert_error_at(
+            "<MangaTextManager>\n\t<Page001>\n\t\tjunk\n\t</Page001>\n</MangaTextManager>",
+            3,
+            3,
+        )
+
+    def test_error_unterminated_dialog(self):
+        # 讲述人缺少结束引号与文本组缺少结束标记都报告文本组开始标记的位置
+        self.assert_error_at(
+            '<MangaTextManager>\n<Page001>\n  <Dialog Speaker="A>\nx\n</Page001>\n',
+            3,
+            3,
+        )
+        self.assert_error_at(
+            '<MangaTextManager>\n<Page001>\n  <Dialog Speaker="A">\nx\n</Page001>\n',
+            3,
+            3,
+        )
+
+    def test_error_missing_document_end_tag(self):
+        self.assert_error_at("<MangaTextManager>\n<Page001>\n</Page001>\n", 4, 1)
+
+    def test_error_position_with_small_chunks(self):
+        text = "<MangaTextManager>\n\t<Page001>\n\t\tjunk\n\t</Page001>\n</MangaTextManager>"
+        for size in (1, 2, 5):
+            with self.subTest(size=size):
+                with self.assertRaises(MarkupParseError) as context:
+                    list(self.parser.iter_pages(self.split_chunks(text, size)))
+                self.assertEqual(
+                    (context.exception.line, context.exception.column), (3, 3)
+                )
+
+    def test_parse_page(self):
+        self.assertEqual(
+            self.parser.parse_page(self.parser.generate_page(3, [("A", "x", "y")])),
+            [("A", "x", "y")],
+        )
+        with self.assertRaises(MarkupParseError):
+            self.parser.parse_page("junk")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import tempfile
+import unittest
+import os
+from unittest import mock
+
+from core.atomic_file import AtomicFile
+from core.lazy_document import LazyDocument, PageIndex
+from core.markup_parser import MarkupParser
+from core.mtm_journal import MtmJournal
+
+
+# 预写日志的测试
+class MtmJournalTest(unittest.TestCase):
+    # 创建包含五页的文档，每页一个文本组，原文为o1到o5
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.parser = MarkupParser()
+        self.file_path = os.path.join(self.folder.name, "test.mtm")
+        pages = [(i, [("甲", f"o{i}", f"t{i}")]) for i in range(1, 6)]
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            file.write(self.parser.generate_document(pages))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    # 打开文档并重放日志
+    def open_document(self):
+        document = LazyDocument(
+            self.file_path, PageIndex.scan(self.file_path), self.parser
+        )
+        journal = MtmJournal()
+        MtmJournal.replay(journal.open(self.file_path), document)
+        return document, journal
+
+    # 获取各页的原文
+    @staticmethod
+    def get_texts(document):
+        return [document[page_number][0].original_text for page_number in document]
+
+    # 模拟程序被关闭，不删除旧日志，也不关闭日志
+    @staticmethod
+    def crash(journal):
+        journal.file.close()
+        journal.file = None
+
+    # 记录修改后轮换日志并生成文档内容，write为True时写入文档，之后中断
+    def save_and_crash(self, document, journal, write=True):
+        generation = journal.rotate()
+        content, _ = document.serialize()
+        MtmJournal.mark_written(self.file_path, generation, journal.sequence, content)
+        if write:
+            AtomicFile.write(self.file_path, content)
+        self.crash(journal)
+
+    # 删除第2页，写入文档后，在删除旧日志前中断
+    def remove_page_and_crash(self):
+        document, journal = self.open_document()
+        del document[2]
+        journal.append_removal(2)
+        self.save_and_crash(document, journal)
+
+    # 在第2页前插入新页面，再删除第4页，write为True时写入文档，之后中断
+    def insert_remove_and_crash(self, write=True):
+        document, journal = self.open_document()
+        document.insert_page(2, [("乙", "new", "")])
+        journal.append_insertion(2, document[2])
+        del document[4]
+        journal.append_removal(4)
+        self.assertEqual(self.get_texts(document), self.expected_insert_remove)
+        self.save_and_crash(document, journal, write)
+
+    expected_insert_remove = ["o1", "new", "o2", "o4", "o5"]  # 插入再删除后各页的原文
+
+    # 文档已写入时，重新打开不会再次删除页面
+    def test_crash_between_write_and_discard(self):
+        self.remove_page_and_crash()
+        document, journal = self.open_document()
+        self.assertEqual(self.get_texts(document), ["o1", "o3", "o4", "o5"])
+        self.assertEqual(MtmJournal.list_generations(self.file_path), [])
+        self.assertFalse(os.path.exists(MtmJournal.get_marker_path(self.file_path)))
+        journal.close()
+
+    # 文档尚未替换时，重放旧日志恢复修改
+    def test_crash_before_write(self):
+        document, journal = self.open_document()
+        del document[2]
+        journal.append_removal(2)
+        self.save_and_crash(document, journal, write=False)
+        document, journal = self.open_document()
+        self.assertEqual(self.get_texts(document), ["o1", "o3", "o4", "o5"])
+        journal.close()
+
+    # 插入后删除，页数与操作前相同，文档尚未替换时两条记录都重放
+    def test_insert_then_remove_before_write(self):
+        self.insert_remove_and_crash(write=False)
+        document, journal = self.open_document()
+        self.assertEqual(self.get_texts(document), self.expected_insert_remove)
+        journal.close()
+
+    # 插入后删除，文档已写入时两条记录都不再重放
+    def test_insert_then_remove_after_write(self):
+        self.insert_remove_and_crash()
+        document, journal = self.open_document()
+        self.assertEqual(self.get_texts(document), self.expected_insert_remove)
+        self.assertEqual(MtmJournal.list_generations(self.file_path), [])
+        journal.close()
+
+    # 旧日志无法删除时，按照写入标记中的序号跳过已写入文档的记录
+    def test_replay_skips_written_records(self):
+        self.insert_remove_and_crash()
+        with mock.patch.object(MtmJournal, "discard", side_effect=OSError):
+            document, journal = self.open_document()
+        self.assertEqual(self.get_texts(document), self.expected_insert_remove)
+        self.assertEqual(MtmJournal.list_generations(self.file_path), [1])
+        # 之后的修改接着编号，写入后连同残留的旧日志一并删除
+        document[1] = [("甲", "edited", "")]
+        journal.append_page(1, document[1])
+        self.assertEqual(journal.sequence, 3)
+        self.save_and_crash(document, journal)
+        document, journal = self.open_document()
+        self.assertEqual(
+            self.get_texts(document), ["edited"] + self.expected_insert_remove[1:]
+        )
+        self.assertEqual(MtmJournal.list_generations(self.file_path), [])
+        journal.close()
+
+    # 没有序号的旧记录总是重放
+    def test_replay_records_without_sequence(self):
+        with open(MtmJournal.get_journal_path(self.file_path), "w") as file:
+            file.write('{"op": "remove", "page": 2}\n')
+        document, journal = self.open_document()
+        self.assertEqual(self.get_texts(document), ["o1", "o3", "o4", "o5"])
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
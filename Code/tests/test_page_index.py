@@ -0,0 +1,150 @@
+import tempfile
+import unittest
+import json
+import os
+from unittest import mock
+
+from core.lazy_document import LazyDocument, PageIndex
+from core.markup_parser import MarkupParser
+
+
+# 页面索引的测试
+class PageIndexTest(unittest.TestCase):
+    # 创建包含五页的文档，第i页有i个文本组
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.parser = MarkupParser()
+        self.file_path = os.path.join(self.folder.name, "test.mtm")
+        self.pages = [
+            (i, [("甲", f"o{i}-{j}", f"t{i}-{j}") for j in range(i)])
+            for i in range(1, 6)
+        ]
+        self.write_document(self.pages)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    # 写入文档
+    def write_document(self, pages):
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            file.write(self.parser.generate_document(pages))
+
+    # 读取索引文件
+    def read_index(self):
+        with open(
+            PageIndex.get_index_path(self.file_path), "r", encoding="utf-8"
+        ) as file:
+            return json.load(file)
+
+    # 加载索引，返回页面索引与是否重新扫描了文档
+    def load(self):
+        with mock.patch.object(PageIndex, "scan", wraps=PageIndex.scan) as scan:
+            entries = PageIndex.load(self.file_path)
+        return entries, scan.called
+
+    def test_round_trip(self):
+        entries, scanned = self.load()
+        self.assertTrue(scanned)
+        self.assertEqual([entry[0] for entry in entries], [1, 2, 3, 4, 5])
+        self.assertEqual([entry[4] for entry in entries], [1, 2, 3, 4, 5])
+        index = self.read_index()
+        self.assertEqual(index["version"], PageIndex.index_version)
+        # 文档未改变时直接使用索引文件
+        loaded_entries, scanned = self.load()
+        self.assertFalse(scanned)
+        self.assertEqual(loaded_entries, entries)
+
+    def test_entries_match_page_bytes(self):
+        entries = PageIndex.scan(self.file_path)
+        with open(self.file_path, "rb") as file:
+            data = file.read()
+        for page_number, start, end, crc, dialog_count in entries:
+            page_bytes = data[start:end]
+            self.assertTrue(page_bytes.startswith(f"<Page{page_number:03}>".encode()))
+            self.assertTrue(page_bytes.endswith(f"</Page{page_number:03}>".encode()))
+            self.assertEqual(
+                PageIndex.get_entry(page_number, start, page_bytes),
+                (page_number, start, end, crc, dialog_count),
+            )
+
+    def test_stale_after_size_change(self):
+        self.load()
+        self.write_document(self.pages[:3])
+        entries, scanned = self.load()
+        self.assertTrue(scanned)
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(self.read_index()["pages"], [list(entry) for entry in entries])
+
+    def test_stale_after_mtime_change(self):
+        self.load()
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        _, scanned = self.load()
+        self.assertTrue(scanned)
+
+    def test_stale_version(self):
+        self.load()
+        index = self.read_index()
+        index["version"] = PageIndex.index_version - 1
+        with open(
+            PageIndex.get_index_path(self.file_path), "w", encoding="utf-8"
+        ) as file:
+            json.dump(index, file)
+        _, scanned = self.load()
+        self.assertTrue(scanned)
+        self.assertEqual(self.read_index()["version"], PageIndex.index_version)
+
+    def test_corrupt_index(self):
+        with open(
+            PageIndex.get_index_path(self.file_path), "w", encoding="utf-8"
+        ) as file:
+            file.write("{")
+        entries, scanned = self.load()
+        self.assertTrue(scanned)
+        self.assertEqual(len(entries), 5)
+
+    def test_crc_mismatch_rescans(self):
+        entries, _ = self.load()
+        # 大小与修改时间都不变，但页面内容已被改变，索引文件无法察觉
+        stat = os.stat(self.file_path)
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            text = file.read()
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            file.write(text.replace("o3-1", "x3-1"))
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.load()[0], entries)
+        # 读取页面时校验值不符，不使用索引文件而是重新扫描，读取到新的内容
+        document = LazyDocument(self.file_path, entries, self.parser)
+        with mock.patch.object(PageIndex, "scan", wraps=PageIndex.scan) as scan:
+            self.assertEqual(document[3][1].original_text, "x3-1")
+        self.assertTrue(scan.called)
+        self.assertNotEqual(document.pages[2].location[3], entries[2][3])
+        # 重新扫描的结果写回索引文件
+        self.assertEqual(self.load()[0], PageIndex.scan(self.file_path))
+
+    def test_read_single_page_without_full_parse(self):
+        entries, _ = self.load()
+        document = LazyDocument(self.file_path, entries, self.parser)
+        with mock.patch.object(
+            self.parser, "iter_pages", side_effect=AssertionError
+        ), mock.patch.object(
+            self.parser, "parse_page", wraps=self.parser.parse_page
+        ) as parse_page:
+            self.assertEqual(
+                [tuple(dialog) for dialog in document[4]], self.pages[3][1]
+            )
+            # 未读取的页面直接使用索引中的文本组数量
+            self.assertEqual(document.get_dialog_count(5), 5)
+        self.assertEqual(parse_page.call_count, 1)
+        self.assertEqual(
+            [
+                page_number
+                for page_number in document
+                if document.pages[page_number - 1].dialogs is not None
+            ],
+            [4],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
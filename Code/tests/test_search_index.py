@@ -0,0 +1,110 @@
+import importlib.util
+import unittest
+from unittest import mock
+
+from core.document_model import Dialog
+from core.search_index import SearchIndex
+
+
+# 用于测试的文档，页码对应文本组列表
+def create_document():
+    return {
+        1: [Dialog("甲", "今天天气很好", "It is fine"), Dialog("乙", "明日下雨", "")],
+        2: [Dialog("未知", "原文", "译文"), Dialog("丙", "天气预报", "译文很长")],
+    }
+
+
+# 全文搜索索引的测试
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.document = create_document()
+        self.index = SearchIndex(("未知", "原文", "译文"))
+        self.index.attach(self.document)
+
+    # 断言增量更新后的索引与重新建立的索引一致
+    def assert_same_as_rebuilt(self):
+        rebuilt = SearchIndex(self.index.default_texts)
+        rebuilt.attach(self.document)
+        rebuilt.build()
+        self.assertEqual(self.index.entries, rebuilt.entries)
+        self.assertEqual(self.index.postings, rebuilt.postings)
+        self.assertEqual(self.index.page_row_counts, rebuilt.page_row_counts)
+
+    def test_search(self):
+        self.assertEqual(self.index.search("天气"), [(1, 0, 1), (2, 1, 1)])
+        self.assertEqual(self.index.search("fine"), [(1, 0, 2)])
+        self.assertEqual(self.index.search("FINE", match_case=True), [])
+        self.assertEqual(self.index.search("不存在"), [])
+        self.assertEqual(self.index.search(""), [])
+
+    def test_update_dialog(self):
+        self.index.search("天气")
+        version = self.index.version
+        self.document[1][0].set_field(1, "晴天")
+        with mock.patch.object(self.index, "build", side_effect=AssertionError):
+            self.index.update_dialog(1, 0)
+            self.assertEqual(self.index.search("天气"), [(2, 1, 1)])
+            self.assertEqual(self.index.search("晴天"), [(1, 0, 1)])
+        self.assertGreater(self.index.version, version)
+        self.assert_same_as_rebuilt()
+
+    def test_update_page(self):
+        self.index.search("天气")
+        self.document[1].append(Dialog("丁", "天气转晴", ""))
+        self.index.update_dialog(1, 2)
+        self.assertEqual(self.index.search("转晴"), [(1, 2, 1)])
+        del self.document[1][1:]
+        self.index.update_page(1)
+        self.assertEqual(self.index.search("下雨"), [])
+        self.assert_same_as_rebuilt()
+
+    def test_remove_page(self):
+        self.index.search("天气")
+        del self.document[2]
+        self.index.remove_page(2)
+        self.assertEqual(self.index.search("天气"), [(1, 0, 1)])
+        self.assert_same_as_rebuilt()
+
+    def test_updates_before_build_are_ignored(self):
+        self.document[1][0].set_field(1, "晴天")
+        self.index.update_dialog(1, 0)
+        self.index.update_page(2)
+        self.assertTrue(self.index.is_stale)
+        self.assertEqual(self.index.search("晴天"), [(1, 0, 1)])
+
+    def test_invalidate(self):
+        self.index.search("天气")
+        self.document[3] = [Dialog("甲", "新的页面", "")]
+        self.index.invalidate()
+        self.assertEqual(self.index.search("新的"), [(3, 0, 1)])
+
+    def test_placeholders_not_searched(self):
+        self.assertEqual(self.index.search("未知"), [])
+        self.assertEqual(self.index.search("原文"), [])
+        # 只有包含预设内容的其他文本才能被找到
+        self.assertEqual(self.index.search("译文"), [(2, 1, 2)])
+
+
+# 全文替换的测试，使用文本面板的替换方法，其余部分以简单的对象代替
+@unittest.skipUnless(importlib.util.find_spec("PyQt5"), "需要PyQt5")
+class ReplaceAllTest(unittest.TestCase):
+    def test_placeholders_not_replaced(self):
+        from text_panel import TextPanel
+
+        document = create_document()
+        search_index = SearchIndex(("未知", "原文", "译文"))
+        search_index.attach(document)
+        panel = mock.Mock(
+            text_is_mtm=True, current_data=document, search_index=search_index
+        )
+        count = TextPanel.replace_all_text(panel, "译文", "X")
+        self.assertEqual(count, 1)
+        self.assertEqual(document[2][0].translated_text, "译文")
+        self.assertEqual(document[2][1].translated_text, "X很长")
+        panel.storage.mark_dirty.assert_called_once_with(2, 1)
+        panel.save_text_file.assert_called_once_with()
+        self.assertEqual(search_index.search("译文"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
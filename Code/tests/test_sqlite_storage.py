@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+import os
+
+from batch_tool import BatchTool
+from core.markup_parser import MarkupParser
+from sqlite_storage import SqliteStorage
+
+
+# 数据库存储的测试
+class SqliteStorageTest(unittest.TestCase):
+    # 创建页码从5开始的文档，包含空白页、预设内容与多种文字
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.parser = MarkupParser()
+        self.pages = [
+            (5, [("甲", "今天天气很好", 'It\'s fine, "really"'), ("乙", "明日", "")]),
+            (6, []),
+            (7, [("", "", ""), ("未知", "原文", "译文")]),
+            (8, [("丙", "a,b;c\t'd'", "第二行")]),
+        ]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    # 获取临时文件夹中的文件路径
+    def get_path(self, file_name):
+        return os.path.join(self.folder.name, file_name)
+
+    # 读取文件的字节内容
+    @staticmethod
+    def read_bytes(file_path):
+        with open(file_path, "rb") as file:
+            return file.read()
+
+    # 转换文档，断言转换成功并返回页数与文本组数量
+    def convert(self, source_path, target_path):
+        _, error, page_count, dialog_count = BatchTool.convert_file(
+            (source_path, target_path)
+        )
+        self.assertIsNone(error)
+        return page_count, dialog_count
+
+    def test_write_and_read_pages(self):
+        file_path = self.get_path("a.mtmdb")
+        self.assertEqual(SqliteStorage.write_pages(file_path, self.pages), (4, 5))
+        self.assertEqual(
+            [
+                (page_number, [tuple(dialog) for dialog in dialogs])
+                for page_number, dialogs in SqliteStorage.iter_pages(file_path)
+            ],
+            self.pages,
+        )
+
+    def test_mtm_round_trip_is_byte_identical(self):
+        source_path = self.get_path("a.mtm")
+        with open(source_path, "w", encoding="utf-8") as file:
+            file.write(self.parser.generate_document(self.pages))
+        self.assertEqual(self.convert(source_path, self.get_path("a.mtmdb")), (4, 5))
+        self.assertEqual(
+            self.convert(self.get_path("a.mtmdb"), self.get_path("b.mtm")), (4, 5)
+        )
+        self.assertEqual(
+            self.read_bytes(self.get_path("b.mtm")), self.read_bytes(source_path)
+        )
+
+    def test_write_replaces_existing_database(self):
+        file_path = self.get_path("a.mtmdb")
+        SqliteStorage.write_pages(file_path, self.pages)
+        SqliteStorage.write_pages(file_path, self.pages[:1])
+        self.assertEqual([page[0] for page in SqliteStorage.iter_pages(file_path)], [5])
+        # 不留下临时文件
+        self.assertEqual(os.listdir(self.folder.name), ["a.mtmdb"])
+
+
+if __name__ == "__main__":
+    unittest.main()
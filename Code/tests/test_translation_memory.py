@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+import array
+import os
+
+from core.translation_memory import TranslationMemory
+
+
+# 翻译记忆的测试
+class TranslationMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.memory = TranslationMemory(os.path.join(self.folder.name, "memory"))
+
+    def tearDown(self):
+        self.memory.close()
+        self.folder.cleanup()
+
+    # 获取所有词元的倒排列表
+    def get_postings(self):
+        result = {}
+        for gram, count, blob in self.memory.connection.execute(
+            "SELECT gram, count, postings FROM grams"
+        ):
+            postings = array.array("I")
+            postings.frombytes(blob)
+            self.assertEqual(count, len(postings))
+            result[gram] = list(postings)
+        return result
+
+    # 倒排列表中没有重复的句子，且只包含原文含有该词元的现存句子
+    def assert_postings_consistent(self):
+        segments = dict(
+            self.memory.connection.execute("SELECT id, original_text FROM segments")
+        )
+        for gram, postings in self.get_postings().items():
+            self.assertEqual(len(postings), len(set(postings)), gram)
+            for segment_id in postings:
+                self.assertIn(segment_id, segments, gram)
+                self.assertIn(gram, self.memory.get_grams(segments[segment_id]))
+        for segment_id, original_text in segments.items():
+            for gram in self.memory.get_grams(original_text):
+                self.assertIn(segment_id, self.get_postings()[gram])
+
+    def test_update_removes_old_grams(self):
+        self.memory.record_segments("a", [(1, 0, "今天天气很好", "fine")])
+        self.memory.record_segments("a", [(1, 0, "明日下雨", "rain")])
+        self.assert_postings_consistent()
+        self.assertNotIn("天气", self.get_postings())
+        self.assertEqual(self.memory.lookup("今天天气很好吗"), [])
+
+    def test_edit_back_and_forth_has_no_duplicates(self):
+        for text in ("今天天气很好", "明日下雨", "今天天气很好"):
+            self.memory.record_segments("a", [(1, 0, text, "t")])
+        self.assert_postings_consistent()
+        self.assertEqual(
+            self.memory.connection.execute("SELECT COUNT(*) FROM segments").fetchone(),
+            (1,),
+        )
+
+    def test_orphan_removed_from_postings(self):
+        self.memory.record_segments("a", [(1, 0, "今天天气很好", "fine")])
+        self.memory.record_segments("a", [(1, 1, "明日下雨", "rain")])
+        # 第一个位置改为已有的句子，原有的句子不再属于任何位置
+        self.memory.record_segments("a", [(1, 0, "明日下雨", "rain")])
+        self.assert_postings_consistent()
+        self.assertNotIn("天气", self.get_postings())
+
+    def test_deleted_id_not_reused(self):
+        self.memory.record_segments("a", [(1, 0, "今天天气很好", "fine")])
+        self.memory.record_segments("a", [(1, 1, "明日下雨", "rain")])
+        (last_id,) = self.memory.connection.execute(
+            "SELECT MAX(id) FROM segments"
+        ).fetchone()
+        self.memory.record_segments("a", [(1, 1, "今天天气很好", "fine")])
+        self.memory.record_segments("a", [(1, 2, "后天刮风", "wind")])
+        (new_id,) = self.memory.connection.execute(
+            "SELECT id FROM segments WHERE original_text = ?", ("后天刮风",)
+        ).fetchone()
+        self.assertGreater(new_id, last_id)
+        self.assert_postings_consistent()
+
+    def test_lookup_excludes_current_pair(self):
+        self.memory.record_segments(
+            "a", [(1, 0, "今天天气很好", "fine"), (1, 1, "今天天气很好", "nice")]
+        )
+        suggestions = self.memory.lookup("今天天气很好", "fine")
+        self.assertEqual([s[2] for s in suggestions], ["nice"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,7 @@
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QStackedWidget,
     QHeaderView,
     QTextEdit,
@@ -11,14 +10,31 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QFileDialog,
     QLineEdit,
+    QProgressBar,
+    QTabBar,
 )
-from PyQt5.QtCore import Qt, QDir
-import pyperclip
+from PyQt5.QtCore import Qt, QDir, QThreadPool, QCoreApplication, QEvent
+import functools
 import os
-import csv
+import re
+import sqlite3
 
-from markup_parser import MarkupParser
+from core.markup_parser import MarkupParser, MarkupParseError
 from menu_box import MenuBox
+from auto_saver import AutoSaver
+from sqlite_storage import SqliteStorage
+from core.lazy_document import PageIndex
+from core.document_model import Dialog
+from dialog_table_model import DialogTableModel
+from continuous_panel import ContinuousPanel
+from core.search_index import SearchIndex
+from core.document_workspace import DocumentWorkspace
+from search_panel import SearchPanel
+from memory_panel import MemoryPanel
+from path_watcher import PathWatcher
+from core.profiler import Profiler
+from document_worker import DocumentWorkerSignals, OpenDocumentTask, SaveDocumentTask
+from core.page_io import PageIO
 
 
 class TextPanel(QWidget):
@@ -39,6 +55,8 @@ class TextPanel(QWidget):
         self.add_button = QPushButton("添加文本组")  # 添加文本组按钮
         self.copy_original_text_button = QPushButton("复制页面原文")  # 复制原文文本按钮
         self.copy_translated_text_button = QPushButton("复制页面译文")  # 复制译文按钮
+        self.continuous_button = QPushButton("连续显示")  # 连续显示全部页面按钮
+        self.continuous_button.setCheckable(True)
         self.up_control_layout.addWidget(self.paste_translated_text_button)
         self.up_control_layout.addWidget(self.copy_original_text_button)
         self.up_control_layout.addWidget(self.copy_translated_text_button)
@@ -46,29 +64,48 @@ class TextPanel(QWidget):
         self.up_control_layout.addWidget(self.create_page_button)
         self.up_control_layout.addWidget(self.delete_button)
         self.up_control_layout.addWidget(self.add_button)
+        self.up_control_layout.addWidget(self.continuous_button)
         # 添加布局
         self.layout.addLayout(self.up_control_layout)
 
+        # 查找替换栏，默认隐藏
+        self.search_panel = SearchPanel()
+        self.search_panel.hide()
+        self.layout.addWidget(self.search_panel)
+
+        # 文档标签栏，在已打开的文档之间切换
+        self.tab_bar = QTabBar()
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.setExpanding(False)
+        self.tab_bar.setDocumentMode(True)
+        self.layout.addWidget(self.tab_bar)
+
         # 文本显示
         # 表格框
-        self.table_panel = QTableWidget()
-        self.table_panel.setColumnCount(3)
-        self.table_panel.setHorizontalHeaderLabels(
-            ["讲述人", "原文", "译文"]
-        )  # 设置表头
-        self.table_panel.setWordWrap(True)  # 设置自动换行
-        self.table_panel.horizontalHeader().setSectionResizeMode(
-            QHeaderView.Fixed
-        )  # 设置列宽无法被用户更改
-        self.table_panel.horizontalHeader().setSectionsClickable(False)
-        self.table_panel.horizontalHeader().setSectionsMovable(False)
+        self.table_panel = QTableView()
+        self.table_model = DialogTableModel()  # 表格数据模型，表头由模型提供
+        self.table_panel.setModel(self.table_model)
+        # 连续显示所有页面的表格框
+        self.continuous_panel = ContinuousPanel()
+        for table in (self.table_panel, self.continuous_panel):
+            table.setWordWrap(True)  # 设置自动换行
+            table.horizontalHeader().setSectionResizeMode(
+                QHeaderView.Fixed
+            )  # 设置列宽无法被用户更改
+            table.horizontalHeader().setSectionsClickable(False)
+            table.horizontalHeader().setSectionsMovable(False)
         # 文本框
         self.text_panel = QTextEdit()
         # 切换
         self.stack = QStackedWidget()
         self.stack.addWidget(self.table_panel)
+        self.stack.addWidget(self.continuous_panel)
         self.stack.addWidget(self.text_panel)
         self.layout.addWidget(self.stack)
+        # 翻译记忆栏
+        self.memory_panel = MemoryPanel()
+        self.memory_panel.setMaximumHeight(120)
+        self.layout.addWidget(self.memory_panel)
 
         # 底部控制栏
         self.down_control_layout = QHBoxLayout()
@@ -86,28 +123,69 @@ class TextPanel(QWidget):
         self.down_control_layout.addWidget(self.prev_button, 40)
         self.down_control_layout.addWidget(self.next_button, 40)
         self.layout.addLayout(self.down_control_layout)
+        # 文档读写进度，有可取消的任务时才显示
+        self.progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.cancel_button = QPushButton("取消")
+        self.progress_layout.addWidget(self.progress_bar, 1)
+        self.progress_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(self.progress_layout)
+        self.progress_bar.hide()
+        self.cancel_button.hide()
 
         # 其他数据成员
         self.current_text_path = None  # 当前文档地址
         self.text_is_mtm = False  # 当前文档是否为mtm文档
-        self.parser = MarkupParser()  # 解析器
+        self.is_continuous = False  # 是否连续显示全部页面
+        self.auto_saver = AutoSaver()  # 自动保存器，即mtm文档的存储后端
+        self.storage_backends = [
+            SqliteStorage(),
+            self.auto_saver,
+        ]  # 存储后端，靠前的优先
+        self.storage = self.auto_saver  # 当前文档的存储后端
+        self.workspace = DocumentWorkspace()  # 保留切换离开的mtm文档
+        self.document_paths = []  # 标签栏中的文档地址，按照标签顺序排列
+        self.file_watcher = PathWatcher(self.reload_changed_pages)  # 监视文档的外部修改
         self.menu_box = MenuBox()
         self.current_data = {}  # 当前数据
         self.current_page_number = -1  # 当前页面
         self.image_panel = None  # 隔壁的图片面板
-        self.is_human_editing = True  # 是否处在人工修改阶段
         self.font_size = 10  # 字体大小
         self.default_speaker = "未知"  # 预设内容
         self.default_original_text = "原文"
         self.deafult_translated_text = "译文"
+        self.parser = MarkupParser(
+            self.default_speaker,
+            self.default_original_text,
+            self.deafult_translated_text,
+        )  # 解析器，生成文档时使用同样的预设内容
+        # 搜索索引，在第一次查找时建立，预设内容不参与查找
+        self.search_index = SearchIndex(
+            (
+                self.default_speaker,
+                self.default_original_text,
+                self.deafult_translated_text,
+            )
+        )
+        # 文档的读取与导出在后台线程中按提交顺序执行
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.worker_signals = DocumentWorkerSignals()
+        self.task_count = 0  # 已提交的任务数量，用于生成任务编号
+        self.tasks = {}  # 尚未结束的任务，任务编号为键
+        self.open_task = None  # 正在打开当前文档的任务
+        self.open_callback = None  # 文档打开后调用的函数
 
         # 关联
-        self.parser.text_panel = self
+        self.table_model.text_panel = self
+        self.continuous_panel.set_text_panel(self)
+        self.search_panel.text_panel = self
+        self.memory_panel.text_panel = self
+        self.memory_panel.open_memory()
 
         # 设置边框样式
-        self.table_panel.setStyleSheet(
-            "QTableWidget::item { border: 1px solid black; }"
-        )
+        for table in (self.table_panel, self.continuous_panel):
+            table.setStyleSheet("QTableView::item { border: 1px solid black; }")
 
         # 绑定方法
         self.paste_translated_text_button.clicked.connect(self.paste_translated_text)
@@ -120,9 +198,23 @@ class TextPanel(QWidget):
         self.delete_button.clicked.connect(self.delete_text_group)
         self.prev_button.clicked.connect(self.show_prev_page)
         self.next_button.clicked.connect(self.show_next_page)
+        self.continuous_button.toggled.connect(self.toggle_continuous_mode)
+        self.cancel_button.clicked.connect(self.cancel_tasks)
+        self.tab_bar.tabBarClicked.connect(self.switch_document)
+        self.tab_bar.tabCloseRequested.connect(self.close_document)
 
         # 链接函数
-        self.table_panel.itemChanged.connect(self.update_current_data)
+        self.table_model.dialog_edited.connect(self.update_current_data)
+        self.continuous_panel.continuous_model.dialog_edited.connect(
+            self.update_current_data
+        )
+        for table in (self.table_panel, self.continuous_panel):
+            table.selectionModel().currentChanged.connect(self.on_current_cell_changed)
+        self.worker_signals.progress.connect(self.on_task_progress)
+        self.worker_signals.opened.connect(self.on_document_opened)
+        self.worker_signals.saved.connect(self.finish_task)
+        self.worker_signals.failed.connect(self.on_task_failed)
+        self.worker_signals.canceled.connect(self.on_task_canceled)
 
         # 默认切换
         self.switch_text_panel()
@@ -131,10 +223,21 @@ class TextPanel(QWidget):
     def reset_self(self):
         # 重设前保存
         self.save_text_file()
+        self.storage.detach()
+        # mtm文档保留在工作区中，切换回来时无需重新读取
+        if self.text_is_mtm and self.storage is self.auto_saver:
+            self.workspace.put(
+                self.current_text_path, self.current_data, self.current_page_number
+            )
+        self.storage = self.auto_saver
+        self.file_watcher.clear()
         self.current_text_path = None  # 当前文档地址
         self.text_is_mtm = False  # 当前文档是否为mtm文档
         self.current_data = {}  # 当前数据
         self.current_page_number = -1  # 当前页面
+        self.table_model.set_page(self.current_data, self.current_page_number)
+        self.continuous_panel.continuous_model.reload(self.current_data)
+        self.search_index.attach(self.current_data)
 
     # 获取默认文件位置
     def get_default_path(self):
@@ -229,82 +332,322 @@ class TextPanel(QWidget):
             self,
             "打开文本文件",
             default_path,
-            "MTM Files (*.mtm);;Text Files (*.txt);;All Files(*)",
+            "MTM Files (*.mtm);;MTM Database (*.mtmdb);;Text Files (*.txt);;All Files(*)",
         )
         # 判断有无选中
         if file_path:
-            # 若有选中，打开文本文件，并进行后续操作
-            self.open_text_file_with_path(file_path)
-            # 获取路径
-            folder_path = os.path.normpath(os.path.dirname(file_path))
-            if self.image_panel.judge_images_exist(folder_path):
-                # 如果有，创建是否函数，询问是否加载
-                # 是
-                def if_yes():
-                    # 加载图集
-                    self.image_panel.open_image_folder_with_path(folder_path)
-                    # 若加载，简单判断页面数据与图片数据是否相符
-                    if len(self.current_data) == len(self.image_panel.image_path_list):
-                        # 若相符，则正常
-                        return
-                    else:
-                        # 若不相同，则需要报信息
-                        self.menu_box.show_message(
-                            "提示",
-                            "文档中页面数量与文件夹内图片数量不符，请注意不要开启了错误的文件",
-                        )
-
-                # 否
-                def if_no():
-                    # 不加载图集，并删除现有图集
-                    self.image_panel.reset_self()
+            # 若有选中，打开文本文件，打开后再进行后续操作
+            self.open_text_file_with_path(
+                file_path, lambda: self.ask_open_image_folder(file_path)
+            )
+
+    # 文档打开后，询问是否加载文档所在文件夹的图集
+    def ask_open_image_folder(self, file_path):
+        # 获取路径
+        folder_path = os.path.normpath(os.path.dirname(file_path))
+        if self.image_panel.judge_images_exist(folder_path):
+            # 如果有，创建是否函数，询问是否加载
+            # 是
+            def if_yes():
+                # 加载图集
+                self.image_panel.open_image_folder_with_path(folder_path)
+                # 若加载，简单判断页面数据与图片数据是否相符
+                if len(self.current_data) == len(self.image_panel.image_path_list):
+                    # 若相符，则正常
                     return
+                else:
+                    # 若不相同，则需要报信息
+                    self.menu_box.show_message(
+                        "提示",
+                        "文档中页面数量与文件夹内图片数量不符，请注意不要开启了错误的文件",
+                    )
 
-                # 询问是否要加载图集
-                self.menu_box.show_confirmation_dialog(
-                    "询问",
-                    "是否加载图片文件？",
-                    if_yes,
-                    if_no,
-                )
-
-    # 打开文本文件，传入了路径的版本
-    def open_text_file_with_path(self, file_path):
+            # 否
+            def if_no():
+                # 不加载图集，并删除现有图集
+                self.image_panel.reset_self()
+                return
+
+            # 询问是否要加载图集
+            self.menu_box.show_confirmation_dialog(
+                "询问",
+                "是否加载图片文件？",
+                if_yes,
+                if_no,
+            )
+
+    # 打开文本文件，传入了路径的版本，on_opened为文档打开后调用的函数
+    def open_text_file_with_path(self, file_path, on_opened=None):
+        # 放弃尚未完成的打开
+        self.cancel_open()
         # 打开前重设自身
         self.reset_self()
         # 检查是否有文件被选中
         if file_path:
-            # 若有，加载
-            with open(file_path, "r", encoding="utf-8") as file:
-                text = file.read()
-                self.load_text_data(text)
-            # 设定软件内数据
-            self.current_text_path = file_path
-
-    # 加载文本数据
-    def load_text_data(self, text):
-        # 尝试对文本进行解析
-        pages = self.parser.parse_doucument(text)
-        # 检查解析结果
-        if pages:
-            # 若有结果，说明为mtm文本，切换UI并加载数据
-            self.text_is_mtm = True
-            self.switch_text_panel()
-            self.current_data = {page_number: dialogs for page_number, dialogs in pages}
-            # 设置页数为1
-            self.current_page_number = 1
-            self.jump_page_number.setText(str(self.current_page_number))
-            # 设置总页数
-            self.page_max_number.setText(str(len(self.current_data)))
-            # 加载页面
-            self.load_page(1)
+            # 若有，交由对应的存储后端打开，页面仅在需要时读取
+            self.storage = self.get_storage(file_path)
+            self.open_callback = on_opened
+            # 工作区中保留的文档直接恢复，等待写入完成后再关联，防止重放已写入的日志
+            entry = self.workspace.take(file_path)
+            if entry:
+                self.auto_saver.wait_for_writes()
+                self.load_opened_document(file_path, *entry)
+                return
+            if self.storage is self.auto_saver:
+                # mtm文档与普通文本在后台扫描与读取，完成前禁止编辑
+                self.stack.setEnabled(False)
+                self.open_task = OpenDocumentTask(
+                    self.create_task_id(),
+                    self.worker_signals,
+                    file_path,
+                    self.storage,
+                    self.parser,
+                )
+                self.start_task(self.open_task)
+                return
+            # 数据库的连接只能在创建它的线程中使用，因此直接打开
+            try:
+                document = self.storage.open_document(file_path, self.parser)
+            except sqlite3.Error as error:
+                # 数据库无法以普通文本显示，报出错误后直接返回
+                self.menu_box.show_message("提示", f"无法打开数据库：{error}")
+                self.storage = self.auto_saver
+                return
+            self.load_opened_document(file_path, document)
+
+    # 后台读取完成，过时的任务直接忽略
+    def on_document_opened(self, task_id, document, text, message):
+        task = self.finish_task(task_id)
+        if task is None or task is not self.open_task:
+            return
+        self.open_task = None
+        self.stack.setEnabled(True)
+        # 若格式有误，报出出错位置，此时以普通文本显示，防止内容丢失
+        if message:
+            self.menu_box.show_message(
+                "提示", f"文档格式有误，将以普通文本显示。\n{message}"
+            )
+        self.load_opened_document(task.file_path, document, text=text)
+
+    # 显示打开的文档，document为None时显示普通文本
+    # 从工作区恢复的文档传入页码，以及保留期间文件是否被外部修改
+    def load_opened_document(
+        self, file_path, document, page_number=1, modified=False, text=None
+    ):
+        if document is not None:
+            self.load_document(document, page_number)
         else:
-            # 如果不是，以普通文本显示全部文本
-            self.text_is_mtm = False
-            self.switch_text_panel()
-            self.text_panel.setPlainText(text)
+            if text is None:
+                with open(file_path, "r", encoding="utf-8") as file:
+                    text = file.read()
+            self.load_text_data(text)
+        # 设定软件内数据
+        self.current_text_path = file_path
+        # 若为mtm文档，交由存储后端管理
+        if self.text_is_mtm:
+            # 关联时会重放上次未写入文档的修改，若有，则重载页面
+            if self.storage.attach(file_path, self.current_data):
+                self.reload_pages()
+            # 监视文档，以便合并其他程序对文档的修改
+            if self.storage is self.auto_saver:
+                self.file_watcher.watch(file_path)
+            # 合并保留期间其他程序对文档的修改
+            if modified:
+                self.reload_changed_pages()
+        # 添加到标签栏
+        if file_path not in self.document_paths:
+            self.document_paths.append(file_path)
+        self.update_tabs()
+        # 调用打开后的函数
+        callback, self.open_callback = self.open_callback, None
+        if callback:
+            callback()
+
+    # 放弃尚未完成的打开
+    def cancel_open(self):
+        if self.open_task:
+            self.open_task.cancel()
+            self.open_task = None
+        self.open_callback = None
+        self.stack.setEnabled(True)
+
+    # 生成任务编号
+    def create_task_id(self):
+        self.task_count += 1
+        return self.task_count
+
+    # 提交后台任务，可取消的任务显示进度与取消按钮
+    def start_task(self, task, cancelable=True):
+        task.cancelable = cancelable
+        self.tasks[task.task_id] = task
+        self.update_progress_bar()
+        self.thread_pool.start(task)
+
+    # 任务结束，返回该任务，任务已结束过时返回None
+    def finish_task(self, task_id, *args):
+        task = self.tasks.pop(task_id, None)
+        self.update_progress_bar()
+        return task
+
+    # 有可取消的任务时显示进度条
+    def update_progress_bar(self):
+        visible = any(task.cancelable for task in self.tasks.values())
+        if visible and self.progress_bar.isHidden():
+            self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(visible)
+        self.cancel_button.setVisible(visible)
+
+    # 更新进度
+    def on_task_progress(self, task_id, percent):
+        task = self.tasks.get(task_id)
+        if task is not None and task.cancelable:
+            self.progress_bar.setValue(percent)
+
+    # 任务出错，打开出错时恢复为未打开文档的状态
+    def on_task_failed(self, task_id, message):
+        task = self.finish_task(task_id)
+        if task is None:
+            return
+        if isinstance(task, OpenDocumentTask):
+            if task is self.open_task:
+                self.cancel_open()
+                self.menu_box.show_message("提示", f"无法打开文档：{message}")
+        else:
+            self.menu_box.show_message("提示", f"保存文本时出错：{message}")
+
+    # 任务已取消
+    def on_task_canceled(self, task_id):
+        task = self.finish_task(task_id)
+        if task is not None and task is self.open_task:
+            self.cancel_open()
+
+    # 取消所有可取消的任务，已写入一半的文件不会替换原有文件
+    def cancel_tasks(self):
+        for task in self.tasks.values():
+            if task.cancelable:
+                task.cancel()
+
+    # 等待所有任务完成，并立即处理任务发出的信号
+    def wait_for_tasks(self):
+        self.thread_pool.waitForDone()
+        QCoreApplication.sendPostedEvents(None, QEvent.MetaCall)
+
+    # 获取处理某个文件的存储后端
+    def get_storage(self, file_path):
+        for storage in self.storage_backends:
+            if storage.accepts(file_path):
+                return storage
+        return self.auto_saver
+
+    # 文档被外部修改后，仅重新分析内容改变的页面，并合并到当前数据中
+    def reload_changed_pages(self):
+        # 判断是否为mtm文件
+        if not self.text_is_mtm or not self.current_text_path:
+            return
+        # 自动保存器自身的写入无需处理
+        if self.storage.is_own_write(self.current_text_path):
+            return
+        # 重新扫描页面索引，并合并内容改变的页面
+        try:
+            entries = PageIndex.load(self.current_text_path)
+            # 若文档暂时不完整，则等待下次修改
+            if not entries:
+                return
+            changed_pages = self.storage.merge_external_pages(entries)
+        except (OSError, MarkupParseError):
+            return
+        # 更新总页数，读取页面时也可能已经合并了外部修改，因此总是更新
+        self.page_max_number.setText(str(len(self.current_data)))
+        # 页码可能随之改变，因此重新建立搜索索引
+        if changed_pages:
+            self.search_index.invalidate()
+        # 连续显示时，任意页面改变都需要重新统计行数
+        if self.is_continuous and changed_pages:
+            self.reload_pages()
+        # 若当前页面发生了改变，则重载
+        elif self.current_page_number in changed_pages:
+            self.show_page(self.current_page_number)
+
+    # 页面数量或内容整体改变后，重新加载当前显示的页面
+    def reload_pages(self):
+        self.page_max_number.setText(str(len(self.current_data)))
+        self.search_index.invalidate()
+        if self.is_continuous:
+            self.continuous_panel.continuous_model.reload(self.current_data)
+        if self.current_page_number not in self.current_data:
+            self.current_page_number = len(self.current_data)
+        self.load_page(self.current_page_number)
+
+    # 更新标签栏，选中当前文档
+    def update_tabs(self):
+        self.tab_bar.blockSignals(True)
+        while self.tab_bar.count():
+            self.tab_bar.removeTab(0)
+        for index, file_path in enumerate(self.document_paths):
+            self.tab_bar.addTab(os.path.basename(file_path))
+            self.tab_bar.setTabToolTip(index, file_path)
+        if self.current_text_path in self.document_paths:
+            self.tab_bar.setCurrentIndex(
+                self.document_paths.index(self.current_text_path)
+            )
+        self.tab_bar.blockSignals(False)
+
+    # 切换到标签对应的文档，同时打开文档所在文件夹的图集
+    def switch_document(self, index):
+        if not 0 <= index < len(self.document_paths):
+            return
+        file_path = self.document_paths[index]
+        if file_path != self.current_text_path:
+            self.open_text_file_with_path(
+                file_path, lambda: self.open_document_images(file_path)
+            )
+
+    # 打开文档所在文件夹的图集，已打开或没有图片时不做处理
+    def open_document_images(self, file_path):
+        folder_path = os.path.normpath(os.path.dirname(file_path))
+        if (
+            self.image_panel.current_folder_path != folder_path
+            and self.image_panel.judge_images_exist(folder_path)
+        ):
+            self.image_panel.open_image_folder_with_path(folder_path)
+
+    # 关闭标签对应的文档，关闭当前文档时保存后清空显示
+    def close_document(self, index):
+        file_path = self.document_paths.pop(index)
+        if file_path == self.current_text_path:
+            self.cancel_open()
+            self.reset_self()
+        self.workspace.remove(file_path)
+        self.update_tabs()
+
+    # 加载mtm文档，页面在显示时才会被分析，page_number为首先显示的页码
+    def load_document(self, document, page_number=1):
+        # 切换UI并加载数据
+        self.text_is_mtm = True
+        self.switch_text_panel()
+        self.current_data = document
+        self.search_index.attach(document)
+        # 连续显示时，统计新文档的行数
+        if self.is_continuous:
+            self.continuous_panel.continuous_model.reload(self.current_data)
+        # 设置页数，页面已不存在时为1
+        if page_number not in self.current_data:
+            page_number = 1
+        self.current_page_number = page_number
+        self.jump_page_number.setText(str(self.current_page_number))
+        # 设置总页数
+        self.page_max_number.setText(str(len(self.current_data)))
+        # 加载页面
+        self.load_page(page_number)
+
+    # 加载文本数据，以普通文本显示全部文本
+    def load_text_data(self, text):
+        self.text_is_mtm = False
+        self.switch_text_panel()
+        self.text_panel.setPlainText(text)
 
     # 加载页面数据，提供页面序号，从自身数据中加载，并显示到文本页面，仅供列表界面使用
+    @Profiler.trace
     def load_page(self, page_number):
         # 判断是否为mtm文件
         if not self.text_is_mtm:
@@ -312,96 +655,63 @@ class TextPanel(QWidget):
             return
 
         # 开始加载
-        self.is_human_editing = False
         if page_number in self.current_data:
-            # 初始化行数
-            self.table_panel.setRowCount(0)
-            for (
-                speaker,
-                original_text,
-                translated_text,
-            ) in self.current_data[page_number]:
-                # 每条文本组插入一条新行
-                self.table_panel.insertRow(self.table_panel.rowCount())
-
-                # 判断是否为预设
-                if speaker == self.default_speaker:
-                    speaker = ""
-                if original_text == self.default_original_text:
-                    original_text = ""
-                if translated_text == self.deafult_translated_text:
-                    translated_text = ""
-
-                # 插入讲述人单元格
-                speaker_item = QTableWidgetItem(speaker)
-                speaker_item.setFlags(speaker_item.flags() | Qt.ItemIsEditable)
-                speaker_item.setTextAlignment(Qt.AlignCenter)
-                self.table_panel.setItem(
-                    self.table_panel.rowCount() - 1, 0, speaker_item
-                )
-
-                # 插入原文单元格
-                original_text_item = QTableWidgetItem(original_text)
-                original_text_item.setFlags(
-                    original_text_item.flags() | Qt.ItemIsEditable
-                )
-                original_text_item.setTextAlignment(Qt.AlignLeft)
-                self.table_panel.setItem(
-                    self.table_panel.rowCount() - 1, 1, original_text_item
-                )
-
-                # 插入译文单元格
-                translated_text_item = QTableWidgetItem(translated_text)
-                translated_text_item.setFlags(
-                    translated_text_item.flags() | Qt.ItemIsEditable
-                )
-                translated_text_item.setTextAlignment(Qt.AlignLeft)
-                self.table_panel.setItem(
-                    self.table_panel.rowCount() - 1, 2, translated_text_item
-                )
-            # 加载结束后，更改当前页面序号
+            # 读取页面，页面格式有误时报出出错位置
+            try:
+                self.current_data[page_number]
+            except MarkupParseError as error:
+                self.menu_box.show_message("提示", f"页面格式有误。\n{error}")
+                return
+            # 更改当前页面序号
             self.current_page_number = page_number
             # 设置页数
             self.jump_page_number.setText(str(self.current_page_number))
+            if self.is_continuous:
+                # 连续显示时，滚动到该页
+                self.continuous_panel.scroll_to_page(page_number)
+            else:
+                # 表格直接从文档中读取页面，无需逐个创建单元格
+                self.table_model.set_page(self.current_data, page_number)
+                # 翻页后重新计算行高
+                self.table_panel.resizeRowsToContents()
+            # 将显示的页面记录到翻译记忆
+            self.memory_panel.record_page(page_number)
         else:
             # 若当前页面不存在，则报出提示
             self.menu_box.show_message("提示", "目标页码不存在")
-        self.is_human_editing = True
 
-    # 更新数据
-    def update_current_data(self):
+    # 更新数据，page_number与row为被人工修改的页面与文本组，文本组已由表格模型更新
+    @Profiler.trace
+    def update_current_data(self, page_number, row):
         # 判断是否为mtm文件
         if not self.text_is_mtm:
             # 若不是，直接返回
             return
 
-        # 当有内容发生更改时，判断是否由人工更改，如果是，则读取当前页面数据并覆写
-        if self.is_human_editing:
-            if self.current_page_number in self.current_data:
-                self.current_data[self.current_page_number] = []
-                # 遍历表格数据
-                for row in range(self.table_panel.rowCount()):
-                    # 获取Speaker
-                    speaker_item = self.table_panel.item(row, 0)
-                    speaker = speaker_item.text() if speaker_item else ""
-                    # 获取OriginalText
-                    original_text_item = self.table_panel.item(row, 1)
-                    original_text = (
-                        original_text_item.text() if original_text_item else ""
-                    )
-                    # 获取TranslatedText
-                    translated_text_item = self.table_panel.item(row, 2)
-                    translated_text = (
-                        translated_text_item.text() if translated_text_item else ""
-                    )
-                    # 添加到页面内容中
-                    self.current_data[self.current_page_number].append(
-                        (speaker, original_text, translated_text)
-                    )
-        # 更改完成后自动设置行高
-        self.table_panel.resizeRowsToContents()
-        # 并写入文档
-        self.save_text_file()
+        # 标记被修改的行，由存储后端稍后统一写入
+        self.storage.mark_dirty(page_number, row)
+        self.search_index.update_dialog(page_number, row)
+        self.memory_panel.on_dialog_edited(page_number, row)
+        # 仅重新计算被修改的行的行高
+        self.resize_dialog_rows(page_number, row, row)
+
+    # 选中单元格时，查询翻译记忆，分隔行不查询
+    def on_current_cell_changed(self, current, previous):
+        if not self.text_is_mtm or not current.isValid():
+            return
+        page_number, row = current.model().locate(current.row())
+        if row is not None:
+            self.memory_panel.show_suggestions(page_number, row)
+
+    # 获取当前显示的表格
+    def get_table_view(self):
+        return self.continuous_panel if self.is_continuous else self.table_panel
+
+    # 重新计算某页中若干文本组所在行的行高
+    def resize_dialog_rows(self, page_number, first_row, last_row):
+        table = self.get_table_view()
+        for row in range(first_row, last_row + 1):
+            table.resizeRowToContents(table.model().get_row(page_number, row))
 
     # 显示某页文本
     def show_page(self, number):
@@ -452,16 +762,16 @@ class TextPanel(QWidget):
             # 若不是，直接返回
             return
 
-        # 新建数据
-        speaker = ""
-        original_text = ""
-        translated_text = ""
-        # 添加到当前数据中
-        self.current_data[self.current_page_number].append(
-            (speaker, original_text, translated_text)
+        # 新建数据，通过表格模型添加到当前数据中
+        row = (
+            self.get_table_view()
+            .model()
+            .append_dialog(self.current_page_number, Dialog())
         )
-        # 重载当前页面数据
-        self.load_page(self.current_page_number)
+        self.storage.mark_dirty(self.current_page_number, row)
+        self.search_index.update_page(self.current_page_number)
+        # 仅计算新行的行高
+        self.resize_dialog_rows(self.current_page_number, row, row)
 
     # 删除文字组
     def delete_text_group(self):
@@ -475,10 +785,10 @@ class TextPanel(QWidget):
             # 如果文本组为空，则直接返回
             return
 
-        # 删除最后一行数据
-        del self.current_data[self.current_page_number][-1]
-        # 重载当前页面
-        self.load_page(self.current_page_number)
+        # 通过表格模型删除最后一行数据，表格仅移除该行
+        row = self.get_table_view().model().remove_last_dialog(self.current_page_number)
+        self.storage.mark_dirty(self.current_page_number, row)
+        self.search_index.update_page(self.current_page_number)
 
     # 新增页面
     def create_new_page(self):
@@ -489,10 +799,10 @@ class TextPanel(QWidget):
 
         # 获得新页面序号
         number = len(self.current_data) + 1
-        # 创建新页面
-        dialogs = [("", "", "")]
-        # 添加新页面
-        self.current_data[number] = dialogs
+        # 创建新页面，添加到末尾
+        self.get_table_view().model().insert_page(number, [Dialog()])
+        self.storage.mark_inserted(number)
+        self.search_index.update_page(number)
         # 更新总页数
         self.page_max_number.setText(str(len(self.current_data)))
         # 保存
@@ -508,12 +818,76 @@ class TextPanel(QWidget):
         # 判断当前页数
         if len(self.current_data) > 1:
             # 删除最后一页的数据
-            self.current_data.popitem()
+            page_number = len(self.current_data)
+            self.get_table_view().model().remove_page(page_number)
+            self.storage.mark_removed(page_number)
+            self.search_index.remove_page(page_number)
+            # 若正在显示被删除的页面，则改为显示新的最后一页
+            if self.current_page_number == page_number:
+                self.load_page(len(self.current_data))
         # 更新总页数
         self.page_max_number.setText(str(len(self.current_data)))
         # 保存
         self.save_text_file()
 
+    # 跳转到查找结果所在的单元格
+    def show_hit(self, page_number, row, column):
+        # 切换页面，隔壁同理
+        if self.is_continuous or page_number != self.current_page_number:
+            self.show_page(page_number)
+            if self.image_panel and self.image_panel.image_path_list:
+                self.image_panel.show_image(page_number - 1)
+        # 选中单元格
+        table = self.get_table_view()
+        index = table.model().index(table.model().get_row(page_number, row), column)
+        table.setCurrentIndex(index)
+        table.scrollTo(index)
+
+    # 全部替换，所有修改完成后只保存一次，返回替换的数量
+    def replace_all_text(self, query, replacement, match_case=False):
+        if not self.text_is_mtm or not query:
+            return 0
+        pattern = re.compile(re.escape(query), 0 if match_case else re.IGNORECASE)
+        count = 0
+        changed_rows = {}  # 每页被修改的行
+        for page_number, row, column in self.search_index.search(query, match_case):
+            dialog = self.current_data[page_number][row]
+            text = getattr(dialog, Dialog.fields[column])
+            # 预设内容在表格中显示为空，不做替换
+            if text == self.search_index.default_texts[column]:
+                continue
+            text, number = pattern.subn(lambda match: replacement, text)
+            dialog.set_field(column, text)
+            count += number
+            changed_rows.setdefault(page_number, set()).add(row)
+        # 标记修改并更新索引与表格
+        for page_number, rows in changed_rows.items():
+            # 仅修改一行时只写入该行，否则重写整页
+            self.storage.mark_dirty(
+                page_number, next(iter(rows)) if len(rows) == 1 else None
+            )
+            for row in rows:
+                self.search_index.update_dialog(page_number, row)
+            self.refresh_dialog_rows(page_number, min(rows), max(rows))
+        # 统一保存
+        self.save_text_file()
+        return count
+
+    # 文本组在表格之外被修改后，若该页正在显示，则更新表格
+    def refresh_dialog_rows(self, page_number, first_row, last_row):
+        if not self.is_continuous and page_number != self.current_page_number:
+            return
+        self.get_table_view().model().update_rows(page_number, first_row, last_row)
+        self.resize_dialog_rows(page_number, first_row, last_row)
+
+    # 开关查找替换栏
+    def toggle_search_panel(self):
+        if self.search_panel.isVisible():
+            self.search_panel.hide()
+        else:
+            self.search_panel.show()
+            self.search_panel.focus_find_text()
+
     # 跳转
     def jump_page(self):
         # 获取目标页码
@@ -533,7 +907,19 @@ class TextPanel(QWidget):
 
     # 保存数据到文件中
     def save_text_file(self):
-        self.save_text_file_with_path(self.current_text_path)
+        # 判断是否为mtm文件
+        if self.text_is_mtm:
+            # 若是，仅保存修改过的内容，由存储后端负责写入
+            self.storage.flush()
+            # 若上次写入时出错，报出提示
+            if self.storage.last_error:
+                self.menu_box.show_message(
+                    "提示", f"保存文本时出错：{self.storage.last_error}"
+                )
+                self.storage.last_error = None
+        else:
+            # 若不是，直接写入全部文本，保存当前文档的任务不可取消
+            self.save_text_file_with_path(self.current_text_path, cancelable=False)
 
     # 导出为
     def output_text_file(self, file_path):
@@ -542,63 +928,62 @@ class TextPanel(QWidget):
             self,
             "文本导出为",
             default_path,
-            "MTM Files (*.mtm);;Text Files (*.txt);;CSV Files (*.csv);;All Files(*)",
+            "MTM Files (*.mtm);;MTM Database (*.mtmdb);;Text Files (*.txt);;CSV Files (*.csv);;All Files(*)",
         )
         self.save_text_file_with_path(file_path)
 
-    # 保存数据到某个地方
-    def save_text_file_with_path(self, file_path):
+    # 保存数据到某个地方，内容在后台线程中生成并写入
+    @Profiler.trace
+    def save_text_file_with_path(self, file_path, cancelable=True):
         # 判断是否存在文件
         if file_path:
-            # 若存在，打开文件
-            with open(file_path, "w", encoding="utf-8") as file:
-                # 判断文本类型
-                if self.text_is_mtm:
-                    # 若是，读取所有页面
-                    pages = [
-                        (page_number, dialogs)
-                        for page_number, dialogs in self.current_data.items()
-                    ]
-                    # 判断保存的文件的类型是否为CSV
-                    if file_path.lower().endswith(".csv"):
-                        # 若是，则遍历页面数据生成内容
-                        writer = csv.writer(file)
-                        # 表头
-                        writer.writerow(
-                            ["PageNumber", "Speaker", "OriginalText", "TranslatedText"]
-                        )
-                        # 内容
-                        for page_number, dialogs in pages:
-                            for dialog in dialogs:
-                                speaker = dialog[0]
-                                if not speaker:
-                                    speaker = self.default_speaker
-                                original_text = dialog[1]
-                                if not original_text:
-                                    original_text = self.default_original_text
-                                translated_text = dialog[2]
-                                if not translated_text:
-                                    translated_text = self.deafult_translated_text
-                                writer.writerow(
-                                    [
-                                        page_number,
-                                        speaker,
-                                        original_text,
-                                        translated_text,
-                                    ]
-                                )
-                    else:
-                        # 若不是，调用解析器生成内容
-                        content = self.parser.generate_document(pages)
-                        # 写入内容
-                        file.write(content)
+            # 判断文本类型
+            if self.text_is_mtm:
+                if self.storage is self.auto_saver:
+                    # 若是mtm文档，先保存修改，后台等待写入完成后从文档中逐页读取
+                    # 之后的修改只会进入下一次自动保存，不会影响本次导出
+                    self.save_text_file()
+                    pages = functools.partial(
+                        PageIO.read_pages, self.parser, self.current_text_path
+                    )
+                    before_write = self.auto_saver.wait_for_writes
                 else:
-                    # 如果不是，直接写入内容
-                    text = self.text_panel.toPlainText()
-                    file.write(text)
+                    # 若是数据库，连接只能在界面线程中使用，先读取所有页面
+                    try:
+                        pages = [
+                            (page_number, [tuple(dialog) for dialog in dialogs])
+                            for page_number, dialogs in self.current_data.items()
+                        ]
+                    except MarkupParseError as error:
+                        self.menu_box.show_message("提示", f"页面格式有误。\n{error}")
+                        return
+                    before_write = None
+                task = SaveDocumentTask(
+                    self.create_task_id(),
+                    self.worker_signals,
+                    file_path,
+                    self.parser,
+                    pages=pages,
+                    page_count=len(self.current_data),
+                    before_write=before_write,
+                )
+            else:
+                # 如果不是，直接获取内容
+                task = SaveDocumentTask(
+                    self.create_task_id(),
+                    self.worker_signals,
+                    file_path,
+                    self.parser,
+                    content=self.text_panel.toPlainText(),
+                )
+            # 写入时以原子方式替换，防止中途出错或取消导致文件被截断
+            self.start_task(task, cancelable)
 
     # 复制页面原文
     def copy_page_original_text(self):
+        # 剪贴板模块仅在使用时加载，以加快启动
+        import pyperclip
+
         # 判断文档是否为mtm
         if self.text_is_mtm:
             # 若是，则复制页面原文
@@ -624,6 +1009,9 @@ class TextPanel(QWidget):
 
     # 复制页面译文
     def copy_page_translated_text(self):
+        # 剪贴板模块仅在使用时加载，以加快启动
+        import pyperclip
+
         # 判断文档是否为mtm
         if self.text_is_mtm:
             # 若是，则复制页面原文
@@ -649,6 +1037,9 @@ class TextPanel(QWidget):
 
     # 粘贴页面译文
     def paste_translated_text(self):
+        # 剪贴板模块仅在使用时加载，以加快启动
+        import pyperclip
+
         # 读取剪切板内容
         clipboard_content = pyperclip.paste()
 
@@ -681,11 +1072,12 @@ class TextPanel(QWidget):
                 content = line.strip()
             # 获取内容后，获取当前对话
             if i < len(self.current_data[self.current_page_number]):
-                dialog = self.current_data[self.current_page_number][i]
-                new_dialog = (dialog[0], dialog[1], content)
-                self.current_data[self.current_page_number][i] = new_dialog
-        # 结束更新数据后重载页面
-        self.load_page(self.current_page_number)
+                self.current_data[self.current_page_number][i].translated_text = content
+        self.storage.mark_dirty(self.current_page_number)
+        self.search_index.update_page(self.current_page_number)
+        # 结束更新数据后，仅更新被粘贴的行
+        row_count = min(len(lines), len(self.current_data[self.current_page_number]))
+        self.refresh_dialog_rows(self.current_page_number, 0, row_count - 1)
 
     # 增大字体大小
     def increase_font_size(self):
@@ -707,26 +1099,41 @@ class TextPanel(QWidget):
         font.setPointSize(self.font_size)
         # 设置字体
         self.table_panel.setFont(font)
+        self.continuous_panel.setFont(font)
         self.text_panel.setFont(font)
-        # 重设行高
+        # 重设行高，连续显示时仅重设可见行
         self.table_panel.resizeRowsToContents()
+        self.continuous_panel.resize_visible_rows()
+
+    # 开关连续显示全部页面
+    def toggle_continuous_mode(self, checked):
+        self.is_continuous = checked
+        if checked:
+            # 统计每页的文本组数量，格式有误的页面不显示文本组
+            self.continuous_panel.continuous_model.reload(self.current_data)
+        else:
+            # 关闭时释放连续显示的行号
+            self.continuous_panel.continuous_model.reload({})
+        self.switch_text_panel()
+        self.load_page(self.current_page_number)
 
     # 切换文本框
     def switch_text_panel(self):
         if self.text_is_mtm:
-            self.stack.setCurrentWidget(self.table_panel)
+            self.stack.setCurrentWidget(self.get_table_view())
             self.adjust_column_widths()
         else:
             self.stack.setCurrentWidget(self.text_panel)
 
     # 调整表格列宽
     def adjust_column_widths(self):
-        # 总宽度，预留一段方便显示
-        total_width = self.table_panel.viewport().width() - 25
-        # 调整宽度为1:2:2
-        self.table_panel.setColumnWidth(0, total_width // 5)
-        self.table_panel.setColumnWidth(1, 2 * total_width // 5)
-        self.table_panel.setColumnWidth(2, 2 * total_width // 5)
+        for table in (self.table_panel, self.continuous_panel):
+            # 总宽度，预留一段方便显示
+            total_width = table.viewport().width() - 25
+            # 调整宽度为1:2:2
+            table.setColumnWidth(0, total_width // 5)
+            table.setColumnWidth(1, 2 * total_width // 5)
+            table.setColumnWidth(2, 2 * total_width // 5)
 
     # 当窗口大小改变时
     def resizeEvent(self, event):
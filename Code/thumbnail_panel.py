@@ -0,0 +1,181 @@
+from PyQt5.QtWidgets import QListView, QAbstractItemView
+from PyQt5.QtGui import QPixmap, QColor
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractListModel,
+    QModelIndex,
+    QSize,
+    QThreadPool,
+)
+from collections import OrderedDict
+
+from image_workers import ThumbnailTask, ImageWorkerSignals
+
+
+# 缩略图数据模型
+# 列表视图只会向模型请求可见项的数据，因此只有可见的缩略图会被生成
+# 缩略图在线程池中生成，完成前显示占位图，生成后的缩略图按照最近最少使用的顺序淘汰
+class ThumbnailModel(QAbstractListModel):
+    thumbnail_size = 128  # 缩略图的最大边长
+    max_thumbnails = 500  # 最多缓存的缩略图数量
+
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.image_panel = None  # 图片面板，提供图片路径列表与磁盘缓存
+        self.thumbnails = OrderedDict()  # 缩略图缓存，图片路径为键
+        self.pending_paths = set()  # 正在生成的缩略图路径
+        self.row_by_path = {}  # 图片路径对应的行号
+        self.thread_pool = QThreadPool()  # 缩略图线程池
+        self.thread_pool.setMaxThreadCount(2)
+        self.worker_signals = ImageWorkerSignals()
+        self.worker_signals.thumbnail_ready.connect(self.on_thumbnail_ready)
+        # 占位图
+        self.placeholder = QPixmap(self.thumbnail_size, self.thumbnail_size)
+        self.placeholder.fill(QColor(220, 220, 220))
+
+    # 获取图片路径列表
+    def get_image_path_list(self):
+        return self.image_panel.image_path_list if self.image_panel else []
+
+    # 行数，即图片数量
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.get_image_path_list())
+
+    # 获取数据
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        # 页码
+        if role == Qt.DisplayRole:
+            return str(index.row() + 1)
+        # 缩略图
+        if role == Qt.DecorationRole:
+            file_path = self.get_image_path_list()[index.row()]
+            pixmap = self.thumbnails.get(file_path)
+            if pixmap is not None:
+                self.thumbnails.move_to_end(file_path)
+                return pixmap
+            # 没有缓存时，在后台生成，并先返回占位图
+            self.request_thumbnail(file_path)
+            return self.placeholder
+        return None
+
+    # 请求生成缩略图
+    def request_thumbnail(self, file_path):
+        if file_path in self.pending_paths:
+            return
+        self.pending_paths.add(file_path)
+        self.thread_pool.start(
+            ThumbnailTask(
+                file_path,
+                self.thumbnail_size,
+                self.worker_signals,
+                self.image_panel.disk_cache,
+            )
+        )
+
+    # 取消尚未开始的生成任务，滚动时调用，滚动后仍可见的项会重新请求
+    def cancel_pending(self):
+        self.thread_pool.clear()
+        self.pending_paths.clear()
+
+    # 缩略图生成后
+    def on_thumbnail_ready(self, file_path, image):
+        self.pending_paths.discard(file_path)
+        # 判断图片是否仍在当前图集中
+        row = self.row_by_path.get(file_path)
+        if row is None or image.isNull():
+            return
+        self.thumbnails[file_path] = QPixmap.fromImage(image)
+        while len(self.thumbnails) > self.max_thumbnails:
+            self.thumbnails.popitem(last=False)
+        # 通知视图更新
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    # 图集中的图片增删后更新，仅清除被删除的图片的缩略图
+    def update_paths(self, removed_paths):
+        self.beginResetModel()
+        self.cancel_pending()
+        for file_path in removed_paths:
+            self.thumbnails.pop(file_path, None)
+        self.row_by_path = {
+            file_path: row for row, file_path in enumerate(self.get_image_path_list())
+        }
+        self.endResetModel()
+
+    # 图集改变后重设
+    def reset(self):
+        self.beginResetModel()
+        self.cancel_pending()
+        self.thumbnails.clear()
+        self.row_by_path = {
+            file_path: row for row, file_path in enumerate(self.get_image_path_list())
+        }
+        self.endResetModel()
+
+
+# 缩略图面板
+# 以网格显示图集中的所有页面，点击缩略图时同时切换图片与文本
+class ThumbnailPanel(QListView):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.image_panel = None  # 隔壁的图片面板
+        self.text_panel = None  # 隔壁的文本面板
+        self.thumbnail_model = ThumbnailModel()
+        self.setModel(self.thumbnail_model)
+
+        # 视图设置
+        self.setViewMode(QListView.IconMode)
+        self.setResizeMode(QListView.Adjust)  # 宽度改变时重新排列
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)  # 所有项大小相同，无需逐项计算
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        size = ThumbnailModel.thumbnail_size
+        self.setIconSize(QSize(size, size))
+        self.setGridSize(QSize(size + 16, size + 28))
+
+        # 绑定事件
+        self.clicked.connect(self.on_thumbnail_clicked)
+        self.verticalScrollBar().valueChanged.connect(
+            self.thumbnail_model.cancel_pending
+        )
+
+    # 关联图片面板
+    def set_image_panel(self, image_panel):
+        self.image_panel = image_panel
+        self.thumbnail_model.image_panel = image_panel
+
+    # 图集改变后重设
+    def reset_thumbnails(self):
+        self.thumbnail_model.reset()
+
+    # 取消尚未开始的缩略图任务，并等待正在生成的任务完成
+    def wait_for_tasks(self):
+        self.thumbnail_model.cancel_pending()
+        self.thumbnail_model.thread_pool.waitForDone()
+
+    # 图集中的图片增删后更新
+    def update_thumbnails(self, removed_paths):
+        self.thumbnail_model.update_paths(removed_paths)
+        self.select_index(self.image_panel.current_image_index)
+
+    # 选中某一页
+    def select_index(self, index):
+        if 0 <= index < self.thumbnail_model.rowCount():
+            model_index = self.thumbnail_model.index(index)
+            self.setCurrentIndex(model_index)
+            self.scrollTo(model_index)
+
+    # 点击缩略图时
+    def on_thumbnail_clicked(self, model_index):
+        index = model_index.row()
+        # 切换图片
+        self.image_panel.show_image(index)
+        # 隔壁同理
+        if self.text_panel.text_is_mtm:
+            self.text_panel.show_page(index + 1)
@@ -0,0 +1,188 @@
+from PyQt5.QtWidgets import (
+    QGraphicsView,
+    QGraphicsScene,
+    QGraphicsItem,
+    QStyleOptionGraphicsItem,
+)
+from PyQt5.QtGui import QPainter
+from PyQt5.QtCore import Qt, QPoint, QRect, QRectF
+from collections import OrderedDict
+import math
+
+
+# 金字塔图片项
+# 将图片按每次缩小一半的方式生成多个级别，每个级别再切分为固定大小的图块
+# 绘制时根据当前缩放比例选择最接近的级别，仅切分并绘制与可见区域相交的图块
+# 各级别的图片通过load_level按需获取，获取不到时由上一级别缩小生成，并交给store_level保存
+# 因此只要缩小后的级别已经缓存，就无需解码原图
+# 仅保留当前绘制的级别，切换级别时释放之前的级别
+# 提供load_region时，0级的图块仅解码对应的区域，原图不会常驻内存
+class PyramidItem(QGraphicsItem):
+    tile_size = 256  # 图块边长
+    max_tiles = 256  # 最多缓存的图块数量
+
+    # 构造函数
+    def __init__(self, size, load_level, store_level=None, load_region=None):
+        super().__init__()
+        self.size = size  # 原图大小
+        self.load_level = load_level  # 获取某一级别图片的方法，0级必须返回原图
+        self.store_level = store_level  # 保存生成的级别图片的方法
+        self.load_region = load_region  # 读取原图某一区域的方法
+        self.level = None  # 当前级别
+        self.level_image = None  # 当前级别的图片，0级且可以按区域读取时为None
+        self.tiles = OrderedDict()  # 图块缓存，键为(级别, 横向序号, 纵向序号)
+        # 最高级别，即图片缩小到一个图块以内所需的级别
+        self.max_level = max(
+            0,
+            math.ceil(math.log2(max(size.width(), size.height()) / self.tile_size)),
+        )
+        # 需要获取可见区域
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    # 图片项的范围，即原图大小
+    def boundingRect(self):
+        return QRectF(0, 0, self.size.width(), self.size.height())
+
+    # 切换到某一级别，返回该级别的大小，之前的级别随即释放，无法解码时返回None
+    def use_level(self, level):
+        if level != self.level:
+            self.level_image = None
+            self.level = level
+            if level > 0 or not self.load_region:
+                self.level_image = self.create_level(level)
+        if self.level_image is None:
+            if self.level > 0 or not self.load_region:
+                return None
+            return self.size
+        return self.level_image.size()
+
+    # 生成某一级别的图片，原图也无法解码时返回None，例如仍在写入的图片
+    def create_level(self, level):
+        image = self.load_level(level)
+        # 获取不到时，由上一级别缩小一半生成，上一级别用完即释放
+        if image is None or image.isNull():
+            if level == 0:
+                return None
+            upper_image = self.create_level(level - 1)
+            if upper_image is None:
+                return None
+            image = upper_image.scaled(
+                max(1, upper_image.width() // 2),
+                max(1, upper_image.height() // 2),
+                Qt.IgnoreAspectRatio,
+                Qt.SmoothTransformation,
+            )
+            if self.store_level:
+                self.store_level(level, image)
+        return image
+
+    # 获取当前级别的图块
+    def get_tile(self, column, row):
+        key = (self.level, column, row)
+        tile = self.tiles.get(key)
+        if tile is None:
+            rect = QRect(
+                column * self.tile_size,
+                row * self.tile_size,
+                self.tile_size,
+                self.tile_size,
+            )
+            if self.level_image is None:
+                tile = self.load_region(rect.intersected(QRect(QPoint(), self.size)))
+            else:
+                tile = self.level_image.copy(rect.intersected(self.level_image.rect()))
+            self.tiles[key] = tile
+            # 淘汰最久未使用的图块
+            while len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+        else:
+            self.tiles.move_to_end(key)
+        return tile
+
+    # 绘制
+    def paint(self, painter, option, widget=None):
+        # 根据当前缩放比例选择级别，级别图片的精度不低于屏幕精度
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            painter.worldTransform()
+        )
+        level = 0
+        if scale > 0:
+            level = min(self.max_level, max(0, math.floor(math.log2(1 / scale))))
+        level_size = self.use_level(level)
+        if level_size is None:
+            return
+        # 级别图片相对原图的比例
+        ratio_x = level_size.width() / self.size.width()
+        ratio_y = level_size.height() / self.size.height()
+        # 计算可见区域覆盖的图块范围
+        exposed_rect = option.exposedRect.intersected(self.boundingRect())
+        first_column = max(0, int(exposed_rect.left() * ratio_x) // self.tile_size)
+        last_column = min(
+            (level_size.width() - 1) // self.tile_size,
+            int(exposed_rect.right() * ratio_x) // self.tile_size,
+        )
+        first_row = max(0, int(exposed_rect.top() * ratio_y) // self.tile_size)
+        last_row = min(
+            (level_size.height() - 1) // self.tile_size,
+            int(exposed_rect.bottom() * ratio_y) // self.tile_size,
+        )
+        # 逐个绘制图块，目标区域换算回原图坐标
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                tile = self.get_tile(column, row)
+                if tile.isNull():
+                    continue
+                target_rect = QRectF(
+                    column * self.tile_size / ratio_x,
+                    row * self.tile_size / ratio_y,
+                    tile.width() / ratio_x,
+                    tile.height() / ratio_y,
+                )
+                painter.drawImage(target_rect, tile)
+
+
+# 分块图片视图
+# 用于显示超大图片，缩放时不会生成完整的缩放图片，内存占用与缩放比例无关
+class TiledImageView(QGraphicsView):
+    # 构造函数
+    def __init__(self):
+        super().__init__()
+        self.image_scene = QGraphicsScene(self)
+        self.setScene(self.image_scene)
+        self.pyramid_item = None  # 当前图片项
+
+        # 视图设置
+        self.setDragMode(QGraphicsView.ScrollHandDrag)  # 鼠标拖拽移动
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)  # 以鼠标为中心缩放
+        self.setRenderHint(QPainter.SmoothPixmapTransform)
+        self.setAlignment(Qt.AlignCenter)
+
+    # 设置图片，参数含义与PyramidItem相同
+    def set_image(self, size, load_level, store_level=None, load_region=None):
+        self.clear_image()
+        # 判断图片是否有效
+        if size.isEmpty():
+            return
+        self.pyramid_item = PyramidItem(size, load_level, store_level, load_region)
+        self.image_scene.addItem(self.pyramid_item)
+        self.image_scene.setSceneRect(self.pyramid_item.boundingRect())
+        # 自动缩放图片适应面板大小
+        self.fit_image()
+
+    # 清空图片
+    def clear_image(self):
+        self.image_scene.clear()
+        self.pyramid_item = None
+
+    # 缩放图片适应面板大小
+    def fit_image(self):
+        if self.pyramid_item:
+            self.fitInView(self.pyramid_item, Qt.KeepAspectRatio)
+
+    # 滚轮控制缩放
+    def wheelEvent(self, event):
+        if event.angleDelta().y() > 0:
+            self.scale(1.1, 1.1)
+        else:
+            self.scale(0.9, 0.9)